@@ -1,6 +1,7 @@
 # entrypoint (FastAPI init + routers)
 # backend/app.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -12,6 +13,9 @@
 from routers.eval import router as eval_router
 from routers.label_assist import router as label_assist_router
 from routers.health_routes import router as health_router
+from services.elastic_client import close_es, close_async_es
+from services.ingest_jobs import start_workers, shutdown_workers
+from services.extraction import shutdown_pool
 
 # metrics router is optional in your tree; import defensively
 try:
@@ -24,10 +28,26 @@
 
 APP_NAME = os.getenv("APP_NAME", "searchsphere-backend")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ES clients are created lazily on first request; release their pools on shutdown.
+    # Ingest jobs interrupted by the last shutdown are picked up again here.
+    resumed = start_workers()
+    if resumed:
+        print(f"[ingest] resumed {resumed} background job(s)")
+    yield
+    shutdown_workers()
+    shutdown_pool()
+    await close_async_es()
+    close_es()
+
+
 app = FastAPI(
     title=APP_NAME,
     version="0.1.0",
     description="Elastic + Vertex AI hybrid RAG backend",
+    lifespan=lifespan,
 )
 
 # CORS (relaxed for local dev)
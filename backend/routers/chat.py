@@ -1,19 +1,24 @@
-# /api/chat    (RAG + Gemini with graceful fallback)
+# /api/chat, /api/chat/stream    (RAG + Gemini with graceful fallback; SSE variant)
 # backend/routers/chat.py
 from __future__ import annotations
 
+import asyncio
+import json
 import os
+import threading
 import time
 import traceback
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Tuple
 
 from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from utils.metrics import record
-from services.vertex_embeddings import embed_texts
-from services.elastic_client import get_es, search_knn, search_bm25
-from services.rank_fusion import rrf_fuse
+from services import answer_cache
+from services.elastic_client import get_async_es, index_generation
+from services.embedding_batcher import embed_query
+from services.retrieval import hybrid_retrieve
 import services.gemini_rag as gemini_rag  # keep as module import
 
 INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
@@ -35,6 +40,7 @@ class ChatRequest(BaseModel):
     query: str
     k: Optional[int] = 8
     filters: Optional[Filters] = None
+    debug: bool = False
 
 
 def _safe_str(x: Any) -> str:
@@ -98,66 +104,88 @@ def _make_citations(contexts: List[Dict[str, Any]], k: int) -> List[Dict[str, An
     return cites
 
 
-@router.post("/chat")
-def chat(req: ChatRequest = Body(...)) -> Dict[str, Any]:
+def _fallback_answer(contexts: List[Dict[str, Any]], k: int) -> str:
+    lines = []
+    for i, c in enumerate(contexts[:k], 1):
+        piece = c.get("snippet") or c.get("text", "")[:200]
+        lines.append(f"{i}. {c.get('title', 'Untitled')}: {piece}")
+    return (
+        "I couldn’t reach the chat model right now. Here are the most relevant snippets:\n\n"
+        + ("\n".join(lines) if lines else "No context available.")
+    )
+
+
+def _llm_warning(e: Exception, embed_err: Optional[str]) -> str:
+    cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
+    warning = (
+        f"LLM failed: {type(e).__name__}: {e} "
+        f"(GOOGLE_APPLICATION_CREDENTIALS='{cred_path}', exists={_exists(cred_path)})"
+    )
+    return f"{embed_err} | {warning}" if embed_err else warning
+
+
+async def _cached_answer(req: ChatRequest, k: int) -> Tuple[Optional[List[float]], str, Optional[Tuple[Dict[str, Any], float]]]:
     """
-    Retrieval-augmented chat:
-      1) Embed query (Vertex)
-      2) Retrieve via BM25 + kNN (Elasticsearch)
-      3) Fuse via RRF
-      4) Answer with citations (Gemini) with graceful fallback
+    Semantic answer cache lookup: (query vector, cache status, (payload, similarity) on a hit).
+    The query is embedded only when the cache is on; the vector is reused for kNN on a miss.
     """
-    t0 = time.perf_counter()
-    k = max(1, min(20, req.k or 8))
-
-    # 1) ES client
+    if not answer_cache.enabled():
+        return None, "bypass", None
     try:
-        es = get_es()
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Elasticsearch not ready: {e}")
+        qvec = await embed_query(req.query, location=LOCATION, model=EMBED_MODEL)
+    except Exception:
+        return None, "bypass", None  # retrieval retries and reports the embedding error
+    cached = answer_cache.lookup(qvec, req.filters, k)
+    return qvec, ("hit" if cached is not None else "miss"), cached
 
-    # 2) Embedding
-    qvec: Optional[List[float]] = None
-    embed_err: Optional[str] = None
-    try:
-        qvec = embed_texts([req.query], location=LOCATION, model=EMBED_MODEL)[0]
-    except Exception as e:
-        embed_err = f"Embedding failed: {type(e).__name__}: {e}"
 
-    # 3) Retrieve
-    bm25_hits: List[Dict[str, Any]] = []
-    bm_err: Optional[str] = None
+async def _retrieve(req: ChatRequest, k: int, qvec: Optional[List[float]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Hybrid retrieval + fusion (BM25 fallback handled by the retrieval service) -> (retrieved, contexts)."""
     try:
-        bm25_hits = search_bm25(
-            es=es, index=INDEX, query_text=req.query, k=max(60, k), filters=req.filters
-        )
+        es = get_async_es()
     except Exception as e:
-        bm_err = f"BM25 failed: {type(e).__name__}: {e}"
+        raise HTTPException(status_code=502, detail=f"Elasticsearch not ready: {e}")
+    retrieved = await hybrid_retrieve(
+        req.query, top_k=k, pool=max(60, k), filters=req.filters, es=es, query_vector=qvec
+    )
+    return retrieved, [_normalize_hit_source(h) for h in retrieved["fused"]]
 
-    knn_hits: List[Dict[str, Any]] = []
-    knn_err: Optional[str] = None
-    if qvec is not None:
-        try:
-            knn_hits = search_knn(
-                es=es, index=INDEX, query_vector=qvec, k=max(60, k), filters=req.filters
-            )
-        except Exception as e:
-            knn_err = f"kNN failed: {type(e).__name__}: {e}"
-    else:
-        knn_err = embed_err or "embedding_unavailable"
 
-    # 4) Fuse (fallback to BM25 if needed)
-    try:
-        fused = rrf_fuse(knn_hits, bm25_hits, top_k=k)
-    except Exception:
-        fused = bm25_hits[:k]
+@router.post("/chat")
+async def chat(req: ChatRequest = Body(...)) -> Dict[str, Any]:
+    """
+    Retrieval-augmented chat:
+      1) Embed the query (Vertex) and look it up in the semantic answer cache;
+         a near-identical question (same filters/k) returns the cached answer
+      2) Retrieve BM25 + kNN candidates with that vector (services.retrieval;
+         one _msearch by default since the vector is known, RETRIEVAL_STRATEGY
+         picks another)
+      3) Fuse (RRF by default)
+      4) Answer with citations (Gemini) with graceful fallback
+    With the cache off (ANSWER_CACHE_SIZE=0) step 1 is skipped and retrieval
+    embeds the query itself. "cache" says hit | miss | bypass.
+    """
+    t0 = time.perf_counter()
+    k = max(1, min(20, req.k or 8))
+
+    # 0) Semantic answer cache (the embedding is reused for kNN on a miss)
+    qvec, cache_status, cached = await _cached_answer(req, k)
+    if cached is not None:
+        payload, similarity = cached
+        record("chat", (time.perf_counter() - t0) * 1000.0)
+        return {**payload, "cache": "hit", "cache_similarity": round(similarity, 4)}
+    generation = index_generation()
 
-    contexts = [_normalize_hit_source(h) for h in fused]
+    # 1-2) ES client, retrieve + fuse
+    retrieved, contexts = await _retrieve(req, k, qvec)
+    embed_err = retrieved["errors"]["embed"]
+    bm_err = retrieved["errors"]["bm25"]
+    knn_err = retrieved["errors"]["knn"]
 
-    # 5) LLM
+    # 3) LLM (blocking SDK call runs off the event loop)
     try:
-        answer, model_citations = gemini_rag.answer_with_citations(
-            req.query, contexts, model=CHAT_MODEL
+        answer, model_citations = await asyncio.to_thread(
+            gemini_rag.answer_with_citations, req.query, contexts, model=CHAT_MODEL
         )
         citations = model_citations if model_citations else _make_citations(contexts, k)
 
@@ -167,42 +195,172 @@ def chat(req: ChatRequest = Body(...)) -> Dict[str, Any]:
             "citations": citations,
             "top_k_used": len(contexts),
         }
-        if embed_err or bm_err or knn_err:
+        # only complete answers are reused: no degraded retrieval, no LLM fallback
+        if qvec is not None and not (embed_err or bm_err or knn_err) and contexts:
+            answer_cache.store(qvec, req.filters, k, dict(result), generation)
+        result["cache"] = cache_status
+        if embed_err or bm_err or knn_err or req.debug:
             result["debug"] = {
                 "embed_err": embed_err,
                 "bm25_err": bm_err,
                 "knn_err": knn_err,
+                "fetch_err": retrieved["errors"]["fetch"],
+                "payload": retrieved["payload"],
+                "timings_ms": retrieved["timings_ms"],
             }
         return result
 
     except Exception as e:
         # Graceful fallback
-        cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
         tb = traceback.format_exc(limit=2)
-        warning = (
-            f"LLM failed: {type(e).__name__}: {e} "
-            f"(GOOGLE_APPLICATION_CREDENTIALS='{cred_path}', exists={_exists(cred_path)})"
-        )
-        if embed_err:
-            warning = f"{embed_err} | {warning}"
-
-        lines = []
-        for i, c in enumerate(contexts[:k], 1):
-            piece = c.get("snippet") or c.get("text", "")[:200]
-            lines.append(f"{i}. {c.get('title', 'Untitled')}: {piece}")
-
-        fallback_answer = (
-            "I couldn’t reach the chat model right now. Here are the most relevant snippets:\n\n"
-            + ("\n".join(lines) if lines else "No context available.")
-        )
-
         citations = _make_citations(contexts, k)
         record("chat", (time.perf_counter() - t0) * 1000.0)
 
         return {
-            "answer": fallback_answer,
+            "answer": _fallback_answer(contexts, k),
             "citations": citations,
             "top_k_used": len(contexts),
-            "warning": warning,
+            "warning": _llm_warning(e, embed_err),
             "trace": tb,
         }
+
+
+# ---------------------------------------------------------------------
+# Streaming variant (Server-Sent Events)
+# ---------------------------------------------------------------------
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # no proxy buffering (nginx)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000.0, 1)
+
+
+async def _iterate_in_thread(it: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Yield the items of a blocking iterator that a single worker thread advances.
+    The thread owns the iterator and closes it itself; when the consumer goes away
+    (client disconnect) it only raises a stop flag, so the generator is never
+    closed while another thread is inside next().
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def _put(kind: str, value: Any = None) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+        except RuntimeError:  # event loop already closed
+            stop.set()
+
+    def _pump() -> None:
+        try:
+            for item in it:
+                if stop.is_set():
+                    break
+                _put("item", item)
+            _put("done")
+        except Exception as e:
+            _put("error", e)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=_pump, name="chat-stream", daemon=True).start()
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest = Body(...)) -> StreamingResponse:
+    """
+    /api/chat as Server-Sent Events, so the UI can render before generation ends:
+      event: citations  {"citations", "top_k_used", "cache"}   once retrieval + fusion finish
+      event: token      {"text"}                                 per Gemini chunk (generate_content(stream=True))
+      event: warning    {"warning"}                              LLM failed; snippet fallback follows as a token
+      event: metrics    {"latency_ms", "retrieval_ms", "first_token_ms", "chunks", "chars", "cache", ...}   last
+    A semantic-cache hit replays the cached answer as one token event.
+    Failures before the stream starts (e.g. ES not ready) are plain HTTP errors.
+    """
+    t0 = time.perf_counter()
+    k = max(1, min(20, req.k or 8))
+
+    qvec, cache_status, cached = await _cached_answer(req, k)
+    if cached is not None:
+        payload, similarity = cached
+
+        async def _replay() -> AsyncIterator[str]:
+            yield _sse("citations", {"citations": payload["citations"], "top_k_used": payload["top_k_used"],
+                                     "cache": "hit"})
+            yield _sse("token", {"text": payload["answer"]})
+            latency = _ms(t0)
+            record("chat", latency)
+            yield _sse("metrics", {"latency_ms": latency, "retrieval_ms": 0.0, "first_token_ms": latency,
+                                   "chunks": 1, "chars": len(payload["answer"]), "cache": "hit",
+                                   "cache_similarity": round(similarity, 4)})
+
+        return StreamingResponse(_replay(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    generation = index_generation()
+    retrieved, contexts = await _retrieve(req, k, qvec)
+    retrieval_ms = _ms(t0)
+    errors = {name: err for name, err in retrieved["errors"].items() if err}
+    citations = (gemini_rag.citations_for(contexts) if contexts else []) or _make_citations(contexts, k)
+
+    async def _events() -> AsyncIterator[str]:
+        yield _sse("citations", {"citations": citations, "top_k_used": len(contexts), "cache": cache_status})
+
+        parts: List[str] = []
+        first_token_ms: Optional[float] = None
+        failed = False
+        # the SDK iterator blocks between chunks; a worker thread advances it
+        chunks = _iterate_in_thread(gemini_rag.stream_answer(req.query, contexts, model=CHAT_MODEL))
+        try:
+            async for text in chunks:
+                if first_token_ms is None:
+                    first_token_ms = _ms(t0)
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            failed = True
+            yield _sse("warning", {"warning": _llm_warning(e, retrieved["errors"]["embed"])})
+            if not parts:
+                fallback = _fallback_answer(contexts, k)
+                first_token_ms = _ms(t0)
+                parts.append(fallback)
+                yield _sse("token", {"text": fallback})
+        finally:
+            await chunks.aclose()
+
+        answer = "".join(parts)
+        if not failed and qvec is not None and not errors and contexts:
+            answer_cache.store(qvec, req.filters, k,
+                               {"answer": answer, "citations": citations, "top_k_used": len(contexts)}, generation)
+        latency = _ms(t0)
+        record("chat", latency)
+        metrics: Dict[str, Any] = {
+            "latency_ms": latency,
+            "retrieval_ms": retrieval_ms,
+            "first_token_ms": first_token_ms,
+            "chunks": len(parts),
+            "chars": len(answer),
+            "cache": cache_status,
+            "timings_ms": retrieved["timings_ms"],
+        }
+        if errors:
+            metrics["errors"] = errors
+        yield _sse("metrics", metrics)
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,6 +1,7 @@
 # backend/routers/eval.py
 from __future__ import annotations
 
+import asyncio
 import os
 from typing import List, Optional, Tuple, Dict, Any
 from collections.abc import Iterable
@@ -8,9 +9,9 @@
 from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel
 
-from services.vertex_embeddings import embed_texts
-from services.elastic_client import get_es, search_knn, search_bm25
-from services.rank_fusion import rrf_fuse
+from services.elastic_client import get_async_es
+from services.fusion import FUSION_K_CONST, FUSION_METHOD, FUSION_METHODS, FUSION_NORM, FUSION_NORMS, SOURCES, fuse_many
+from services.retrieval import hybrid_retrieve
 from utils.eval import batch_precision
 from utils.metrics import set_eval_precision
 
@@ -20,6 +21,8 @@
 INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
 LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
 EMBED_MODEL = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+# Max eval items retrieved at the same time
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "4"))
 
 router = APIRouter()
 
@@ -37,73 +40,76 @@ class EvalItem(BaseModel):
     relevant_ids: List[str]
 
 
+class FusionSpec(BaseModel):
+    method: str = FUSION_METHOD               # "rrf" | "linear"
+    weights: Optional[Dict[str, float]] = None  # per source: {"knn": 1.0, "bm25": 0.6}
+    norm: str = FUSION_NORM                   # linear only: "minmax" | "zscore"
+    k_const: int = FUSION_K_CONST
+
+
 class EvalRequest(BaseModel):
     k: int = 10
     items: List[EvalItem]
     filters: Optional[Filters] = None
+    # re-fuse every item's BM25/kNN candidates with this instead of the live fusion
+    fusion: Optional[FusionSpec] = None
 
 
 # ---------------------------------------------------------------------
 # Endpoint: /api/eval/precision
 # ---------------------------------------------------------------------
 @router.post("/eval/precision")
-def eval_precision(req: EvalRequest = Body(...)) -> Dict[str, Any]:
+async def eval_precision(req: EvalRequest = Body(...)) -> Dict[str, Any]:
     """
     Compute Precision@k across multiple (query, relevant_ids) pairs using
     hybrid retrieval (BM25 + kNN fused via Reciprocal Rank Fusion).
+    Items are retrieved concurrently (bounded by EVAL_CONCURRENCY).
+    With `fusion`, the candidate lists of all items are re-fused in one batched
+    services.fusion.fuse_many() call, so fusion settings can be compared.
     """
     # 1️⃣ Ensure Elasticsearch is ready
     try:
-        es = get_es()
+        es = get_async_es()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Elasticsearch not ready: {e}")
 
     k = max(1, min(50, req.k))
-    per_item: List[Tuple[List[Dict[str, Any]], Iterable[str]]] = []
+    if req.fusion and (req.fusion.method not in FUSION_METHODS or req.fusion.norm not in FUSION_NORMS):
+        raise HTTPException(status_code=400, detail=f"fusion method must be one of {FUSION_METHODS}, norm one of {FUSION_NORMS}")
     errors: List[str] = []
+    sem = asyncio.Semaphore(max(1, EVAL_CONCURRENCY))
 
-    # 2️⃣ Loop through each evaluation item
-    for it in req.items:
-        qvec = None
-
-        # Step 1 — Embed query text
-        try:
-            qvec = embed_texts([it.query], location=LOCATION, model=EMBED_MODEL)[0]
-        except Exception as e:
-            errors.append(f"Embedding failed for '{it.query[:30]}…': {e}")
+    # re-fusing needs the candidate lists with their sources
+    refuse = {"two_phase": False, "strategy": "msearch"} if req.fusion else {}
+    candidates: List[Dict[str, Any]] = [{} for _ in req.items]
 
-        # Step 2 — BM25 search
-        try:
-            bm25_hits = search_bm25(
-                es=es, index=INDEX, query_text=it.query, k=max(60, k), filters=req.filters
+    async def _run(i: int, it: EvalItem) -> Tuple[List[Dict[str, Any]], Iterable[str]]:
+        async with sem:
+            r = await hybrid_retrieve(
+                it.query, top_k=max(60, k), pool=max(60, k), filters=req.filters, es=es, **refuse
             )
-        except Exception as e:
-            bm25_hits = []
-            errors.append(f"BM25 search failed for '{it.query[:30]}…': {e}")
-
-        # Step 3 — kNN search (if embeddings available)
-        knn_hits: List[Dict[str, Any]] = []
-        if qvec is not None:
-            try:
-                knn_hits = search_knn(
-                    es=es,
-                    index=INDEX,
-                    query_vector=qvec,
-                    k=max(60, k),
-                    filters=req.filters,
-                )
-            except Exception as e:
-                knn_hits = []
-                errors.append(f"kNN search failed for '{it.query[:30]}…': {e}")
-
-        # Step 4 — Fuse results (fallback to BM25 if fusion fails)
-        try:
-            fused = rrf_fuse(knn_hits, bm25_hits, top_k=max(60, k))
-        except Exception:
-            fused = bm25_hits[: max(60, k)]
-
-        # Append pair (fused results, relevant_ids)
-        per_item.append((fused, list(it.relevant_ids)))
+        q = it.query[:30]
+        if r["errors"]["embed"]:
+            errors.append(f"Embedding failed for '{q}…': {r['errors']['embed']}")
+        if r["errors"]["bm25"]:
+            errors.append(f"BM25 search failed for '{q}…': {r['errors']['bm25']}")
+        if r["errors"]["knn"] and not r["errors"]["embed"]:
+            errors.append(f"kNN search failed for '{q}…': {r['errors']['knn']}")
+        # Pair (fused results, relevant_ids); fusion already falls back to BM25
+        candidates[i] = r
+        return r["fused"], list(it.relevant_ids)
+
+    # 2️⃣ Retrieve every evaluation item
+    per_item: List[Tuple[List[Dict[str, Any]], Iterable[str]]] = list(
+        await asyncio.gather(*[_run(i, it) for i, it in enumerate(req.items)])
+    )
+
+    if req.fusion:
+        spec = req.fusion
+        weights = [float((spec.weights or {}).get(s, 1.0)) for s in SOURCES]
+        runs = [[r["knn"], r["bm25"]] for r in candidates]
+        fused = fuse_many(runs, top_k=k, method=spec.method, weights=weights, k_const=spec.k_const, norm=spec.norm)
+        per_item = [(hits, rel) for hits, (_, rel) in zip(fused, per_item)]
 
     # 3️⃣ Evaluate precision@k
     try:
@@ -123,6 +129,8 @@ def eval_precision(req: EvalRequest = Body(...)) -> Dict[str, Any]:
         "p_at_k": agg.get("p_at_k", 0.0),
         "queries": agg.get("queries", []),
     }
+    if req.fusion:
+        response["fusion"] = req.fusion.model_dump()
     if errors:
         response["warnings"] = errors
 
@@ -5,9 +5,9 @@
 from fastapi import APIRouter
 from fastapi.responses import Response
 
-from services.elastic_client import get_es  # Elastic only (no bedrock)
-import vertexai
-from vertexai.generative_models import GenerativeModel
+from services.elastic_client import ES_LIVENESS_INTERVAL, check_es_liveness, get_es, es_liveness  # Elastic only (no bedrock)
+from services.index_schema import vector_dims
+from services.vertex_models import get_generative_model
 
 # Optional embeddings warmup if you have the helper
 try:
@@ -42,27 +42,33 @@ def healthz():
     vertex_ok = False
     vertex_reason = None
 
-    # --- Elastic ping ---
+    # --- Elastic: last background liveness result; one inline ping only until it has one ---
     try:
-        es = get_es()
-        _info = es.info()
-        es_ok = True
+        es = get_es()  # builds the client and starts the liveness checker on first use
+    except Exception as e:
+        es = None
+        es_reason = f"es_connect_failed: {e}"
+    liveness = es_liveness()
+    if es is not None and (liveness["ok"] is None or ES_LIVENESS_INTERVAL <= 0):
+        # before the checker's first tick (or with it disabled) don't report down unchecked
+        liveness = check_es_liveness(es)
+    es_ok = es is not None and liveness["ok"] is True
+    if es_ok:
         try:
             index_ok = bool(es.indices.exists(index=INDEX))
         except Exception as e:
             es_reason = f"indices.exists error: {e}"
-    except Exception as e:
-        es_reason = f"es_connect_failed: {e}"
+    elif es is not None:
+        es_reason = f"liveness_failed: {liveness['reason']}"
 
     # --- Vertex ping (very light) ---
     try:
         if not PROJECT:
             vertex_reason = "missing GCP project (set GCP_PROJECT_ID / GOOGLE_CLOUD_PROJECT)"
         else:
-            vertexai.init(project=PROJECT, location=LOCATION)
             try:
                 # A tiny content call to verify the endpoint. Fast & cheap for flash model.
-                _ = GenerativeModel(MODEL).generate_content("ping").text
+                _ = get_generative_model(MODEL, LOCATION).generate_content("ping").text
                 vertex_ok = True
             except Exception as e:
                 vertex_reason = f"generate_failed: {e}"
@@ -75,7 +81,12 @@ def healthz():
         "ok": ok,
         "build": BUILD_SHA,
         "index": INDEX,
-        "elastic": {"ok": es_ok, "index_ok": index_ok, "reason": es_reason},
+        "elastic": {
+            "ok": es_ok,
+            "index_ok": index_ok,
+            "reason": es_reason,
+            "liveness": liveness,
+        },
         "vertex": {
             "ok": vertex_ok,
             "project": PROJECT,
@@ -96,7 +107,7 @@ def warmup():
     """
     results = {
         "ok": True,
-        "elastic": {"ok": False, "took": None, "reason": None},
+        "elastic": {"ok": False, "took": None, "vector_dims": None, "reason": None},
         "vertex_chat": {"ok": False, "reason": None},
         "vertex_embed": {"ok": False, "dims": None, "reason": None},
         "build": BUILD_SHA,
@@ -113,6 +124,10 @@ def warmup():
         took = res.get("took")
         results["elastic"]["ok"] = True
         results["elastic"]["took"] = took
+        try:
+            results["elastic"]["vector_dims"] = vector_dims(es, INDEX) or None
+        except Exception:
+            pass  # mapping access may be restricted; the search itself worked
     except Exception as e:
         results["ok"] = False
         results["elastic"]["reason"] = str(e)
@@ -121,8 +136,7 @@ def warmup():
     try:
         if not PROJECT:
             raise RuntimeError("missing GCP project (set GCP_PROJECT_ID / GOOGLE_CLOUD_PROJECT)")
-        vertexai.init(project=PROJECT, location=LOCATION)
-        _ = GenerativeModel(MODEL).generate_content("ping").text
+        _ = get_generative_model(MODEL, LOCATION).generate_content("ping").text
         results["vertex_chat"]["ok"] = True
     except Exception as e:
         results["ok"] = False
@@ -131,9 +145,17 @@ def warmup():
     # --- Vertex embed (optional) ---
     if HAVE_EMBED:
         try:
-            vec = embed_texts(["warmup"], location=LOCATION, model=EMBED_MODEL)[0]
+            vec = embed_texts(["warmup"], location=LOCATION, model=EMBED_MODEL, use_cache=False)[0]
             results["vertex_embed"]["ok"] = True
             results["vertex_embed"]["dims"] = len(vec) if hasattr(vec, "__len__") else None
+            index_dims = results["elastic"]["vector_dims"]
+            if index_dims and results["vertex_embed"]["dims"] != index_dims:
+                # kNN would fail on every query; usually VERTEX_EMBED_DIMS disagrees with the mapping
+                results["ok"] = False
+                results["vertex_embed"]["ok"] = False
+                results["vertex_embed"]["reason"] = (
+                    f"query vectors have {results['vertex_embed']['dims']} dims, {INDEX} expects {index_dims}"
+                )
         except Exception as e:
             results["ok"] = False
             results["vertex_embed"]["reason"] = str(e)
@@ -1,20 +1,19 @@
 # /api/ingest  (PDF → chunks → Elastic)
 # backend/routers/ingest.py
-import io
+import hashlib
 import os
-from datetime import datetime
-from typing import List, Optional
+import shutil
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, UploadFile, File, Body, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from services.elastic_client import get_es, index_docs
-from services.vertex_embeddings import embed_texts
-from utils.chunker import chunk_text, read_pdf_bytes, read_text_bytes, read_csv_bytes
+from services.ingest_jobs import create_job, get_job, list_jobs, new_job_id, request_cancel, spool_dir
+from services.ingest_pipeline import IngestMemoryExceeded, run_pipeline
 
 INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
-LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
-EMBED_MODEL = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+SPOOL_READ_BYTES = 1024 * 1024
 
 router = APIRouter()
 
@@ -25,72 +24,162 @@ class IngestRequest(BaseModel):
     doc_type: Optional[str] = "generic"
     team: Optional[str] = "public"
 
+def _safe_name(name: Optional[str], fallback: str) -> str:
+    base = os.path.basename(name or "").strip().replace("\x00", "")
+    return base or fallback
+
+def _doc_id(team: str, key: str) -> str:
+    # doc_ids key incremental re-ingest (chunk ids, orphan deletes), so they must
+    # not collide across teams or requests: re-sending the same key updates that
+    # document, anything else is a new one
+    return f"{team}/{key}"
+
+def _blob_key(meta: dict, j: int, n_blobs: int, text: str) -> str:
+    """meta["doc_id"] if the caller named the document(s), else the blob's content hash."""
+    given = str(meta.get("doc_id") or "").strip()
+    if given:
+        return given if n_blobs == 1 else f"{given}-{j}"
+    return "blob-" + hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+async def _spool_upload(f: UploadFile, path: str) -> int:
+    size = 0
+    out = await run_in_threadpool(open, path, "wb")
+    try:
+        while True:
+            block = await f.read(SPOOL_READ_BYTES)
+            if not block:
+                break
+            await run_in_threadpool(out.write, block)
+            size += len(block)
+    finally:
+        await run_in_threadpool(out.close)
+    return size
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(text)
+
+async def _spool_sources(
+    req: Optional[IngestRequest],
+    files: Optional[List[UploadFile]],
+    folder: str,
+    *,
+    blobs_to_disk: bool = False,
+) -> List[Dict[str, Any]]:
+    """Spool uploads under `folder` and describe them (plus any text blobs) as pipeline sources.
+
+    Uploads get doc_id <team>/<filename>, text blobs <team>/<meta.doc_id> or
+    <team>/blob-<content hash>. Empty uploads are skipped. With blobs_to_disk,
+    text blobs are written next to the uploads so a background job only has to
+    persist paths, not the raw text.
+    """
+    team = (req.team if req else None) or "public"
+    doc_type = (req.doc_type if req else None) or "generic"
+    meta = (req.meta if req else None) or {}
+    sources: List[Dict[str, Any]] = []
+
+    # 1) Uploaded files: spooled to disk, then read incrementally by the pipeline
+    for i, f in enumerate(files or []):
+        name = _safe_name(f.filename, f"upload-{i}")
+        path = os.path.join(folder, f"{i:04d}-{name}")
+        if not await _spool_upload(f, path):
+            continue
+        sources.append({
+            "doc_id": _doc_id(team, f.filename or name),
+            "title": f.filename or name,
+            "filename": name,
+            "path": path,
+            "source": "upload",
+            "team": team,
+            "doc_type": doc_type,
+        })
+
+    # 2) Raw text blobs (optional)
+    blobs = (req.text_blobs if req else None) or []
+    for j, t in enumerate(blobs):
+        src: Dict[str, Any] = {
+            "doc_id": _doc_id(team, _blob_key(meta, j, len(blobs), t)),
+            "title": meta.get("title") or f"blob-{j}",
+            "source": "text",
+            "meta": meta,
+            "team": team,
+            "doc_type": doc_type,
+        }
+        if blobs_to_disk:
+            path = os.path.join(folder, f"blob-{j}.txt")
+            await run_in_threadpool(_write_text, path, t)
+            src.update({"filename": f"blob-{j}.txt", "path": path})
+        else:
+            src["text"] = t
+        sources.append(src)
+
+    return sources
+
 @router.post("/ingest")
 async def ingest(
     req: IngestRequest = Body(default=None),
     files: Optional[List[UploadFile]] = File(default=None),
 ):
-    """Ingest PDFs/text/CSV → chunks → embed → Elastic"""
-    docs = []
-    now = datetime.utcnow().isoformat()
-
-    # 1) Handle uploaded files
-    if files:
-        for f in files:
-            raw = await f.read()
-            text = ""
-            if f.filename.lower().endswith(".pdf"):
-                text = read_pdf_bytes(raw)
-            elif f.filename.lower().endswith(".csv"): 
-                text = read_csv_bytes(raw)
-            else:
-                text = read_text_bytes(raw)
-
-            for i, chunk in enumerate(chunk_text(text)):
-                docs.append({
-                    "doc_id": f.filename,
-                    "chunk_id": f"{f.filename}::chunk::{i}",
-                    "title": f.filename,
-                    "text": chunk,
-                    "source": "upload",
-                    "url": None,
-                    "tags": [],
-                    "team": (req.team if req else "public"),
-                    "doc_type": (req.doc_type if req else "generic"),
-                    "created_at": now,
-                    "updated_at": now,
-                    "page_num": i
-                })
-
-    # 2) Handle raw text blobs (optional)
-    if req and req.text_blobs:
-        for j, t in enumerate(req.text_blobs):
-            for i, chunk in enumerate(chunk_text(t)):
-                docs.append({
-                    "doc_id": f"blob-{j}",
-                    "chunk_id": f"blob-{j}::chunk::{i}",
-                    "title": req.meta.get("title") if req and req.meta else f"blob-{j}",
-                    "text": chunk,
-                    "source": "text",
-                    "url": None,
-                    "tags": list(req.meta.get("tags", [])) if req and req.meta else [],
-                    "team": req.team or "public",
-                    "doc_type": req.doc_type or "generic",
-                    "created_at": now,
-                    "updated_at": now,
-                    "page_num": i
-                })
-
-    if not docs:
+    """Ingest PDFs/text/CSV → chunks → embed → Elastic (streaming, batched pipeline)"""
+    folder = await run_in_threadpool(spool_dir, f"req-{new_job_id()}")
+    try:
+        sources = await _spool_sources(req, files, folder)
+
+        if not sources:
+            raise HTTPException(status_code=400, detail="No content to ingest")
+
+        # extract → chunk → embed → bulk, off the event loop
+        try:
+            stats = await run_in_threadpool(run_pipeline, sources, INDEX)
+        except IngestMemoryExceeded as e:
+            raise HTTPException(status_code=413, detail=f"Ingest aborted: {e}; try /api/ingest/jobs or smaller files")
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Ingest failed: {type(e).__name__}: {e}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    if not stats["indexed"] and stats["stages"]["chunk"]["items"] == 0:
         raise HTTPException(status_code=400, detail="No content to ingest")
 
-    # 3) Embed
-    embeddings = embed_texts([d["text"] for d in docs], location=LOCATION, model=EMBED_MODEL)
-    for d, vec in zip(docs, embeddings):
-        d["text_vector"] = vec
+    return {"indexed": stats["indexed"], "index": INDEX, **stats}
+
+# ---------------------------------------------------------------------
+# Background jobs: spool → 202 + job_id → poll /ingest/jobs/{id}
+# ---------------------------------------------------------------------
+@router.post("/ingest/jobs", status_code=202)
+async def ingest_job(
+    req: IngestRequest = Body(default=None),
+    files: Optional[List[UploadFile]] = File(default=None),
+):
+    """Spool uploads to disk and ingest them in the background; poll GET /ingest/jobs/{job_id}."""
+    job_id = new_job_id()
+    folder = await run_in_threadpool(spool_dir, job_id)
+    try:
+        sources = await _spool_sources(req, files, folder, blobs_to_disk=True)
+        if not sources:
+            raise HTTPException(status_code=400, detail="No content to ingest")
+        job = await run_in_threadpool(create_job, sources, INDEX, job_id)
+    except BaseException:
+        # empty, failed or disconnected upload: nothing was queued, so drop the spool
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+
+    return {"job_id": job_id, "status": job["status"], "index": INDEX, "files": job.get("files", [])}
+
+@router.get("/ingest/jobs")
+async def ingest_jobs(limit: int = 20):
+    return {"jobs": await run_in_threadpool(list_jobs, limit)}
 
-    # 4) Index
-    es = get_es()
-    index_docs(es, INDEX, docs)
+@router.get("/ingest/jobs/{job_id}")
+async def ingest_job_status(job_id: str):
+    job = await run_in_threadpool(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
 
-    return {"indexed": len(docs), "index": INDEX}
+@router.post("/ingest/jobs/{job_id}/cancel")
+async def ingest_job_cancel(job_id: str):
+    job = await run_in_threadpool(request_cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
@@ -4,9 +4,7 @@
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
 
-from services.vertex_embeddings import embed_texts
-from services.elastic_client import get_es, search_knn, search_bm25
-from services.rank_fusion import rrf_fuse
+from services.retrieval import hybrid_retrieve
 
 INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
 LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
@@ -85,25 +83,18 @@ def _derive_chunk_id(h: Dict[str, Any], src: Dict[str, Any]) -> str:
 
 # ------------------------ Endpoint ------------------------
 @router.post("/eval/label-assist")
-def label_assist(req: LabelAssistRequest = Body(...)):
-    es = get_es()
-
-    # Embed query once
-    qvec = embed_texts([req.query], location=LOCATION, model=EMBED_MODEL)[0]
-
-    # Retrieve a generous pool for fusion headroom
+async def label_assist(req: LabelAssistRequest = Body(...)):
+    # Retrieve a generous pool for fusion headroom (BM25 + embed -> kNN per RETRIEVAL_STRATEGY)
     k = max(1, req.k)
     pool = max(60, k)
-    knn_hits = search_knn(
-        es,
-        INDEX,
-        qvec,
-        k=pool,
+    retrieved = await hybrid_retrieve(
+        req.query,
+        top_k=k,
+        pool=pool,
         num_candidates=max(120, pool * 5),
         filters=req.filters,
     )
-    bm25_hits = search_bm25(es, INDEX, req.query, k=pool, filters=req.filters)
-    fused = rrf_fuse(knn_hits, bm25_hits, top_k=k)
+    fused = retrieved["fused"]
 
     items: List[Dict[str, Any]] = []
     for h in fused:
@@ -146,8 +137,12 @@ def label_assist(req: LabelAssistRequest = Body(...)):
 
         items.append(item)
 
-    return {
+    out: Dict[str, Any] = {
         "query": req.query,
         "k": k,
         "candidates": items,
     }
+    warnings = list(dict.fromkeys(e for e in retrieved["errors"].values() if e))
+    if warnings:
+        out["warnings"] = warnings
+    return out
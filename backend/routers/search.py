@@ -1,6 +1,7 @@
 # backend/routers/search.py
 from __future__ import annotations
 
+import asyncio
 import os
 import time
 import inspect
@@ -10,8 +11,19 @@
 from pydantic import BaseModel, root_validator
 
 from elasticsearch import AuthenticationException, AuthorizationException, ApiError
-from services.elastic_client import get_es, search_knn, search_bm25
-from services.rank_fusion import rrf_fuse
+from services.elastic_client import (
+    get_async_es,
+    async_fetch_sources,
+    async_search_knn,
+    async_search_bm25,
+    async_search_hybrid_msearch,
+    async_search_hybrid_rrf,
+    index_generation,
+    payload_meter,
+)
+from services import search_cache
+from services.fusion import FUSION_WEIGHTS, fuse
+from services.retrieval import TWO_PHASE
 from utils.metrics import record
 
 router = APIRouter()
@@ -26,7 +38,7 @@ class SearchBody(BaseModel):
     q: Optional[str] = None
     query: Optional[str] = None
     k: int = 10
-    mode: str = "hybrid"  # "bm25" | "knn" | "hybrid"
+    mode: str = "hybrid"  # "bm25" | "knn" | "hybrid" | "msearch" (hybrid in one round trip) | "rrf" (fused by ES)
     filters: Optional[Dict[str, Any]] = None
     query_vector: Optional[List[float]] = None
 
@@ -117,9 +129,9 @@ def _normalize_hit(hit: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _safe_search(func, label: str, **kwargs) -> List[Dict[str, Any]]:
+async def _safe_search(func, label: str, **kwargs) -> List[Dict[str, Any]]:
     try:
-        res = _call_with_supported(func, **kwargs)
+        res = await _call_with_supported(func, **kwargs)
         return _as_list(res)
     except (AuthenticationException, AuthorizationException):
         raise HTTPException(status_code=502, detail=f"Elasticsearch authentication failed during {label}")
@@ -129,6 +141,22 @@ def _safe_search(func, label: str, **kwargs) -> List[Dict[str, Any]]:
         raise HTTPException(status_code=500, detail=f"{label} search failed: {e}")
 
 
+def _tier_of(bm_hits: List[Dict[str, Any]]) -> Optional[str]:
+    """BM25 fallback tier that produced the hits (match, multi_match, ...)."""
+    return bm_hits[0].get("tier") if bm_hits else None
+
+
+async def _hydrate(es: Any, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Two-phase search: fetch sources for the fused top-k only (one _mget)."""
+    if all(h.get("_source") for h in hits):
+        return hits
+    return await _safe_search(async_fetch_sources, "source fetch", es=es, index=ES_INDEX, hits=hits)
+
+
+def _payload_debug(candidates: Dict[str, Any], fetch: Dict[str, Any]) -> Dict[str, Any]:
+    return {"two_phase": TWO_PHASE, "payload": {"candidates": candidates, "fetch": fetch}}
+
+
 def _demo_results() -> List[Dict[str, Any]]:
     """Shown only if ES returns zero hits, to keep the UI demonstrable."""
     demo = [
@@ -158,19 +186,36 @@ def _demo_results() -> List[Dict[str, Any]]:
 
 # ------------------------------ Endpoint --------------------------------
 @router.post("/search")
-def search(body: SearchBody = Body(...)) -> Dict[str, Any]:
+async def search(body: SearchBody = Body(...)) -> Dict[str, Any]:
     """
     Unified search endpoint for BM25, kNN, and hybrid.
     Returns normalized hits safe for the UI + __latency_ms for the front-end badge.
+    Identical requests are served from services.search_cache until the index
+    changes; "cache" says hit | miss | stale | bypass. Degraded results (hybrid
+    whose kNN leg failed) are returned but not cached.
     """
     t0 = time.perf_counter()
+    k = max(1, min(50, body.k))
+    key = search_cache.cache_key(body.query, body.mode or "hybrid", body.filters, k, body.query_vector, ES_INDEX)
+    status, cached = search_cache.lookup(key)
+    if cached is not None:
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        record("search", elapsed)
+        return {**cached, "cache": status, "__latency_ms": elapsed}
+
+    generation = index_generation()  # read before searching, so a concurrent write marks the entry stale
+    res = await _search(body, k, t0)
+    if res.get("mode") != "demo" and not res.get("degraded"):
+        search_cache.store(key, {f: v for f, v in res.items() if f != "__latency_ms"}, generation)
+    return {**res, "cache": status}
 
+
+async def _search(body: SearchBody, k: int, t0: float) -> Dict[str, Any]:
     try:
-        es = get_es()
+        es = get_async_es()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Elasticsearch not ready: {e}")
 
-    k = max(1, min(50, body.k))
     pool = max(60, k)   # give fusion headroom
     common = dict(
         es=es,
@@ -183,16 +228,18 @@ def search(body: SearchBody = Body(...)) -> Dict[str, Any]:
     )
 
     mode = (body.mode or "hybrid").lower()
+    # hybrid candidates: ids/scores only, sources fetched after fusion
+    candidate_source = False if TWO_PHASE else None
 
     # BM25
     if mode == "bm25":
-        bm_hits = _safe_search(search_bm25, "BM25", **common)
+        bm_hits = await _safe_search(async_search_bm25, "BM25", **common)
         norm = [_normalize_hit(h) for h in bm_hits[:k]]
         elapsed = (time.perf_counter() - t0) * 1000.0
         record("search", elapsed)
         if not norm and DEMO_FALLBACK:
             return {"results": _demo_results(), "mode": "demo", "__latency_ms": elapsed}
-        return {"results": norm, "mode": "bm25", "__latency_ms": elapsed}
+        return {"results": norm, "mode": "bm25", "bm25_tier": _tier_of(bm_hits), "__latency_ms": elapsed}
 
     # kNN
     if mode == "knn":
@@ -201,8 +248,8 @@ def search(body: SearchBody = Body(...)) -> Dict[str, Any]:
             record("search", elapsed)
             return {"results": [], "mode": "knn", "warning": "query_vector missing", "__latency_ms": elapsed}
         # NEW: pass num_candidates (env-tunable)
-        knn_hits = _safe_search(
-            search_knn,
+        knn_hits = await _safe_search(
+            async_search_knn,
             "kNN",
             **{**common, "query_vector": body.query_vector, "num_candidates": KNN_NUM_CANDIDATES}
         )
@@ -213,21 +260,92 @@ def search(body: SearchBody = Body(...)) -> Dict[str, Any]:
             return {"results": _demo_results(), "mode": "demo", "__latency_ms": elapsed}
         return {"results": norm, "mode": "knn", "__latency_ms": elapsed}
 
-    # hybrid
-    bm_hits = _safe_search(search_bm25, "BM25", **common)
+    # hybrid via one _msearch round trip (needs a query vector; else plain BM25 below)
+    if mode == "msearch" and body.query_vector:
+        with payload_meter() as cand_payload:
+            res = await _safe_search(
+                async_search_hybrid_msearch,
+                "hybrid msearch",
+                **{**common, "query_vector": body.query_vector, "num_candidates": KNN_NUM_CANDIDATES,
+                   "source": candidate_source}
+            )
+        res = res[0] if res else {}
+        knn_hits = res.get("knn") or []
+        bm_hits = res.get("bm25") or []
+        fused = fuse([knn_hits, bm_hits], top_k=k, weights=FUSION_WEIGHTS) if knn_hits else bm_hits[:k]
+        with payload_meter() as fetch_payload:
+            fused = await _hydrate(es, fused)
+        norm = [_normalize_hit(h) for h in fused]
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        record("search", elapsed)
+        if not norm and DEMO_FALLBACK:
+            return {"results": _demo_results(), "mode": "demo", "__latency_ms": elapsed}
+        return {
+            "results": norm,
+            "mode": "hybrid",
+            "strategy": "msearch",
+            "bm25_tier": res.get("bm25_tier"),
+            "took": res.get("took"),
+            "debug": _payload_debug(cand_payload, fetch_payload),
+            "__latency_ms": elapsed,
+        }
+
+    # hybrid fused by Elasticsearch (rrf retriever); client-side RRF where unsupported
+    if mode == "rrf" and body.query_vector:
+        with payload_meter() as cand_payload:
+            res = await _safe_search(
+                async_search_hybrid_rrf,
+                "hybrid rrf",
+                **{**common, "k": k, "window": pool, "query_vector": body.query_vector,
+                   "num_candidates": KNN_NUM_CANDIDATES, "fallback_source": candidate_source}
+            )
+        res = res[0] if res else {}
+        with payload_meter() as fetch_payload:
+            fused = await _hydrate(es, res.get("fused") or [])
+        norm = [_normalize_hit(h) for h in fused]
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        record("search", elapsed)
+        if not norm and DEMO_FALLBACK:
+            return {"results": _demo_results(), "mode": "demo", "__latency_ms": elapsed}
+        return {
+            "results": norm,
+            "mode": "hybrid",
+            "strategy": "rrf",
+            "fusion": res.get("fusion"),
+            "bm25_tier": res.get("bm25_tier"),
+            "took": res.get("took"),
+            "debug": _payload_debug(cand_payload, fetch_payload),
+            "__latency_ms": elapsed,
+        }
+
+    # hybrid: BM25 and kNN run concurrently; kNN errors degrade to BM25-only
     knn_hits: List[Dict[str, Any]] = []
-    if body.query_vector:
-        try:
-            # NEW: pass num_candidates (env-tunable)
-            knn_hits = _safe_search(
-                search_knn,
-                "kNN",
-                **{**common, "query_vector": body.query_vector, "num_candidates": KNN_NUM_CANDIDATES}
+    knn_err: Optional[str] = None
+    hybrid = {**common, "source": candidate_source}
+    with payload_meter() as cand_payload:
+        if body.query_vector:
+            bm_res, knn_res = await asyncio.gather(
+                _safe_search(async_search_bm25, "BM25", **hybrid),
+                _safe_search(
+                    async_search_knn,
+                    "kNN",
+                    **{**hybrid, "query_vector": body.query_vector, "num_candidates": KNN_NUM_CANDIDATES}
+                ),
+                return_exceptions=True,
             )
-        except HTTPException:
-            knn_hits = []
-
-    fused = rrf_fuse(knn_hits, bm_hits, top_k=k) if knn_hits else bm_hits[:k]
+            if isinstance(bm_res, BaseException):
+                raise bm_res
+            bm_hits = bm_res
+            if isinstance(knn_res, BaseException):
+                knn_err = getattr(knn_res, "detail", None) or str(knn_res)
+            else:
+                knn_hits = knn_res
+        else:
+            bm_hits = await _safe_search(async_search_bm25, "BM25", **hybrid)
+
+    fused = fuse([knn_hits, bm_hits], top_k=k, weights=FUSION_WEIGHTS) if knn_hits else bm_hits[:k]
+    with payload_meter() as fetch_payload:
+        fused = await _hydrate(es, fused)
     norm = [_normalize_hit(h) for h in fused]
     elapsed = (time.perf_counter() - t0) * 1000.0
     record("search", elapsed)
@@ -235,4 +353,13 @@ def search(body: SearchBody = Body(...)) -> Dict[str, Any]:
     if not norm and DEMO_FALLBACK:
         return {"results": _demo_results(), "mode": "demo", "__latency_ms": elapsed}
 
-    return {"results": norm, "mode": "hybrid", "__latency_ms": elapsed}
+    out = {
+        "results": norm,
+        "mode": "hybrid",
+        "bm25_tier": _tier_of(bm_hits),
+        "debug": _payload_debug(cand_payload, fetch_payload),
+        "__latency_ms": elapsed,
+    }
+    if knn_err:
+        out.update(degraded=True, warning=f"kNN failed, BM25-only results: {knn_err}")
+    return out
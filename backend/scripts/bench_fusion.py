@@ -0,0 +1,92 @@
+# backend/scripts/bench_fusion.py
+"""
+Micro-benchmark: rank_fusion.rrf_fuse (two lists, string keys, full sort)
+against services.fusion.fuse (per query) and fuse_many (one batched call).
+
+    python backend/scripts/bench_fusion.py
+    python backend/scripts/bench_fusion.py --pool 60 --pool 500 --queries 500 --top-k 10
+
+- synthetic kNN/BM25 hit lists shaped like elastic_client._format_hits output,
+  `pool` hits each with --overlap of the ids in common (random ranks)
+- reports microseconds per query (best of --repeat) and checks that fuse()
+  with method "rrf" returns exactly rrf_fuse's order
+- no Elasticsearch or Vertex needed
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+# backend/ on sys.path so the script can reuse services.* when run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.fusion import fuse, fuse_many
+from services.rank_fusion import rrf_fuse
+
+Hits = List[Dict[str, Any]]
+
+def _hit(doc: int, score: float) -> Dict[str, Any]:
+    src = {"doc_id": f"d{doc}", "page_num": 0}
+    return {"id": f"d{doc}::chunk::0", "score": score, "index": "bench", "source": src, "_source": src}
+
+def make_runs(n_queries: int, pool: int, overlap: float, seed: int) -> List[List[Hits]]:
+    """Per query [knn_hits, bm25_hits], each `pool` long, sharing overlap * pool ids."""
+    rng = random.Random(seed)
+    shared = int(pool * overlap)
+    runs = []
+    for _ in range(n_queries):
+        docs = rng.sample(range(pool * 4), 2 * pool - shared)
+        knn_docs = docs[:pool]
+        bm_docs = docs[:shared] + docs[pool:]
+        rng.shuffle(bm_docs)
+        knn = [_hit(d, 1.0 - i / (2.0 * pool)) for i, d in enumerate(knn_docs)]
+        bm25 = [_hit(d, 20.0 - 15.0 * i / pool) for i, d in enumerate(bm_docs)]
+        runs.append([knn, bm25])
+    return runs
+
+def _best_us(fn: Callable[[], Any], n_queries: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6 / n_queries
+
+def bench(pools: List[int], n_queries: int, top_k: int, overlap: float, repeat: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rows = []
+    for pool in pools:
+        runs = make_runs(n_queries, pool, overlap, seed)
+        same = all([h["id"] for h in rrf_fuse(knn, bm25, top_k=top_k)] == [h["id"] for h in fuse([knn, bm25], top_k=top_k, method="rrf")]
+                   for knn, bm25 in runs)
+        row = {
+            "pool": pool,
+            "same_order": same,
+            "rrf_fuse_us": _best_us(lambda runs=runs: [rrf_fuse(knn, bm25, top_k=top_k) for knn, bm25 in runs], n_queries, repeat),
+            "fuse_us": _best_us(lambda runs=runs: [fuse(r, top_k=top_k, method="rrf") for r in runs], n_queries, repeat),
+            "fuse_many_us": _best_us(lambda runs=runs: fuse_many(runs, top_k=top_k, method="rrf"), n_queries, repeat),
+            "linear_minmax_us": _best_us(lambda runs=runs: fuse_many(runs, top_k=top_k, method="linear", norm="minmax"), n_queries, repeat),
+            "linear_zscore_us": _best_us(lambda runs=runs: fuse_many(runs, top_k=top_k, method="linear", norm="zscore"), n_queries, repeat),
+        }
+        rows.append(row)
+        print(f"[bench] pool={pool:>5}  rrf_fuse {row['rrf_fuse_us']:>8.1f}us  fuse {row['fuse_us']:>8.1f}us  "
+              f"fuse_many {row['fuse_many_us']:>8.1f}us  linear(minmax/zscore) {row['linear_minmax_us']:>7.1f}/"
+              f"{row['linear_zscore_us']:.1f}us  per query  same_order={same}")
+    return rows
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="rrf_fuse vs services.fusion micro-benchmark")
+    ap.add_argument("--pool", type=int, action="append", help="hits per list (repeatable; default 60, 200, 1000)")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=12)
+    ap.add_argument("--overlap", type=float, default=0.3, help="share of ids in both lists")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="also write the rows here")
+    args = ap.parse_args()
+
+    out = bench(args.pool or [60, 200, 1000], args.queries, args.top_k, args.overlap, args.repeat)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
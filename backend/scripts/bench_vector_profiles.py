@@ -0,0 +1,258 @@
+# backend/scripts/bench_vector_profiles.py
+"""
+Compare dense_vector index profiles (dims x HNSW variant) on a sample of the
+live corpus: recall@k against exact float search, p50/p95 kNN latency and
+index size.
+
+    python backend/scripts/bench_vector_profiles.py --docs 20000 --queries 200 \
+        --profile 768:hnsw --profile 768:int8_hnsw --profile 256:int8_hnsw
+
+- a sample of chunks is read from ELASTIC_INDEX; each profile gets a scratch
+  index <index>_bench_<dims>_<type>, force-merged to one segment
+- native-dims doc vectors are read from _source when the index keeps them
+  there. Indices built by index_schema leave the vector out of _source
+  (ELASTIC_SOURCE_MODE=exclude_vectors), so they come from the local embedding
+  store instead, which ingest fills with the same model/dims; only texts the
+  store lacks cost Vertex calls
+- vectors at other dims come from Vertex output_dimensionality (through the
+  same store), or with --truncate from the native vectors cut to `dims` and
+  re-normalised, which costs no further Vertex calls
+- ground truth is exact cosine top-k over the float vectors of the first
+  profile's dims, computed in NumPy; recall@k = overlap / k
+- queries are the --queries file (JSON list, or {"items": [{"query": ...}]}
+  as used by /api/eval/precision) or, by default, the first words of sampled chunks
+- sizes come from index_schema.storage_stats() (store + _disk_usage per field)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk, scan
+
+# backend/ on sys.path so the script can reuse services.* when run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.elastic_client import VECTOR_FIELD, get_es
+from services.embedding_store import embed_with_store
+from services.index_schema import index_body, storage_stats, vector_dims
+from services.vertex_embeddings import embed_texts
+
+INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+EMBED_MODEL_ID = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+EMBED_BATCH = 64
+QUERY_WORDS = 12
+
+Profile = Tuple[int, str]  # (dims, index_options type)
+
+# ---------------------------------------------------------------------
+# Math
+# ---------------------------------------------------------------------
+def normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1.0, norms)
+
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Matryoshka-style reduction: keep the first `dims` components and re-normalise."""
+    return normalize(np.asarray(vectors, dtype=np.float32)[:, :dims])
+
+def exact_topk(docs: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Row indices of the k most cosine-similar docs per query, best first."""
+    sims = normalize(queries) @ normalize(docs).T
+    k = min(k, docs.shape[0])
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(sims, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+def recall_at_k(found: Sequence[Sequence[str]], truth: Sequence[Sequence[str]], k: int) -> float:
+    if not truth:
+        return 0.0
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / max(1, min(k, len(t))) for f, t in zip(found, truth)]))
+
+def percentile(values: Sequence[float], p: float) -> float:
+    return float(np.percentile(np.asarray(values, dtype=np.float64), p)) if values else 0.0
+
+# ---------------------------------------------------------------------
+# Data
+# ---------------------------------------------------------------------
+def sample_docs(es: Elasticsearch, index: str, n: int) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for hit in scan(es, index=index, query={"query": {"exists": {"field": "text"}}}, size=min(n, 1000)):
+        out.append({"_id": hit["_id"], **hit["_source"]})
+        if len(out) >= n:
+            break
+    return out
+
+def load_queries(path: Optional[str], docs: List[Dict[str, Any]], n: int, seed: int) -> List[str]:
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        items = raw.get("items", []) if isinstance(raw, dict) else raw
+        return [q["query"] if isinstance(q, dict) else str(q) for q in items][:n]
+    picked = random.Random(seed).sample(docs, min(n, len(docs)))
+    return [" ".join(d["text"].split()[:QUERY_WORDS]) for d in picked]
+
+def embed_all(texts: List[str], dims: int) -> np.ndarray:
+    def _vertex(batch: List[str]) -> List[List[float]]:
+        return embed_texts(batch, location=VERTEX_LOCATION, model=EMBED_MODEL_ID, use_cache=False, dims=dims)
+
+    vecs: List[List[float]] = []
+    for i in range(0, len(texts), EMBED_BATCH):
+        vecs.extend(embed_with_store(texts[i:i + EMBED_BATCH], _vertex, model=EMBED_MODEL_ID, dims=dims))
+    return np.asarray(vecs, dtype=np.float32)
+
+class Vectors:
+    """Doc/query vectors per dims: native vectors from _source if present, truncated or embedded otherwise."""
+
+    def __init__(self, docs: List[Dict[str, Any]], queries: List[str], native_dims: int, use_truncate: bool):
+        self.docs, self.queries = docs, queries
+        self.native_dims, self.use_truncate = native_dims, use_truncate
+        self._doc: Dict[int, np.ndarray] = {}
+        self._query: Dict[int, np.ndarray] = {}
+        stored = [d.get(VECTOR_FIELD) for d in docs]
+        if stored and all(v is not None and len(v) == native_dims for v in stored):
+            self._doc[native_dims] = np.asarray(stored, dtype=np.float32)
+        self.has_stored_native = native_dims in self._doc
+
+    def _native(self, cache: Dict[int, np.ndarray], texts: List[str]) -> np.ndarray:
+        if self.native_dims not in cache:
+            cache[self.native_dims] = embed_all(texts, self.native_dims)
+        return cache[self.native_dims]
+
+    def _get(self, cache: Dict[int, np.ndarray], texts: List[str], dims: int) -> np.ndarray:
+        if dims not in cache:
+            if self.use_truncate and dims < self.native_dims:
+                cache[dims] = truncate(self._native(cache, texts), dims)
+            else:
+                cache[dims] = embed_all(texts, dims)
+        return cache[dims]
+
+    def doc(self, dims: int) -> np.ndarray:
+        return self._get(self._doc, [d["text"] for d in self.docs], dims)
+
+    def query(self, dims: int) -> np.ndarray:
+        return self._get(self._query, self.queries, dims)
+
+# ---------------------------------------------------------------------
+# Per-profile run
+# ---------------------------------------------------------------------
+def bench_index_name(index: str, profile: Profile) -> str:
+    dims, kind = profile
+    return f"{index}_bench_{dims}_{kind or 'default'}"
+
+def build_index(es: Elasticsearch, name: str, profile: Profile, docs: List[Dict[str, Any]], vecs: np.ndarray) -> float:
+    """(Re)create `name`, load docs with `vecs`, force-merge to one segment. Returns load seconds."""
+    dims, kind = profile
+    es.indices.delete(index=name, ignore_unavailable=True)
+    es.indices.create(index=name, body=index_body(dims=dims, replicas=0, index_type=kind))
+    t0 = time.perf_counter()
+    actions = ({"_index": name, "_id": d["_id"], "_source": {"chunk_id": d.get("chunk_id"), "text": d["text"],
+                                                               VECTOR_FIELD: v.tolist()}}
+               for d, v in zip(docs, vecs))
+    bulk(es, actions, chunk_size=500, request_timeout=120)
+    es.indices.refresh(index=name)
+    es.indices.forcemerge(index=name, max_num_segments=1, request_timeout=600)
+    return time.perf_counter() - t0
+
+def run_queries(es: Elasticsearch, name: str, qvecs: np.ndarray, k: int, num_candidates: int,
+                repeat: int) -> Tuple[List[List[str]], List[float], List[float]]:
+    """Returns (ids per query, client latencies ms, server took ms); the first pass warms caches."""
+    ids: List[List[str]] = []
+    wall: List[float] = []
+    took: List[float] = []
+    for rnd in range(repeat + 1):
+        for qv in qvecs:
+            body = {"knn": {"field": VECTOR_FIELD, "query_vector": qv.tolist(), "k": k,
+                            "num_candidates": num_candidates}, "size": k, "_source": False}
+            t0 = time.perf_counter()
+            res = es.search(index=name, body=body)
+            ms = (time.perf_counter() - t0) * 1000.0
+            if rnd == 0:
+                ids.append([h["_id"] for h in res["hits"]["hits"]])
+            else:
+                wall.append(ms)
+                took.append(float(res.get("took") or 0))
+    return ids, wall, took
+
+def bench(
+    profiles: List[Profile],
+    es: Optional[Elasticsearch] = None,
+    index: str = INDEX,
+    n_docs: int = 5000,
+    n_queries: int = 100,
+    k: int = 10,
+    num_candidates: int = 100,
+    repeat: int = 3,
+    queries_file: Optional[str] = None,
+    use_truncate: bool = False,
+    keep: bool = False,
+    seed: int = 13,
+) -> List[Dict[str, Any]]:
+    es = es or get_es()
+    native = vector_dims(es, index) or max(d for d, _ in profiles)
+    docs = sample_docs(es, index, n_docs)
+    if not docs:
+        raise RuntimeError(f"no docs with text in {index}")
+    queries = load_queries(queries_file, docs, n_queries, seed)
+    vectors = Vectors(docs, queries, native, use_truncate)
+    if not vectors.has_stored_native:
+        print(f"[bench] {index} has no vectors in _source; native vectors come from the embedding store/Vertex")
+    print(f"[bench] {len(docs)} docs, {len(queries)} queries, k={k}, num_candidates={num_candidates}")
+
+    base_dims = profiles[0][0]
+    truth_rows = exact_topk(vectors.doc(base_dims), vectors.query(base_dims), k)
+    truth = [[docs[i]["_id"] for i in row] for row in truth_rows]
+
+    rows: List[Dict[str, Any]] = []
+    for profile in profiles:
+        dims, kind = profile
+        name = bench_index_name(index, profile)
+        load_s = build_index(es, name, profile, docs, vectors.doc(dims))
+        found, wall, took = run_queries(es, name, vectors.query(dims), k, num_candidates, repeat)
+        row = {"profile": f"{dims}:{kind or 'default'}", "index": name, "load_s": round(load_s, 1),
+               f"recall@{k}": round(recall_at_k(found, truth, k), 4),
+               "p50_ms": round(percentile(wall, 50), 2), "p95_ms": round(percentile(wall, 95), 2),
+               "took_p50_ms": round(percentile(took, 50), 2), "took_p95_ms": round(percentile(took, 95), 2),
+               **storage_stats(es, name)}
+        rows.append(row)
+        print(f"[bench] {row['profile']:>16} recall@{k}={row[f'recall@{k}']:.3f} "
+              f"p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms "
+              f"store={row['store_bytes'] / 1e6:.1f}MB vectors="
+              f"{(row['vector_bytes'] or 0) / 1e6:.1f}MB")
+        if not keep:
+            es.indices.delete(index=name, ignore_unavailable=True)
+    return rows
+
+def parse_profile(spec: str) -> Profile:
+    dims, _, kind = spec.partition(":")
+    return int(dims), kind
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark dense_vector profiles: recall@k, kNN latency, index size")
+    ap.add_argument("--index", default=INDEX, help="source index for the doc sample")
+    ap.add_argument("--profile", action="append", type=parse_profile,
+                    help="DIMS:TYPE, e.g. 768:hnsw or 256:int8_hnsw (repeatable; the first is the baseline)")
+    ap.add_argument("--docs", type=int, default=5000)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--queries-file", help="JSON list of queries or an eval groundtruth file")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--num-candidates", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=3, help="timed passes over the queries")
+    ap.add_argument("--truncate", action="store_true", help="derive reduced dims from native vectors, no Vertex calls")
+    ap.add_argument("--keep", action="store_true", help="keep the scratch indices")
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args()
+
+    profiles = args.profile or [(768, "hnsw"), (768, "int8_hnsw"), (256, "int8_hnsw")]
+    results = bench(profiles, index=args.index, n_docs=args.docs, n_queries=args.queries, k=args.k,
+                    num_candidates=args.num_candidates, repeat=args.repeat, queries_file=args.queries_file,
+                    use_truncate=args.truncate, keep=args.keep)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,196 @@
+# backend/scripts/compare_fusion.py
+"""
+Side-by-side latency and result overlap of hybrid fusion done by Elasticsearch
+(search_hybrid_rrf: one search with the rrf retriever, top-k shipped) against
+the current client-side path (search_hybrid_msearch + rank_fusion.rrf_fuse,
+plus the _mget of two-phase retrieval when RETRIEVAL_TWO_PHASE is on).
+
+    python backend/scripts/compare_fusion.py --queries eval.json --k 8
+    python backend/scripts/compare_fusion.py --sample 100 --team eng --json rrf.json
+
+- queries are the --queries file (JSON list, or {"items": [{"query": ...}]} as
+  used by /api/eval/precision) or the first words of --sample random chunks
+- query vectors come from Vertex through the local embedding store
+- both sides use the same k, window (rrf_fuse's pool, default max(60, k)),
+  rank constant and filters
+- latency: p50/p95 per side over --repeat runs per query (first run is warm-up,
+  sides alternate); payload: response bytes per query from payload_meter()
+- overlap@k = |server top-k ∩ client top-k| / k; top1 = same first hit
+- aborts when the cluster cannot fuse server-side (ES_RRF_SERVER=off, license, version)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from elasticsearch import Elasticsearch
+
+# backend/ on sys.path so the script can reuse services.* when run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.elastic_client import (
+    RRF_RANK_CONSTANT, fetch_sources, get_es, payload_meter, search_hybrid_msearch, search_hybrid_rrf,
+)
+from services.embedding_store import embed_with_store
+from services.rank_fusion import rrf_fuse
+from services.retrieval import TWO_PHASE
+from services.vertex_embeddings import embed_texts
+
+INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+EMBED_MODEL_ID = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+EMBED_BATCH = 64
+QUERY_WORDS = 8
+
+def load_queries(path: Optional[str], es: Elasticsearch, index: str, n: int, seed: int) -> List[str]:
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        items = raw.get("items", []) if isinstance(raw, dict) else raw
+        return [q["query"] if isinstance(q, dict) else str(q) for q in items][:n]
+    res = es.search(index=index, body={
+        "size": n,
+        "query": {"function_score": {"query": {"exists": {"field": "text"}}, "random_score": {"seed": seed, "field": "_seq_no"}}},
+        "_source": ["text"],
+    })
+    out = [" ".join((h["_source"].get("text") or "").split()[:QUERY_WORDS]) for h in res["hits"]["hits"]]
+    random.Random(seed).shuffle(out)
+    return [q for q in out if q]
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    def _vertex(batch: List[str]) -> List[List[float]]:
+        return embed_texts(batch, location=VERTEX_LOCATION, model=EMBED_MODEL_ID)
+
+    vecs: List[List[float]] = []
+    for i in range(0, len(queries), EMBED_BATCH):
+        vecs.extend(embed_with_store(queries[i:i + EMBED_BATCH], _vertex, model=EMBED_MODEL_ID))
+    return vecs
+
+def server_fn(es: Elasticsearch, index: str, k: int, window: int, filters: Optional[Dict[str, Any]]) -> Callable[[str, List[float]], List[Dict[str, Any]]]:
+    def run(query: str, vec: List[float]) -> List[Dict[str, Any]]:
+        res = search_hybrid_rrf(es, index, query, vec, k=k, window=window, filters=filters)
+        if res["fusion"] != "server":
+            raise RuntimeError("cluster cannot fuse server-side (see ES_RRF_SERVER / license); nothing to compare")
+        return res["fused"]
+    return run
+
+def client_fn(es: Elasticsearch, index: str, k: int, window: int, filters: Optional[Dict[str, Any]], two_phase: bool) -> Callable[[str, List[float]], List[Dict[str, Any]]]:
+    def run(query: str, vec: List[float]) -> List[Dict[str, Any]]:
+        res = search_hybrid_msearch(es, index, query, vec, k=window, filters=filters, source=False if two_phase else None)
+        fused = rrf_fuse(res["knn"], res["bm25"], top_k=k, k_const=RRF_RANK_CONSTANT) if res["knn"] else res["bm25"][:k]
+        return fetch_sources(es, index, fused) if two_phase else fused
+    return run
+
+def _timed(fn: Callable[[], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    with payload_meter() as payload:
+        t0 = time.perf_counter()
+        hits = fn()
+        ms = (time.perf_counter() - t0) * 1000.0
+    return {"ids": [h["id"] for h in hits], "ms": ms, "bytes": payload["bytes"]}
+
+def overlap_at_k(a: List[str], b: List[str], k: int) -> float:
+    return len(set(a[:k]) & set(b[:k])) / float(k) if k else 0.0
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    return {"p50": round(float(np.percentile(values, 50)), 2), "p95": round(float(np.percentile(values, 95)), 2),
+            "mean": round(float(np.mean(values)), 2)}
+
+def compare(
+    sides: Dict[str, Callable[[str, List[float]], List[Dict[str, Any]]]],
+    queries: List[str],
+    vectors: List[List[float]],
+    k: int,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    """Run both sides (keys "server", "client") per query; latency, payload and overlap summary."""
+    lat: Dict[str, List[float]] = {name: [] for name in sides}
+    size: Dict[str, List[float]] = {name: [] for name in sides}
+    per_query = []
+    for q, vec in zip(queries, vectors):
+        last: Dict[str, Dict[str, Any]] = {}
+        for i in range(repeat + 1):
+            order = list(sides) if i % 2 == 0 else list(reversed(list(sides)))
+            for name in order:
+                r = _timed(lambda side=sides[name], q=q, vec=vec: side(q, vec))
+                if i:  # run 0 is warm-up
+                    lat[name].append(r["ms"])
+                last[name] = r
+        for name in sides:
+            size[name].append(last[name]["bytes"])
+        s, c = last["server"]["ids"], last["client"]["ids"]
+        per_query.append({"query": q, "overlap": overlap_at_k(s, c, k), "top1": bool(s and c and s[0] == c[0]),
+                          "server": s, "client": c})
+    overlaps = [p["overlap"] for p in per_query]
+    return {
+        "queries": len(per_query),
+        "k": k,
+        "latency_ms": {name: _stats(v) for name, v in lat.items()},
+        "payload_bytes": {name: _stats(v) for name, v in size.items()},
+        "overlap_at_k": {"mean": round(float(np.mean(overlaps)), 3), "min": round(min(overlaps), 3)},
+        "top1_agreement": round(sum(p["top1"] for p in per_query) / len(per_query), 3),
+        "per_query": per_query,
+    }
+
+def print_report(rep: Dict[str, Any]) -> None:
+    print(f"\n{rep['queries']} queries, k={rep['k']}")
+    print(f"{'':>16} {'server (rrf)':>14} {'client':>14}")
+    for key in ("p50", "p95", "mean"):
+        name = f"latency {key}"
+        print(f"{name:>16} {rep['latency_ms']['server'][key]:>12.1f}ms {rep['latency_ms']['client'][key]:>12.1f}ms")
+    name = "payload p50"
+    print(f"{name:>16} {rep['payload_bytes']['server']['p50'] / 1e3:>12.1f}kB {rep['payload_bytes']['client']['p50'] / 1e3:>12.1f}kB")
+    print(f"overlap@{rep['k']}: mean {rep['overlap_at_k']['mean']:.3f}, min {rep['overlap_at_k']['min']:.3f}; "
+          f"top-1 agreement {rep['top1_agreement']:.1%}")
+    worst = sorted(rep["per_query"], key=lambda p: p["overlap"])[:3]
+    for p in worst:
+        if p["overlap"] < 1.0:
+            print(f"  {p['overlap']:.2f}  {p['query']!r}")
+
+def run(
+    es: Optional[Elasticsearch] = None,
+    index: str = INDEX,
+    queries_path: Optional[str] = None,
+    sample: int = 50,
+    k: int = 8,
+    window: Optional[int] = None,
+    repeat: int = 3,
+    team: Optional[str] = None,
+    two_phase: bool = TWO_PHASE,
+    seed: int = 7,
+) -> Dict[str, Any]:
+    es = es or get_es()
+    window = window or max(60, k)
+    filters = {"team": [team]} if team else None
+    queries = load_queries(queries_path, es, index, sample, seed)
+    if not queries:
+        raise RuntimeError(f"no queries (empty --queries file or no text in {index})")
+    vectors = embed_queries(queries)
+    sides = {"server": server_fn(es, index, k, window, filters),
+             "client": client_fn(es, index, k, window, filters, two_phase)}
+    rep = compare(sides, queries, vectors, k, repeat)
+    rep.update(index=index, window=window, filters=filters, two_phase=two_phase)
+    print_report(rep)
+    return rep
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Server-side (ES rrf retriever) vs client-side RRF: latency + overlap")
+    ap.add_argument("--index", default=INDEX)
+    ap.add_argument("--queries", help="JSON query file; default: sample chunk text")
+    ap.add_argument("--sample", type=int, default=50, help="queries to sample / take from the file")
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--window", type=int, help="candidates per leg (default max(60, k), as /api/chat)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per query and side")
+    ap.add_argument("--team", help="filter both sides on this team")
+    ap.add_argument("--single-phase", action="store_true", help="client candidates carry _source (no _mget)")
+    ap.add_argument("--json", help="also write the report here")
+    args = ap.parse_args()
+
+    out = run(index=args.index, queries_path=args.queries, sample=args.sample, k=args.k, window=args.window,
+              repeat=args.repeat, team=args.team, two_phase=TWO_PHASE and not args.single_phase)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
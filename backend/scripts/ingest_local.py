@@ -1,19 +1,53 @@
 # backend/scripts/ingest_local.py
 """
-Ingest local PDF/CSV/TXT into Elasticsearch with Vertex embeddings (text-embedding-005).
-Creates chunks, embeds, and indexes docs with a 'vector' field (dims=768).
+Bulk-ingest a local corpus (PDF/CSV/TXT/MD) into Elasticsearch with Vertex
+embeddings (text-embedding-005, 'vector' field, dims=768).
+
+    python backend/scripts/ingest_local.py docs/ "more/**/*.pdf" --team demo
+
+- files (dirs are walked, globs expanded) are extracted + chunked in a process
+  pool, one file per task, with the same chunker as /api/ingest
+- chunks are embedded in batches with a bounded number of Vertex calls in
+  flight; texts already in the local embedding store skip Vertex
+- documents are written with helpers.parallel_bulk as update+upsert (a
+  re-ingested chunk keeps its created_at), and a live files/sec +
+  chunks/sec line is printed while it runs
+- --bulk-load wraps the load in elastic_client.bulk_load_session() (no
+  refreshes, 0 replicas, restored afterwards even on failure); add
+  --forcemerge for a one-off rebuild
+
+Sync mode keeps one directory in step with the index:
+
+    python backend/scripts/ingest_local.py --sync /mnt/shared/docs            # one pass
+    python backend/scripts/ingest_local.py --sync /mnt/shared/docs --watch 60 # poll forever
+
+A manifest of doc_id -> (mtime, size, sha256) lives under INGEST_MANIFEST_DIR.
+Files whose mtime/size are unchanged are not even read; files whose bytes
+hash the same are skipped; new/changed files are re-ingested (their surplus
+chunks deleted) and removed files are deleted with delete_by_query on doc_id.
+A file only enters the manifest once all of its chunks were indexed, so
+failures are retried on the next pass.
 """
 
-import os, sys, json, re
-from typing import List, Sequence
+import argparse, glob, hashlib, json, os, sys, time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk
 
-from vertexai import init as vertex_init
-try:
-    from vertexai.language_models import TextEmbeddingModel  # type: ignore
-except Exception:
-    from vertexai.preview.language_models import TextEmbeddingModel  # type: ignore
+# backend/ on sys.path so the script can reuse services.* when run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.elastic_client import bulk_load_session  # noqa: E402
+from services.embedding_store import embed_with_store  # noqa: E402
+from services.index_schema import ensure_template, index_body  # noqa: E402
+from services.ingest_pipeline import (  # noqa: E402
+    chunk_id, content_hash, doc_id_of, embed as embed_stage, new_stats, upsert_action,
+)
+from services.vertex_embeddings import embed_texts  # noqa: E402
+from utils.chunker import chunk_file  # noqa: E402
 
 ES_CLOUD_ID = os.getenv("ES_CLOUD_ID")
 ES_API_KEY = os.getenv("ES_API_KEY_B64") or os.getenv("ES_API_KEY")
@@ -23,129 +57,353 @@
 VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
 EMBED_MODEL_ID = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
 
-CHUNK_SIZE = 900
-CHUNK_OVERLAP = 120
 EMBED_BATCH = 64
+EMBED_CONCURRENCY = 4
+BULK_THREADS = 4
+BULK_CHUNK = 500
+EXTENSIONS = (".pdf", ".csv", ".txt", ".md")
+REPORT_EVERY_S = 1.0
+MANIFEST_DIR = os.path.expanduser(os.getenv("INGEST_MANIFEST_DIR", "~/.cache/searchsphere/manifests"))
 
 def get_es() -> Elasticsearch:
     if not ES_CLOUD_ID or not ES_API_KEY:
         raise RuntimeError("Set ES_CLOUD_ID and ES_API_KEY_B64 (or ES_API_KEY)")
     return Elasticsearch(cloud_id=ES_CLOUD_ID, api_key=ES_API_KEY, request_timeout=60)
 
-def ensure_index(es: Elasticsearch):
-    mapping = {
-        "settings": {
-            "index": {"number_of_shards": 1, "number_of_replicas": 1, "knn": True}
-        },
-        "mappings": {
-            "properties": {
-                "title":    {"type": "text"},
-                "doc_id":   {"type": "keyword"},
-                "chunk_id": {"type": "keyword"},
-                "url":      {"type": "keyword"},
-                "text":     {"type": "text"},
-                "team":     {"type": "keyword"},
-                "doc_type": {"type": "keyword"},
-                "page_num": {"type": "integer"},
-                "vector":   {"type": "dense_vector", "dims": 768, "index": True, "similarity": "cosine"},
-            }
-        },
-    }
-    if not es.indices.exists(index=INDEX):
-        es.indices.create(index=INDEX, body=mapping)
-
-def read_text(path: str) -> str:
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".txt":
-        return open(path, "r", encoding="utf-8", errors="ignore").read()
-    if ext == ".csv":
-        try:
-            import pandas as pd  # type: ignore
-            df = pd.read_csv(path)
-            return df.to_string(index=False)
-        except Exception:
-            return open(path, "r", encoding="utf-8", errors="ignore").read()
-    if ext == ".pdf":
-        from PyPDF2 import PdfReader  # type: ignore
-        reader = PdfReader(path)
-        pages = [(p.extract_text() or "").strip() for p in reader.pages]
-        return "\n\n".join(pages)
-    raise ValueError(f"Unsupported file type: {ext}")
-
-def clean_whitespace(text: str) -> str:
-    text = re.sub(r"\s+", " ", text or " ")
-    return text.strip()
-
-def chunk(text: str, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> List[str]:
-    text = clean_whitespace(text)
-    if not text:
-        return []
-    if len(text) <= size:
-        return [text]
-    out: List[str] = []
-    i = 0
-    while i < len(text):
-        end = min(i + size, len(text))
-        out.append(text[i:end])
-        if end == len(text):
-            break
-        i = max(end - overlap, 0)
-    return out
+def ensure_index(es: Elasticsearch, index: str = INDEX):
+    if not es.indices.exists(index=index):
+        ensure_template(es)
+        es.indices.create(index=index, body=index_body())
 
-def embed(texts: Sequence[str]) -> List[List[float]]:
-    if not texts:
-        return []
-    vertex_init(project=GCP_PROJECT_ID, location=VERTEX_LOCATION)
-    model = TextEmbeddingModel.from_pretrained(EMBED_MODEL_ID)
-    vecs: List[List[float]] = []
-    for start in range(0, len(texts), EMBED_BATCH):
-        batch = list(texts[start:start+EMBED_BATCH])
-        resp = model.get_embeddings(batch)  # type: ignore[arg-type]
-        vecs.extend([e.values for e in resp])
-    return vecs
+# ---------------------------------------------------------------------
+# Corpus discovery
+# ---------------------------------------------------------------------
+def _glob_root(pattern: str) -> str:
+    parts = pattern.split(os.sep)
+    fixed = parts[:next(i for i, p in enumerate(parts) if glob.has_magic(p))]
+    return os.sep.join(fixed) or "."
+
+def discover(paths: Sequence[str], extensions: Sequence[str] = EXTENSIONS) -> List[Tuple[str, str]]:
+    """Expand files/dirs/globs into sorted (path, doc_id) pairs; doc_id is relative to the arg's root."""
+    exts = tuple(e.lower() for e in extensions)
+    found: Dict[str, str] = {}
+
+    def _add(path: str, root: str) -> None:
+        if os.path.isfile(path) and path.lower().endswith(exts):
+            found.setdefault(os.path.abspath(path), os.path.relpath(path, root))
+
+    for arg in paths:
+        if os.path.isdir(arg):
+            for root, _, names in os.walk(arg):
+                for name in names:
+                    _add(os.path.join(root, name), arg)
+        elif glob.has_magic(arg):
+            for m in glob.glob(arg, recursive=True):
+                _add(m, _glob_root(arg))
+        else:
+            _add(arg, os.path.dirname(arg) or ".")
+    return sorted(found.items(), key=lambda kv: kv[1])
 
 def guess_doc_type(path: str) -> str:
     return os.path.splitext(path)[1].lower().replace(".", "") or "text"
 
-def main(path: str, team: str = "demo"):
-    if not GCP_PROJECT_ID:
-        raise RuntimeError("Set GCP_PROJECT_ID")
-    if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-        raise RuntimeError("Set GOOGLE_APPLICATION_CREDENTIALS to your service-account JSON")
-
-    es = get_es()
-    ensure_index(es)
-
-    title = os.path.basename(path)
-    doc_type = guess_doc_type(path)
-    raw = read_text(path)
-    parts = chunk(raw)
-    if not parts:
-        print("No text extracted from file; nothing to index.")
-        return
-
-    vecs = embed(parts)
-    if len(vecs) != len(parts):
-        raise RuntimeError(f"Embedding count mismatch: {len(vecs)} vs chunks {len(parts)}")
-
-    for i, (txt, vec) in enumerate(zip(parts, vecs)):
-        doc = {
-            "title": title,
-            "doc_id": title,
-            "chunk_id": f"{title}::chunk::{i}",
-            "url": f"local://{path}",
-            "text": txt,
-            "team": team,
-            "doc_type": doc_type,
-            "page_num": i,       # simple index (pdf page mapping would need extra tracking)
-            "vector": vec,
-        }
-        es.index(index=INDEX, id=f"{title}_{i}", document=doc)
-
-    print(f"✅ Indexed {len(parts)} chunks into '{INDEX}' from {path}")
+# ---------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------
+class Progress:
+    def __init__(self, total_files: int):
+        self.t0 = time.perf_counter()
+        self.total_files = total_files
+        self.files = self.chunks = self.indexed = self.errors = 0
+        self.expected: Dict[str, List[str]] = {}  # doc_id -> chunk ids produced
+        self.written: Dict[str, int] = {}    # doc_id -> chunks indexed
+        self.failed: Set[str] = set()        # doc_ids that failed to parse
+        self._last = 0.0
+
+    def complete(self) -> Set[str]:
+        """doc_ids whose every chunk was indexed."""
+        return {d for d, ids in self.expected.items() if d not in self.failed and self.written.get(d, 0) == len(ids)}
+
+    def report(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last < REPORT_EVERY_S:
+            return
+        self._last = now
+        el = max(1e-9, now - self.t0)
+        line = (f"[ingest] files {self.files}/{self.total_files} ({self.files / el:.1f}/s) | "
+                f"chunks {self.chunks} | indexed {self.indexed} ({self.indexed / el:.1f}/s) | errors {self.errors}")
+        end = "\n" if force or not sys.stdout.isatty() else "\r"
+        print(line, end=end, flush=True)
+
+def parse_files(
+    files: Sequence[Tuple[str, str]],
+    pool: ProcessPoolExecutor,
+    progress: Progress,
+    window: int,
+) -> Iterator[Tuple[str, str, List[Tuple[Optional[int], str]]]]:
+    """Parse files in the pool with at most `window` in flight; yields as they finish."""
+    todo = iter(files)
+    inflight: Dict[Future, Tuple[str, str]] = {}
+    while True:
+        while len(inflight) < window:
+            nxt = next(todo, None)
+            if nxt is None:
+                break
+            inflight[pool.submit(chunk_file, nxt[0])] = nxt
+        if not inflight:
+            return
+        done, _ = wait(set(inflight), return_when=FIRST_COMPLETED)
+        for fut in done:
+            path, doc_id = inflight.pop(fut)
+            progress.files += 1
+            try:
+                yield path, doc_id, fut.result()
+            except Exception as e:
+                progress.errors += 1
+                progress.failed.add(doc_id)
+                print(f"\n[ingest] {doc_id}: {type(e).__name__}: {e}")
+
+def to_docs(parsed, team: str, progress: Progress) -> Iterator[Dict[str, Any]]:
+    for path, doc_id, chunks in parsed:
+        now = datetime.utcnow().isoformat()
+        ids = progress.expected[doc_id] = []
+        per_page: Dict[Optional[int], int] = {}
+        for page_num, text in chunks:
+            n = per_page[page_num] = per_page.get(page_num, 0) + 1
+            ids.append(chunk_id(doc_id, page_num, n - 1))
+            doc = {
+                "doc_id": doc_id,
+                "chunk_id": ids[-1],
+                "title": os.path.basename(path),
+                "text": text,
+                "source": "local",
+                "url": f"local://{path}",
+                "tags": [],
+                "team": team,
+                "doc_type": guess_doc_type(path),
+                "created_at": now,
+                "updated_at": now,
+                "page_num": page_num,
+            }
+            doc["content_hash"] = content_hash(doc)
+            progress.chunks += 1
+            yield doc
+
+def embed_vertex(texts: Sequence[str]) -> List[List[float]]:
+    return embed_texts(list(texts), location=VERTEX_LOCATION, model=EMBED_MODEL_ID, use_cache=False)
+
+def embed(texts: Sequence[str]) -> List[List[float]]:
+    # Unchanged chunk texts come from the local embedding store (EMBED_STORE_DIR)
+    return embed_with_store(list(texts), embed_vertex, model=EMBED_MODEL_ID)
+
+# ---------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------
+def ingest_files(
+    files: Sequence[Tuple[str, str]],
+    team: str = "demo",
+    index: str = INDEX,
+    workers: int = max(1, (os.cpu_count() or 2) - 1),
+    embed_batch: int = EMBED_BATCH,
+    embed_concurrency: int = EMBED_CONCURRENCY,
+    bulk_threads: int = BULK_THREADS,
+    bulk_chunk: int = BULK_CHUNK,
+    es: Optional[Elasticsearch] = None,
+    embed_fn=None,
+    bulk_load: bool = False,
+    forcemerge: bool = False,
+) -> Dict[str, Any]:
+    """Ingest (path, doc_id) pairs; returns counts plus the doc_ids that were fully indexed."""
+    es = es or get_es()
+    ensure_index(es, index)
+    progress = Progress(len(files))
+    stats = new_stats()
+
+    session_cm = (bulk_load_session(index, es=es, chunk_size=bulk_chunk, thread_count=bulk_threads,
+                                    forcemerge=forcemerge) if bulk_load else nullcontext())
+    # Pool first, before the embed/bulk threads exist
+    with ProcessPoolExecutor(max_workers=workers) as pool, session_cm as session:
+        docs = to_docs(parse_files(files, pool, progress, window=workers * 2), team, progress)
+        embedded = embed_stage(docs, stats, batch_size=embed_batch, concurrency=embed_concurrency,
+                               embed_fn=embed_fn or embed)
+        # update+upsert: re-ingesting a file (e.g. --sync) keeps its chunks' created_at
+        actions = (upsert_action(index, d) for d in embedded)
+        results = session.stream(actions) if session is not None else parallel_bulk(
+            es, actions, thread_count=bulk_threads, chunk_size=bulk_chunk,
+            raise_on_error=False, raise_on_exception=False)
+        for ok, item in results:
+            if ok:
+                progress.indexed += 1
+                doc_id = doc_id_of(next(iter(item.values()))["_id"])
+                progress.written[doc_id] = progress.written.get(doc_id, 0) + 1
+            else:
+                progress.errors += 1
+            progress.report()
+
+    progress.errors += stats["stages"]["embed"]["errors"]
+    for err in stats["errors"]:
+        print(f"\n[ingest] {err}")
+    if not bulk_load:  # the session already refreshed once on exit
+        es.indices.refresh(index=index)
+    progress.report(force=True)
+    return {"files": progress.files, "chunks": progress.chunks, "indexed": progress.indexed,
+            "errors": progress.errors, "seconds": round(time.perf_counter() - progress.t0, 1),
+            "complete": progress.complete(), "chunks_by_doc": dict(progress.expected)}
+
+def main(paths: Sequence[str], **kw: Any) -> Dict[str, Any]:
+    files = discover(paths)
+    if not files:
+        print("No matching files; nothing to index.")
+        return {"files": 0, "indexed": 0}
+    return ingest_files(files, **kw)
+
+# ---------------------------------------------------------------------
+# Sync mode
+# ---------------------------------------------------------------------
+def manifest_path(root: str, index: str) -> str:
+    key = hashlib.sha1(f"{os.path.abspath(root)}|{index}".encode()).hexdigest()[:16]
+    return os.path.join(MANIFEST_DIR, f"{index}-{key}.json")
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_manifest(path: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmp, path)
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def plan_sync(
+    files: Sequence[Tuple[str, str]],
+    manifest: Dict[str, Dict[str, Any]],
+) -> Tuple[List[Tuple[str, str]], Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Split the current files into (to_ingest, entries, removed):
+    entries holds the fresh manifest entry of every current file, to_ingest the
+    files whose content changed, removed the doc_ids no longer on disk.
+    """
+    to_ingest: List[Tuple[str, str]] = []
+    entries: Dict[str, Dict[str, Any]] = {}
+    for path, doc_id in files:
+        st = os.stat(path)
+        old = manifest.get(doc_id)
+        if old and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+            entries[doc_id] = old
+            continue
+        digest = file_sha256(path)
+        entries[doc_id] = {"mtime": st.st_mtime, "size": st.st_size, "sha256": digest}
+        if not old or old.get("sha256") != digest:
+            to_ingest.append((path, doc_id))
+    current = {doc_id for _, doc_id in files}
+    removed = sorted(d for d in manifest if d not in current)
+    return to_ingest, entries, removed
+
+def delete_docs(es: Elasticsearch, index: str, doc_ids: Sequence[str], batch: int = 500) -> int:
+    deleted = 0
+    for i in range(0, len(doc_ids), batch):
+        resp = es.delete_by_query(index=index, query={"terms": {"doc_id": list(doc_ids[i:i + batch])}},
+                                  conflicts="proceed", refresh=True)
+        deleted += resp.get("deleted", 0)
+    return deleted
+
+def delete_surplus(es: Elasticsearch, index: str, doc_id: str, keep: Sequence[str]) -> int:
+    """Remove chunks a changed file no longer produces (`keep` = the chunk ids it does produce)."""
+    resp = es.delete_by_query(index=index, conflicts="proceed", refresh=True, query={
+        "bool": {"filter": [{"term": {"doc_id": doc_id}}], "must_not": [{"ids": {"values": keep}}]},
+    })
+    return resp.get("deleted", 0)
+
+def sync(
+    root: str,
+    index: str = INDEX,
+    manifest_file: Optional[str] = None,
+    es: Optional[Elasticsearch] = None,
+    **kw: Any,
+) -> Dict[str, Any]:
+    """One incremental pass over `root`; see the module docstring."""
+    t0 = time.perf_counter()
+    manifest_file = manifest_file or manifest_path(root, index)
+    manifest = load_manifest(manifest_file)
+    files = discover([root])
+    to_ingest, entries, removed = plan_sync(files, manifest)
+    out: Dict[str, Any] = {"files": len(files), "changed": len(to_ingest), "removed": len(removed),
+                           "failed": 0, "chunks_deleted": 0}
+
+    if to_ingest or removed:
+        es = es or get_es()
+    if to_ingest:
+        res = ingest_files(to_ingest, index=index, es=es, **kw)
+        ok = res["complete"]
+        for _, doc_id in to_ingest:
+            if doc_id in ok:
+                out["chunks_deleted"] += delete_surplus(es, index, doc_id, res["chunks_by_doc"][doc_id])
+            else:
+                # leave it out of the manifest (or keep the old entry) so the next pass retries it
+                if doc_id in manifest:
+                    entries[doc_id] = manifest[doc_id]
+                else:
+                    entries.pop(doc_id, None)
+                out["failed"] += 1
+    if removed:
+        out["chunks_deleted"] += delete_docs(es, index, removed)
+
+    save_manifest(manifest_file, entries)
+    out["seconds"] = round(time.perf_counter() - t0, 2)
+    print(f"[sync] {root}: {out['files']} files, {out['changed']} changed, {out['removed']} removed, "
+          f"{out['failed']} failed, {out['chunks_deleted']} chunks deleted in {out['seconds']}s")
+    return out
+
+def watch(root: str, interval: float, **kw: Any) -> None:
+    """Poll `root` every `interval` seconds (stat-only when nothing changed)."""
+    while True:
+        try:
+            sync(root, **kw)
+        except Exception as e:
+            print(f"[sync] pass failed: {type(e).__name__}: {e}")
+        time.sleep(interval)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python backend/scripts/ingest_local.py <file> [team]")
-        sys.exit(1)
-    main(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "demo")
+    ap = argparse.ArgumentParser(description="Bulk-ingest local files/directories/globs into Elasticsearch")
+    ap.add_argument("paths", nargs="*", help="files, directories (walked recursively) or glob patterns")
+    ap.add_argument("--sync", metavar="DIR", help="incrementally sync DIR with the index (manifest-based)")
+    ap.add_argument("--watch", type=float, metavar="SECONDS", help="with --sync: keep polling every SECONDS")
+    ap.add_argument("--manifest", help="manifest file for --sync (default under INGEST_MANIFEST_DIR)")
+    ap.add_argument("--team", default="demo")
+    ap.add_argument("--index", default=INDEX)
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="parser processes")
+    ap.add_argument("--embed-batch", type=int, default=EMBED_BATCH)
+    ap.add_argument("--embed-concurrency", type=int, default=EMBED_CONCURRENCY, help="Vertex calls in flight")
+    ap.add_argument("--bulk-threads", type=int, default=BULK_THREADS)
+    ap.add_argument("--bulk-chunk", type=int, default=BULK_CHUNK)
+    ap.add_argument("--bulk-load", action="store_true", help="disable refresh/replicas during the load")
+    ap.add_argument("--forcemerge", action="store_true", help="with --bulk-load: force-merge afterwards")
+    args = ap.parse_args()
+    if not args.paths and not args.sync:
+        ap.error("give paths to ingest or --sync DIR")
+
+    if not GCP_PROJECT_ID:
+        raise SystemExit("Set GCP_PROJECT_ID")
+    if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+        raise SystemExit("Set GOOGLE_APPLICATION_CREDENTIALS to your service-account JSON")
+    opts = dict(team=args.team, index=args.index, workers=args.workers,
+                embed_batch=args.embed_batch, embed_concurrency=args.embed_concurrency,
+                bulk_threads=args.bulk_threads, bulk_chunk=args.bulk_chunk,
+                bulk_load=args.bulk_load, forcemerge=args.forcemerge)
+    if args.sync and args.watch:
+        watch(args.sync, args.watch, manifest_file=args.manifest, **opts)
+    elif args.sync:
+        sync(args.sync, manifest_file=args.manifest, **opts)
+    else:
+        main(args.paths, **opts)
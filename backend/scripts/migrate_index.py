@@ -0,0 +1,360 @@
+# backend/scripts/migrate_index.py
+"""
+Zero-downtime re-embedding: copy the live index into a new versioned index
+with vectors from a new embedding model, then flip the ELASTIC_INDEX alias.
+
+    python backend/scripts/migrate_index.py --model text-embedding-005 --dims 768
+    python backend/scripts/migrate_index.py --dims 256 --index-type int8_hnsw --rate 200
+    python backend/scripts/migrate_index.py ... --no-swap     # copy now, --swap-only later
+
+- the target is <alias>_vN (next free N, at least 2), created from
+  services.index_schema with the new dims
+- every chunk is read from the live index through a point-in-time with
+  search_after, sorted on chunk_id so the cursor stays valid after the PIT
+  expires or the process dies
+- texts are re-embedded in batches (at most --rate texts/sec across
+  --embed-concurrency calls) through the local embedding store, so a retried
+  page does not pay Vertex twice
+- pages are written with elastic_client.bulk_load_session() (no refresh,
+  0 replicas until the copy ends)
+- a JSON checkpoint under MIGRATE_CHECKPOINT_DIR records the target, model
+  and cursor after every fully written page; rerunning the same command
+  resumes from it (--restart drops it and the partial target)
+- the alias is swapped in a single _aliases call, so searches see either the
+  old or the new index, never neither. If ELASTIC_INDEX is still a concrete
+  index (first migration) the same call deletes it, which needs --replace-index.
+
+The old index is kept after the swap for rollback unless --delete-old is given.
+Chunks written to the live index during the copy are not carried over; pause
+ingest or re-run a sync (ingest_local.py --sync) after the swap.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from elasticsearch import Elasticsearch
+
+# backend/ on sys.path so the script can reuse services.* when run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.elastic_client import VECTOR_FIELD, bulk_load_session, get_es
+from services.embedding_store import embed_with_store
+from services.index_schema import HNSW_EF_CONSTRUCTION, HNSW_M, VECTOR_INDEX_TYPE, ensure_template, index_body
+from services.vertex_embeddings import EMBED_DIMS, embed_texts
+
+ALIAS = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+EMBED_MODEL_ID = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+CHECKPOINT_DIR = os.path.expanduser(os.getenv("MIGRATE_CHECKPOINT_DIR", "~/.cache/searchsphere/migrations"))
+
+PAGE_SIZE = 500
+EMBED_BATCH = 64
+EMBED_CONCURRENCY = 4
+EMBED_RETRIES = 4
+PIT_KEEP_ALIVE = "5m"
+REPORT_EVERY_S = 1.0
+
+# ---------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------
+def checkpoint_path(alias: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{alias}.json")
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+# ---------------------------------------------------------------------
+# Throttled embedding
+# ---------------------------------------------------------------------
+class Throttle:
+    """Spaces calls so that at most `per_sec` texts are sent per second (<= 0: unlimited)."""
+
+    def __init__(self, per_sec: float):
+        self.per_sec = per_sec
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self, n: int) -> None:
+        if self.per_sec <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + n / self.per_sec
+        if start > now:
+            time.sleep(start - now)
+
+def make_embed_fn(model: str, dims: int, rate: float,
+                  embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None
+                  ) -> Callable[[List[str]], List[List[float]]]:
+    """Store-backed embed fn for `model` that throttles Vertex calls and retries with backoff."""
+    throttle = Throttle(rate)
+    raw = embed_fn or (lambda texts: embed_texts(texts, location=VERTEX_LOCATION, model=model,
+                                                 use_cache=False, dims=dims))
+
+    def _vertex(texts: List[str]) -> List[List[float]]:
+        for attempt in range(EMBED_RETRIES):
+            throttle.wait(len(texts))
+            try:
+                return raw(texts)
+            except Exception as e:
+                if attempt == EMBED_RETRIES - 1:
+                    raise
+                print(f"\n[migrate] embed failed ({type(e).__name__}: {e}); retry {attempt + 1}")
+                time.sleep(2 ** attempt)
+        return []
+
+    def _embed(texts: List[str]) -> List[List[float]]:
+        vecs = embed_with_store(texts, _vertex, model=model, dims=dims)
+        bad = next((len(v) for v in vecs if len(v) != dims), None)
+        if bad is not None:
+            raise RuntimeError(f"{model} returned {bad}-dim vectors, target index expects {dims}")
+        return vecs
+    return _embed
+
+# ---------------------------------------------------------------------
+# Indices + alias
+# ---------------------------------------------------------------------
+def resolve_alias(es: Elasticsearch, alias: str) -> Optional[str]:
+    """Index currently behind `alias`; None when `alias` is a concrete index (or missing)."""
+    if not es.indices.exists_alias(name=alias):
+        return None
+    indices = sorted(dict(es.indices.get_alias(name=alias)))
+    if len(indices) != 1:
+        raise RuntimeError(f"alias {alias} points at {indices}; expected exactly one index")
+    return indices[0]
+
+def next_version(es: Elasticsearch, alias: str) -> str:
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    taken = [int(m.group(1)) for name in dict(es.indices.get(index=f"{alias}_v*")) if (m := pattern.match(name))]
+    return f"{alias}_v{max(taken + [1]) + 1}"
+
+def swap_alias(es: Elasticsearch, alias: str, target: str, replace_index: bool = False) -> List[Dict[str, Any]]:
+    """Point `alias` at `target` in one atomic _aliases call; returns the actions sent."""
+    if es.indices.exists_alias(name=alias):
+        actions = [{"remove": {"index": i, "alias": alias}} for i in dict(es.indices.get_alias(name=alias))]
+    elif es.indices.exists(index=alias):
+        if not replace_index:
+            raise RuntimeError(f"{alias} is a concrete index; pass --replace-index to delete it "
+                               f"and create the alias in the same call")
+        actions = [{"remove_index": {"index": alias}}]
+    else:
+        actions = []
+    actions.append({"add": {"index": target, "alias": alias}})
+    es.indices.update_aliases(actions=actions)
+    return actions
+
+# ---------------------------------------------------------------------
+# Copy
+# ---------------------------------------------------------------------
+class Progress:
+    def __init__(self, total: int, done: int):
+        self.t0 = time.perf_counter()
+        self.total, self.start, self.done = total, done, done
+        self._last = 0.0
+
+    def report(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last < REPORT_EVERY_S:
+            return
+        self._last = now
+        rate = (self.done - self.start) / max(1e-9, now - self.t0)
+        left = max(0, self.total - self.done)
+        eta = time.strftime("%H:%M:%S", time.gmtime(left / rate)) if rate > 0 else "--:--:--"
+        pct = 100.0 * self.done / self.total if self.total else 100.0
+        line = f"[migrate] {self.done}/{self.total} ({pct:.1f}%) | {rate:.1f} docs/s | ETA {eta}"
+        end = "\n" if force or not sys.stdout.isatty() else "\r"
+        print(line, end=end, flush=True)
+
+def iter_pages(es: Elasticsearch, index: str, after: Optional[List[Any]], size: int = PAGE_SIZE):
+    """Yield pages of hits from a point-in-time on `index`, sorted on chunk_id, starting after `after`."""
+    pit = es.open_point_in_time(index=index, keep_alive=PIT_KEEP_ALIVE)["id"]
+    try:
+        while True:
+            body: Dict[str, Any] = {
+                "size": size,
+                "sort": [{"chunk_id": "asc"}],
+                "pit": {"id": pit, "keep_alive": PIT_KEEP_ALIVE},
+                "_source": {"excludes": [VECTOR_FIELD]},
+                "track_total_hits": False,
+            }
+            if after:
+                body["search_after"] = after
+            resp = es.search(body=body)
+            pit = resp.get("pit_id") or pit
+            hits = resp["hits"]["hits"]
+            if not hits:
+                return
+            yield hits
+            after = hits[-1]["sort"]
+    finally:
+        try:
+            es.close_point_in_time(id=pit)
+        except Exception:
+            pass
+
+def _embed_page(hits: List[Dict[str, Any]], embed_fn, pool: ThreadPoolExecutor, batch: int) -> List[Dict[str, Any]]:
+    texts = [h["_source"].get("text") or "" for h in hits]
+    parts = list(pool.map(embed_fn, [texts[i:i + batch] for i in range(0, len(texts), batch)]))
+    vecs = [v for part in parts for v in part]
+    if len(vecs) != len(hits):
+        raise RuntimeError(f"embedding count mismatch: {len(vecs)} vs {len(hits)}")
+    return [{"_op_type": "index", "_id": h["_id"], "_source": {**h["_source"], VECTOR_FIELD: v}}
+            for h, v in zip(hits, vecs)]
+
+def copy_index(
+    es: Elasticsearch,
+    state: Dict[str, Any],
+    ckpt_file: str,
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    page_size: int = PAGE_SIZE,
+    embed_batch: int = EMBED_BATCH,
+    embed_concurrency: int = EMBED_CONCURRENCY,
+) -> Dict[str, Any]:
+    """
+    Stream state["source"] into state["target"] from state["after"] on.
+    The checkpoint only advances past a page once every doc in it was written,
+    so a crash or a failed page is retried from the last good page.
+    """
+    progress = Progress(state["total"], state["copied"])
+    with bulk_load_session(state["target"], es=es) as session, \
+            ThreadPoolExecutor(max_workers=max(1, embed_concurrency), thread_name_prefix="migrate-embed") as pool:
+        for hits in iter_pages(es, state["source"], state.get("after"), page_size):
+            actions = _embed_page(hits, embed_fn, pool, embed_batch)
+            errors = [item for ok, item in session.stream(actions) if not ok]
+            if errors:
+                raise RuntimeError(f"{len(errors)} bulk errors on page after {state.get('after')}: {errors[:3]}")
+            state["after"] = hits[-1]["sort"]
+            state["copied"] += len(hits)
+            save_checkpoint(ckpt_file, state)
+            progress.done = state["copied"]
+            progress.report()
+    progress.report(force=True)
+    return state
+
+# ---------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------
+def migrate(
+    alias: str = ALIAS,
+    model: str = EMBED_MODEL_ID,
+    dims: int = EMBED_DIMS,
+    index_type: str = VECTOR_INDEX_TYPE,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+    es: Optional[Elasticsearch] = None,
+    rate: float = 0.0,
+    swap: bool = True,
+    swap_only: bool = False,
+    restart: bool = False,
+    replace_index: bool = False,
+    delete_old: bool = False,
+    checkpoint_file: Optional[str] = None,
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    **kw: Any,
+) -> Dict[str, Any]:
+    """Run (or resume) a migration of `alias` to `model`/`dims`; returns the final checkpoint state."""
+    es = es or get_es()
+    ckpt_file = checkpoint_file or checkpoint_path(alias)
+    state = load_checkpoint(ckpt_file)
+
+    if state and restart:
+        print(f"[migrate] dropping checkpoint and partial index {state['target']}")
+        es.indices.delete(index=state["target"], ignore_unavailable=True)
+        os.remove(ckpt_file)
+        state = None
+    if state and (state["model"], state["dims"]) != (model, dims) and not swap_only:
+        raise RuntimeError(f"checkpoint {ckpt_file} is for {state['model']}/{state['dims']}; "
+                           f"finish it or pass --restart")
+
+    if state is None:
+        if swap_only:
+            raise RuntimeError(f"no migration checkpoint at {ckpt_file}")
+        source = resolve_alias(es, alias) or alias
+        missing = es.count(index=source, query={"bool": {"must_not": {"exists": {"field": "chunk_id"}}}})["count"]
+        if missing:
+            raise RuntimeError(f"{missing} docs in {source} have no chunk_id; the copy cursor needs one per doc")
+        target = next_version(es, alias)
+        vector = {"index_type": index_type, "m": m, "ef_construction": ef_construction}
+        es.indices.create(index=target, body=index_body(dims=dims, **vector))
+        state = {"alias": alias, "source": source, "target": target, "model": model, "dims": dims,
+                 "vector": vector,
+                 "total": es.count(index=source)["count"], "copied": 0, "after": None,
+                 "phase": "copy", "started_at": time.time()}
+        save_checkpoint(ckpt_file, state)
+        print(f"[migrate] {source} -> {target} ({model}, dims={dims}, {state['total']} docs)")
+    else:
+        print(f"[migrate] resuming {state['source']} -> {state['target']} at {state['copied']}/{state['total']}")
+
+    if state["phase"] == "copy" and swap_only:
+        raise RuntimeError(f"copy to {state['target']} is not finished ({state['copied']}/{state['total']})")
+    if state["phase"] == "copy":
+        fn = make_embed_fn(model, dims, rate, embed_fn)
+        copy_index(es, state, ckpt_file, fn, **kw)
+        state["phase"] = "copied"
+        save_checkpoint(ckpt_file, state)
+
+    if state["phase"] == "copied" and swap:
+        es.indices.refresh(index=state["target"])
+        n = es.count(index=state["target"])["count"]
+        if n < state["copied"]:
+            raise RuntimeError(f"{state['target']} holds {n} docs but {state['copied']} were copied; not swapping")
+        actions = swap_alias(es, alias, state["target"], replace_index=replace_index)
+        print(f"[migrate] alias {alias} -> {state['target']} ({len(actions)} actions)")
+        # future indices get the new dims and the vector layout the target was built with
+        # (checkpoints from before "vector" was recorded fall back to this run's options)
+        vector = state.get("vector") or {"index_type": index_type, "m": m, "ef_construction": ef_construction}
+        ensure_template(es, alias, dims=state["dims"], **vector)
+        if delete_old and state["source"] != alias:
+            es.indices.delete(index=state["source"], ignore_unavailable=True)
+            print(f"[migrate] deleted {state['source']}")
+        state["phase"] = "swapped"
+        state["swapped_at"] = time.time()
+        os.remove(ckpt_file)  # done; the next run starts a fresh migration
+    elif state["phase"] == "copied":
+        print(f"[migrate] copy complete; run with --swap-only to point {alias} at {state['target']}")
+    return state
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Re-embed the live index into a new versioned index and swap the alias")
+    ap.add_argument("--alias", default=ALIAS, help="alias searches use (default ELASTIC_INDEX)")
+    ap.add_argument("--model", default=EMBED_MODEL_ID, help="new embedding model id")
+    ap.add_argument("--dims", type=int, default=EMBED_DIMS, help="vector dims (output_dimensionality) of the new index")
+    ap.add_argument("--index-type", default=VECTOR_INDEX_TYPE, help="dense_vector index_options type, e.g. int8_hnsw")
+    ap.add_argument("--m", type=int, default=HNSW_M, help="HNSW graph degree of the new index")
+    ap.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION, help="HNSW build beam of the new index")
+    ap.add_argument("--rate", type=float, default=0.0, help="max texts/sec sent to Vertex (0 = unlimited)")
+    ap.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    ap.add_argument("--embed-batch", type=int, default=EMBED_BATCH)
+    ap.add_argument("--embed-concurrency", type=int, default=EMBED_CONCURRENCY, help="Vertex calls in flight")
+    ap.add_argument("--checkpoint", help="checkpoint file (default under MIGRATE_CHECKPOINT_DIR)")
+    ap.add_argument("--no-swap", action="store_true", help="copy only; leave the alias alone")
+    ap.add_argument("--swap-only", action="store_true", help="swap the alias for a finished copy")
+    ap.add_argument("--restart", action="store_true", help="discard the checkpoint and the partial target index")
+    ap.add_argument("--replace-index", action="store_true",
+                    help="first migration: delete the concrete index named like the alias in the swap")
+    ap.add_argument("--delete-old", action="store_true", help="delete the previous index after the swap")
+    args = ap.parse_args()
+
+    migrate(alias=args.alias, model=args.model, dims=args.dims, index_type=args.index_type, m=args.m,
+            ef_construction=args.ef_construction, rate=args.rate,
+            swap=not args.no_swap, swap_only=args.swap_only, restart=args.restart,
+            replace_index=args.replace_index, delete_old=args.delete_old, checkpoint_file=args.checkpoint,
+            page_size=args.page_size, embed_batch=args.embed_batch, embed_concurrency=args.embed_concurrency)
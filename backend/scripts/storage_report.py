@@ -0,0 +1,169 @@
+# backend/scripts/storage_report.py
+"""
+Before/after report for the storage-optimized index layout (services/index_schema.py):
+store size, _source and vector bytes, segment count and query latency.
+
+    python backend/scripts/storage_report.py                      # copy ELASTIC_INDEX and compare
+    python backend/scripts/storage_report.py --after searchsphere_docs_v3   # compare two indices
+
+- "before" is the index behind ELASTIC_INDEX (or --before)
+- without --after, a copy <before>_storage is created from index_body() and
+  filled with _reindex. The copy needs the vectors in the old _source, so an
+  index that already excludes them has to be compared with --after.
+- latency is measured with the app's own helpers (search_bm25 / search_knn),
+  unfiltered and filtered on the query doc's team, using stored vectors of
+  sampled docs as query vectors (no Vertex calls); the first pass is warm-up
+- the copy is deleted afterwards unless --keep
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from elasticsearch import Elasticsearch
+
+# backend/ on sys.path so the script can reuse services.* when run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.elastic_client import VECTOR_FIELD, get_es, search_bm25, search_knn
+from services.index_schema import index_body, source_has_vectors, storage_stats, vector_dims
+
+INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+QUERY_WORDS = 8
+POLL_S = 2.0
+
+def resolve(es: Elasticsearch, name: str) -> str:
+    if es.indices.exists_alias(name=name):
+        return sorted(dict(es.indices.get_alias(name=name)))[0]
+    return name
+
+def reindex_copy(es: Elasticsearch, before: str, after: str) -> float:
+    """Create `after` from index_body() and _reindex `before` into it; returns seconds."""
+    if not source_has_vectors(es, before):
+        raise RuntimeError(f"{before} does not keep '{VECTOR_FIELD}' in _source, so _reindex cannot copy "
+                           f"vectors; build the new index with migrate_index.py and pass --after")
+    es.indices.delete(index=after, ignore_unavailable=True)
+    es.indices.create(index=after, body=index_body(dims=vector_dims(es, before) or 768))
+    t0 = time.perf_counter()
+    task = es.reindex(source={"index": before}, dest={"index": after}, wait_for_completion=False)["task"]
+    while True:
+        resp = es.tasks.get(task_id=task)
+        st = resp["task"]["status"]
+        print(f"[storage] reindex {st.get('created', 0) + st.get('updated', 0)}/{st.get('total', 0)}",
+              end="\r" if sys.stdout.isatty() else "\n", flush=True)
+        if resp.get("completed"):
+            break
+        time.sleep(POLL_S)
+    print()
+    failures = (resp.get("response") or {}).get("failures") or []
+    if failures:
+        raise RuntimeError(f"reindex failed: {failures[:3]}")
+    es.indices.refresh(index=after)
+    return time.perf_counter() - t0
+
+def sample_queries(es: Elasticsearch, index: str, n: int, seed: int) -> List[Dict[str, Any]]:
+    """n docs with text + vector from `index` (random_score), turned into query specs."""
+    res = es.search(index=index, body={
+        "size": n,
+        "query": {"function_score": {"query": {"exists": {"field": "text"}}, "random_score": {"seed": seed, "field": "_seq_no"}}},
+        "_source": ["text", "team", VECTOR_FIELD],
+    })
+    out = []
+    for h in res["hits"]["hits"]:
+        src = h["_source"]
+        if src.get(VECTOR_FIELD):
+            out.append({"text": " ".join((src.get("text") or "").split()[:QUERY_WORDS]),
+                        "vector": src[VECTOR_FIELD], "team": src.get("team")})
+    random.Random(seed).shuffle(out)
+    return out
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    fn()  # warm-up
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+def latency(es: Elasticsearch, index: str, queries: List[Dict[str, Any]], k: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    kinds: Dict[str, List[float]] = {"bm25": [], "bm25_team": [], "knn": [], "knn_team": []}
+    for q in queries:
+        team = {"team": [q["team"]]} if q.get("team") else None
+        kinds["bm25"] += _time(partial(search_bm25, es, index, q["text"], k=k), repeat)
+        kinds["knn"] += _time(partial(search_knn, es, index, q["vector"], k=k), repeat)
+        if team:
+            kinds["bm25_team"] += _time(partial(search_bm25, es, index, q["text"], k=k, filters=team), repeat)
+            kinds["knn_team"] += _time(partial(search_knn, es, index, q["vector"], k=k, filters=team), repeat)
+    return {name: {"p50_ms": round(float(np.percentile(v, 50)), 2), "p95_ms": round(float(np.percentile(v, 95)), 2)}
+            for name, v in kinds.items() if v}
+
+def _mb(n: Optional[int]) -> str:
+    return "n/a" if n is None else f"{n / 1e6:.1f}MB"
+
+def _delta(a: Optional[float], b: Optional[float]) -> str:
+    return "" if not a or b is None else f"{100.0 * (b - a) / a:+.0f}%"
+
+def print_report(rep: Dict[str, Any]) -> None:
+    b, a = rep["before"], rep["after"]
+    print(f"\n{'':>14} {b['index']:>24} {a['index']:>24}")
+    for key in ("store_bytes", "source_bytes", "vector_bytes"):
+        print(f"{key:>14} {_mb(b['storage'][key]):>24} {_mb(a['storage'][key]):>24} "
+              f"{_delta(b['storage'][key], a['storage'][key])}")
+    for key in ("docs", "segments"):
+        print(f"{key:>14} {b['storage'][key]:>24} {a['storage'][key]:>24}")
+    for kind, lb in b["latency"].items():
+        la = a["latency"].get(kind, {})
+        for p in ("p50_ms", "p95_ms"):
+            name = f"{kind} {p[:3]}"
+            print(f"{name:>14} {lb[p]:>22.1f}ms {la.get(p, float('nan')):>22.1f}ms {_delta(lb[p], la.get(p))}")
+
+def report(
+    es: Optional[Elasticsearch] = None,
+    before: str = INDEX,
+    after: Optional[str] = None,
+    n_queries: int = 50,
+    k: int = 10,
+    repeat: int = 5,
+    keep: bool = False,
+    seed: int = 7,
+) -> Dict[str, Any]:
+    es = es or get_es()
+    before = resolve(es, before)
+    made = after is None
+    after = after or f"{before}_storage"
+    reindex_s = reindex_copy(es, before, after) if made else None
+    try:
+        queries = sample_queries(es, before, n_queries, seed)
+        if not queries:
+            raise RuntimeError(f"no docs with text and '{VECTOR_FIELD}' in {before}'s _source to build queries from")
+        rep = {"reindex_s": reindex_s, "queries": len(queries), "k": k}
+        for label, name in (("before", before), ("after", after)):
+            rep[label] = {"index": name, "storage": storage_stats(es, name), "latency": latency(es, name, queries, k, repeat)}
+    finally:
+        if made and not keep:
+            es.indices.delete(index=after, ignore_unavailable=True)
+    print_report(rep)
+    return rep
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Store size + query latency before/after the storage-optimized layout")
+    ap.add_argument("--before", default=INDEX, help="index or alias to measure (default ELASTIC_INDEX)")
+    ap.add_argument("--after", help="existing optimized index; default: reindex a copy of --before")
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    ap.add_argument("--keep", action="store_true", help="keep the reindexed copy")
+    ap.add_argument("--json", help="also write the report here")
+    args = ap.parse_args()
+
+    out = report(before=args.before, after=args.after, n_queries=args.queries, k=args.k,
+                 repeat=args.repeat, keep=args.keep)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
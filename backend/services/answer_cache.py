@@ -0,0 +1,202 @@
+# /api/chat semantic answer cache (cosine match on query embeddings)
+# backend/services/answer_cache.py
+"""
+Near-identical questions ("what is finops" / "what's FinOps?") get the cached
+answer instead of another retrieve + Gemini round.
+
+- an entry is (unit query embedding, scope, index generation, answer payload);
+  scope = normalized filters + k, so answers never cross filter sets
+- lookup: one NumPy matrix-vector product over the live entries of the same
+  scope; the best cosine >= ANSWER_CACHE_THRESHOLD is a hit
+- bounds: ANSWER_CACHE_SIZE slots (least recently used is replaced; 0 disables)
+  and ANSWER_CACHE_TTL seconds
+- invalidation: entries are stamped with elastic_client.index_generation()
+  from before their retrieval; after a write every older entry is dropped on
+  the next lookup. Writes from other processes (ingest_local, migrate_index)
+  bump the generation when the ES liveness thread notices them, i.e. within
+  ES_LIVENESS_INTERVAL; with that thread off (ES_LIVENESS_INTERVAL=0) or
+  without index monitor privileges only ANSWER_CACHE_TTL bounds them
+
+The threshold is model-specific; tune ANSWER_CACHE_THRESHOLD on real query
+pairs (too low and related-but-different questions share an answer).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.elastic_client import index_generation
+from services.search_cache import normalize_filters
+from utils.metrics import record_cache
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))                 # entries; 0 disables
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))     # cosine similarity
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))                 # seconds; <= 0 = no expiry
+
+
+def scope_key(filters: Any, k: int) -> int:
+    raw = json.dumps([normalize_filters(filters), int(k)], sort_keys=True, default=str)
+    return int.from_bytes(hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _unit(vector: List[float]) -> Optional[np.ndarray]:
+    v = np.asarray(vector, dtype=np.float32).ravel()
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else None
+
+
+class SemanticCache:
+    """
+    Fixed-capacity slot arrays: vectors (capacity, dims), scope, generation,
+    expiry and last use; a free slot has generation -1. Thread-safe.
+    """
+
+    def __init__(self, capacity: int, threshold: float, ttl: float, name: Optional[str] = None):
+        self.capacity = max(1, int(capacity))
+        self.threshold = float(threshold)
+        self.ttl = float(ttl)
+        self.name = name
+        self._vecs: Optional[np.ndarray] = None  # allocated on first put (dims unknown until then)
+        self._scope = np.zeros(self.capacity, dtype=np.int64)
+        self._gen = np.full(self.capacity, -1, dtype=np.int64)
+        self._expires = np.zeros(self.capacity, dtype=np.float64)
+        self._used = np.zeros(self.capacity, dtype=np.float64)
+        self._values: List[Any] = [None] * self.capacity
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, event: str, n: int = 1) -> None:
+        if self.name and n:
+            record_cache(self.name, event, n)
+
+    def _drop_dead(self, now: float, generation: int) -> int:
+        # caller holds the lock; frees slots from older generations or past their TTL
+        live = self._gen >= 0
+        dead = live & (self._gen != generation)
+        if self.ttl > 0:
+            dead |= live & (self._expires <= now)
+        idx = np.flatnonzero(dead)
+        self._gen[idx] = -1
+        for i in idx:
+            self._values[i] = None
+        self.evictions += idx.size
+        return int(idx.size)
+
+    def _best(self, q: np.ndarray, scope: int) -> Tuple[int, float]:
+        # caller holds the lock; (slot, cosine) of the closest live entry in scope, or (-1, -inf)
+        if self._vecs is None or self._vecs.shape[1] != q.size:
+            return -1, float("-inf")
+        idx = np.flatnonzero((self._gen >= 0) & (self._scope == scope))
+        if idx.size == 0:
+            return -1, float("-inf")
+        sims = self._vecs[idx] @ q
+        j = int(np.argmax(sims))
+        return int(idx[j]), float(sims[j])
+
+    def get(self, vector: List[float], scope: int, generation: int) -> Optional[Tuple[Any, float]]:
+        """(value, cosine) of the best match at or above the threshold, else None."""
+        q = _unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            dropped = self._drop_dead(now, generation)
+            slot, sim = self._best(q, scope) if q is not None else (-1, float("-inf"))
+            hit = slot >= 0 and sim >= self.threshold
+            if hit:
+                self._used[slot] = now
+                value = self._values[slot]
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._count("eviction", dropped)
+        if not hit:
+            self._count("miss")
+            return None
+        self._count("hit")
+        return value, sim
+
+    def put(self, vector: List[float], scope: int, generation: int, value: Any) -> None:
+        q = _unit(vector)
+        if q is None:
+            return
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            if self._vecs is None or self._vecs.shape[1] != q.size:
+                # first entry, or the embedding dims changed: start over
+                self._vecs = np.zeros((self.capacity, q.size), dtype=np.float32)
+                self._gen[:] = -1
+                self._values = [None] * self.capacity
+            evicted += self._drop_dead(now, generation)
+            slot, sim = self._best(q, scope)
+            if slot < 0 or sim < self.threshold:
+                free = np.flatnonzero(self._gen < 0)
+                if free.size:
+                    slot = int(free[0])
+                else:
+                    slot = int(np.argmin(self._used))  # least recently used
+                    self.evictions += 1
+                    evicted += 1
+            # else: refresh the near-duplicate entry in place
+            self._vecs[slot] = q
+            self._scope[slot] = scope
+            self._gen[slot] = generation
+            self._expires[slot] = now + self.ttl
+            self._used[slot] = now
+            self._values[slot] = value
+        self._count("eviction", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._gen[:] = -1
+            self._values = [None] * self.capacity
+
+    def __len__(self) -> int:
+        return int((self._gen >= 0).sum())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": int((self._gen >= 0).sum()),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_cache = SemanticCache(ANSWER_CACHE_SIZE or 1, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, name="chat_answers")
+
+
+def enabled() -> bool:
+    return ANSWER_CACHE_SIZE > 0
+
+
+def lookup(vector: List[float], filters: Any, k: int) -> Optional[Tuple[Dict[str, Any], float]]:
+    """(cached answer payload, cosine) or None."""
+    if not enabled():
+        return None
+    return _cache.get(vector, scope_key(filters, k), index_generation())
+
+
+def store(vector: List[float], filters: Any, k: int, payload: Dict[str, Any], generation: int) -> None:
+    """Keep `payload`; `generation` is index_generation() from before retrieval ran."""
+    # a write landed while this answer was produced: it may already be outdated
+    if enabled() and generation == index_generation():
+        _cache.put(vector, scope_key(filters, k), generation, payload)
+
+
+def stats() -> Dict[str, Any]:
+    return {**_cache.stats(), "generation": index_generation()}
+
+
+def clear() -> None:
+    _cache.clear()
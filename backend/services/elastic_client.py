@@ -1,13 +1,23 @@
 # backend/services/elastic_client.py
 # Init, bulk ops, and search helpers (BM25 + kNN) for Elasticsearch.
 
+import asyncio
+import json
 import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, cast
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, cast
 
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from elasticsearch.helpers import bulk, parallel_bulk
 from elasticsearch.exceptions import AuthenticationException  # type: ignore[attr-defined]
+from elasticsearch.serializer import JsonSerializer
+
+from services.rank_fusion import rrf_fuse
 
 # ---------------------------------------------------------------------
 # Defaults / Env toggles
@@ -25,16 +35,53 @@
     "title,url,text,team,doc_type,page_num"
 )
 SOURCE_FIELDS: List[str] = [s.strip() for s in _source_env.split(",") if s.strip()]
+# `source` argument of the search helpers; False = ids/scores only (two-phase retrieval)
+SourceArg = Optional[Union[bool, List[str]]]
 
 # Global default for kNN candidate pool (can be overridden per-call)
 KNN_NUM_CANDIDATES = int(os.getenv("ES_KNN_NUM_CANDIDATES", "120"))
 
+# BM25 fallback tiers, tried in order until one returns hits.
+# ES_BM25_TIERS sets the default list; ES_BM25_TIERS_BY_INDEX overrides it per
+# index as JSON, e.g. {"searchsphere_docs": ["match", "multi_match", "match_all"]}
+BM25_TIER_NAMES = ("match", "multi_match", "query_string", "match_all")
+BM25_TIERS: List[str] = [
+    t.strip() for t in os.getenv("ES_BM25_TIERS", ",".join(BM25_TIER_NAMES)).split(",") if t.strip()
+]
+try:
+    BM25_TIERS_BY_INDEX: Dict[str, List[str]] = json.loads(os.getenv("ES_BM25_TIERS_BY_INDEX") or "{}")
+except ValueError:
+    BM25_TIERS_BY_INDEX = {}
+# One-shot: evaluate every tier in a single _msearch instead of one request per tier
+BM25_ONE_SHOT = (os.getenv("ES_BM25_ONE_SHOT") or "0").lower() not in ("0", "false", "no")
+
 # ---------------------------------------------------------------------
-# Connection
+# Connection pool / client registry
 # ---------------------------------------------------------------------
-def get_es() -> Elasticsearch:
+# One client per process: elasticsearch-py keeps a keep-alive urllib3 pool per
+# node, so reusing it avoids a TLS handshake + info() round trip per request.
+ES_POOL_CONNECTIONS = int(os.getenv("ES_POOL_CONNECTIONS", "10"))
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "30"))
+ES_MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", "2"))
+ES_RETRY_ON_TIMEOUT = (os.getenv("ES_RETRY_ON_TIMEOUT") or "1").lower() not in ("0", "false", "no")
+ES_HTTP_COMPRESS = (os.getenv("ES_HTTP_COMPRESS") or "1").lower() not in ("0", "false", "no")
+# Seconds between background liveness checks (<= 0 disables the checker)
+ES_LIVENESS_INTERVAL = float(os.getenv("ES_LIVENESS_INTERVAL", "30"))
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+_liveness: Dict[str, Any] = {"ok": None, "checked_at": None, "reason": None}
+_liveness_stop = threading.Event()
+_liveness_thread: Optional[threading.Thread] = None
+# Index whose changes (from any process) bump index_generation(); checked on each liveness tick
+WATCH_INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+_index_watch: Dict[str, Any] = {"signature": None}
+
+
+def _connection_args() -> Tuple[List[Any], Dict[str, Any]]:
     """
-    Build an ES client from environment variables and verify the connection.
+    Resolve (hosts, auth kwargs) from environment variables.
 
     Priority (first match wins):
       1) Direct endpoint/host
@@ -75,43 +122,223 @@ def _mask(s: Optional[str]) -> str:
 
     if endpoint:
         if api_key_b64:
-            es = Elasticsearch(endpoint, api_key=api_key_b64)
-        elif username and password:
-            es = Elasticsearch(endpoint, basic_auth=(username, password), verify_certs=True)
-        else:
-            raise RuntimeError(
-                "Endpoint is set but missing credentials. Provide ELASTIC_API_KEY "
-                "or ELASTIC_USERNAME/ELASTIC_PASSWORD."
-            )
-
-    elif cloud_id and (api_key_b64 or (api_key_id and api_key_secret)):
+            return [endpoint], {"api_key": api_key_b64}
+        if username and password:
+            return [endpoint], {"basic_auth": (username, password), "verify_certs": True}
+        raise RuntimeError(
+            "Endpoint is set but missing credentials. Provide ELASTIC_API_KEY "
+            "or ELASTIC_USERNAME/ELASTIC_PASSWORD."
+        )
+
+    if cloud_id and (api_key_b64 or (api_key_id and api_key_secret)):
         if api_key_b64:
-            es = Elasticsearch(cloud_id=cloud_id, api_key=api_key_b64)
-        else:
-            api_key_pair: Tuple[str, str] = (cast(str, api_key_id), cast(str, api_key_secret))
-            es = Elasticsearch(cloud_id=cloud_id, api_key=api_key_pair)
+            return [], {"cloud_id": cloud_id, "api_key": api_key_b64}
+        api_key_pair: Tuple[str, str] = (cast(str, api_key_id), cast(str, api_key_secret))
+        return [], {"cloud_id": cloud_id, "api_key": api_key_pair}
 
-    elif es_url and username and password:
-        es = Elasticsearch(es_url, basic_auth=(username, password), verify_certs=True)
+    if es_url and username and password:
+        return [es_url], {"basic_auth": (username, password), "verify_certs": True}
+
+    raise RuntimeError(
+        "Elasticsearch credentials not set. Provide one of:\n"
+        "1) ELASTIC_ENDPOINT/ELASTIC_HOST + (ELASTIC_API_KEY | ELASTIC_USERNAME+ELASTIC_PASSWORD)\n"
+        "2) ELASTIC_CLOUD_ID + (ELASTIC_API_KEY | ELASTIC_API_KEY_ID+ELASTIC_API_KEY_SECRET)\n"
+        "3) ELASTIC_URL + ELASTIC_USERNAME + ELASTIC_PASSWORD"
+    )
+
+
+# ---------------------------------------------------------------------
+# Response payload accounting
+# ---------------------------------------------------------------------
+_payload: ContextVar[Optional[Dict[str, Any]]] = ContextVar("es_payload", default=None)
 
-    else:
-        raise RuntimeError(
-            "Elasticsearch credentials not set. Provide one of:\n"
-            "1) ELASTIC_ENDPOINT/ELASTIC_HOST + (ELASTIC_API_KEY | ELASTIC_USERNAME+ELASTIC_PASSWORD)\n"
-            "2) ELASTIC_CLOUD_ID + (ELASTIC_API_KEY | ELASTIC_API_KEY_ID+ELASTIC_API_KEY_SECRET)\n"
-            "3) ELASTIC_URL + ELASTIC_USERNAME + ELASTIC_PASSWORD"
-        )
 
+class _MeteredJsonSerializer(JsonSerializer):
+    """
+    The client's default JsonSerializer (numpy/pandas/Decimal/UUID aware) that
+    also adds response bytes + JSON decode time to the active payload_meter().
+    """
+
+    def loads(self, data: bytes) -> Any:
+        acc = _payload.get()
+        if acc is None:
+            return super().loads(data)
+        t0 = time.perf_counter()
+        try:
+            return super().loads(data)
+        finally:
+            acc["bytes"] += len(data or b"")
+            acc["decode_ms"] += (time.perf_counter() - t0) * 1000.0
+            acc["responses"] += 1
+
+
+@contextmanager
+def payload_meter() -> Iterator[Dict[str, Any]]:
+    """
+    Count ES response bytes (decompressed) and decode time for requests made
+    inside the block, including tasks/threads started from it.
+    """
+    acc: Dict[str, Any] = {"bytes": 0, "decode_ms": 0.0, "responses": 0}
+    token = _payload.set(acc)
+    try:
+        yield acc
+    finally:
+        _payload.reset(token)
+        acc["decode_ms"] = round(acc["decode_ms"], 3)
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    """Keep-alive pool, timeout, retry and compression settings shared by all clients."""
+    return {
+        "connections_per_node": ES_POOL_CONNECTIONS,
+        "request_timeout": ES_REQUEST_TIMEOUT,
+        "max_retries": ES_MAX_RETRIES,
+        "retry_on_timeout": ES_RETRY_ON_TIMEOUT,
+        "http_compress": ES_HTTP_COMPRESS,
+        "serializers": {"application/json": _MeteredJsonSerializer()},
+    }
+
+
+def _check_liveness(es: Elasticsearch) -> None:
     try:
         es.info()
+        ok, reason = True, None
     except AuthenticationException:
-        raise RuntimeError("Elasticsearch auth/connection failed: security_exception")
+        ok, reason = False, "security_exception"
+    except Exception as e:
+        ok, reason = False, f"{type(e).__name__}: {e}"
+    _liveness.update({"ok": ok, "checked_at": datetime.utcnow().isoformat(), "reason": reason})
+    if ES_DEBUG and not ok:
+        print("[es] liveness check failed:", reason)
+
+
+def _index_signature(es: Elasticsearch, index: str) -> Tuple[Any, ...]:
+    """Changes whenever anyone writes to `index`: backing index names, doc counts, op counters."""
+    stats = es.indices.stats(index=index, metric="docs,indexing")
+    prim = (stats.get("_all") or {}).get("primaries") or {}
+    docs, ops = prim.get("docs") or {}, prim.get("indexing") or {}
+    return (tuple(sorted(stats.get("indices") or {})), docs.get("count"), docs.get("deleted"),
+            ops.get("index_total"), ops.get("delete_total"))
+
+
+def _watch_index_writes(es: Elasticsearch) -> None:
+    """Bump the index generation when WATCH_INDEX changed since the previous check."""
+    try:
+        sig = _index_signature(es, WATCH_INDEX)
     except Exception as e:
-        raise RuntimeError(f"Elasticsearch auth/connection failed: {type(e).__name__}: {e}")
+        # index missing or no monitor privilege: result caches fall back to their TTL
+        if ES_DEBUG:
+            print("[es] index watch failed:", type(e).__name__, e)
+        return
+    prev, _index_watch["signature"] = _index_watch["signature"], sig
+    if prev is not None and sig != prev:
+        bump_index_generation()
+
+
+def _liveness_loop(es: Elasticsearch) -> None:
+    while True:
+        _check_liveness(es)
+        if _liveness["ok"]:
+            _watch_index_writes(es)
+        if _liveness_stop.wait(ES_LIVENESS_INTERVAL):
+            return
 
+
+def _start_liveness(es: Elasticsearch) -> None:
+    global _liveness_thread
+    if ES_LIVENESS_INTERVAL <= 0 or _liveness_thread is not None:
+        return
+    _liveness_stop.clear()
+    _liveness_thread = threading.Thread(
+        target=_liveness_loop, args=(es,), name="es-liveness", daemon=True
+    )
+    _liveness_thread.start()
+
+
+def get_es() -> Elasticsearch:
+    """
+    Return the process-wide ES client, building it on first use.
+
+    No round trip happens here; connectivity is tracked by a background
+    liveness checker (see es_liveness()).
+    """
+    es = _clients.get("sync")
+    if es is not None:
+        return es
+    with _clients_lock:
+        es = _clients.get("sync")
+        if es is None:
+            hosts, auth = _connection_args()
+            es = Elasticsearch(*hosts, **auth, **_pool_kwargs())
+            _clients["sync"] = es
+            _start_liveness(es)
     return es
 
 
+def get_async_es() -> AsyncElasticsearch:
+    """
+    Return the AsyncElasticsearch client for the running event loop.
+
+    aiohttp sessions are bound to the loop that created them, so the client is
+    rebuilt if a different loop asks for it (e.g. TestClient portals).
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get("async")
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    with _clients_lock:
+        entry = _clients.get("async")
+        built = entry is None or entry[0] is not loop
+        if built:
+            hosts, auth = _connection_args()
+            entry = (loop, AsyncElasticsearch(*hosts, **auth, **_pool_kwargs()))
+            _clients["async"] = entry
+    if built:
+        get_es()  # the liveness / index-watch thread runs on the sync client
+    return entry[1]
+
+
+async def close_async_es() -> None:
+    """Close the async client if it belongs to the running loop."""
+    with _clients_lock:
+        entry = _clients.pop("async", None)
+    if entry is not None and entry[0] is asyncio.get_running_loop():
+        try:
+            await entry[1].close()
+        except Exception:
+            pass
+
+
+def es_liveness() -> Dict[str, Any]:
+    """Last background liveness result: {ok, checked_at, reason} (ok=None means not checked yet)."""
+    return dict(_liveness)
+
+
+def check_es_liveness(es: Optional[Elasticsearch] = None) -> Dict[str, Any]:
+    """Run one liveness check inline (e.g. before the background checker's first tick) and return it."""
+    _check_liveness(es or get_es())
+    return es_liveness()
+
+
+def close_es() -> None:
+    """Stop the liveness checker and close pooled connections (FastAPI lifespan shutdown)."""
+    global _liveness_thread
+    _liveness_stop.set()
+    if _liveness_thread is not None:
+        _liveness_thread.join(timeout=2)
+        _liveness_thread = None
+    with _clients_lock:
+        clients = [c for name, c in _clients.items() if name == "sync"]
+        _clients.clear()
+    for c in clients:
+        try:
+            c.close()
+        except Exception:
+            pass
+    _liveness.update({"ok": None, "checked_at": None, "reason": None})
+    _index_watch["signature"] = None
+
+
 # ---------------------------------------------------------------------
 # Filters helper
 # ---------------------------------------------------------------------
@@ -159,8 +386,11 @@ def _filters_to_es(filters: Optional[Union[Dict[str, Any], Any]]) -> List[Dict[s
     return clauses
 
 
-def _format_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Normalize ES hits to a compact shape and preserve ES-style keys for the UI."""
+def _format_hits(hits: List[Dict[str, Any]], tier: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Normalize ES hits to a compact shape and preserve ES-style keys for the UI.
+    `tier` tags BM25 hits with the fallback tier that produced them.
+    """
     out: List[Dict[str, Any]] = []
     for h in hits:
         src = h.get("_source", {}) or {}
@@ -173,6 +403,8 @@ def _format_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         }
         if "highlight" in h:
             item["highlight"] = h["highlight"]
+        if tier:
+            item["tier"] = tier
         out.append(item)
     return out
 
@@ -180,11 +412,26 @@ def _format_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 # ---------------------------------------------------------------------
 # Write / Ingest
 # ---------------------------------------------------------------------
-def index_docs(docs: List[Dict[str, Any]], index: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
-    """Bulk-index docs. Returns (success_count, error_items)."""
-    es = get_es()
+# Bumped after every write made through this process (index_docs, bulk-load
+# sessions, the ingest pipeline), and by the liveness thread when WATCH_INDEX
+# changed under it (scripts/ingest_local.py, scripts/migrate_index.py, other
+# replicas), so those writes invalidate within ES_LIVENESS_INTERVAL seconds.
+# Result caches store it with each entry and treat older entries as stale.
+_generation = {"value": 0}
+_generation_lock = threading.Lock()
+
 
-    actions: List[Dict[str, Any]] = []
+def index_generation() -> int:
+    return _generation["value"]
+
+
+def bump_index_generation() -> int:
+    with _generation_lock:
+        _generation["value"] += 1
+        return _generation["value"]
+
+
+def _doc_actions(docs: Iterable[Dict[str, Any]], index: Optional[str]) -> Iterator[Dict[str, Any]]:
     for d in docs:
         _index = index or d.get("_index") or os.getenv("ELASTIC_INDEX", "searchsphere_docs")
         _id = d.get("_id")
@@ -192,9 +439,25 @@ def index_docs(docs: List[Dict[str, Any]], index: Optional[str] = None) -> Tuple
         action: Dict[str, Any] = {"_op_type": "index", "_index": _index, "_source": body}
         if _id is not None:
             action["_id"] = _id
-        actions.append(action)
+        yield action
+
 
-    result = bulk(es, actions, refresh="wait_for")
+def index_docs(
+    docs: List[Dict[str, Any]],
+    index: Optional[str] = None,
+    refresh: Union[bool, str] = "wait_for",
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Bulk-index docs. Returns (success_count, error_items).
+    refresh="wait_for" (default) makes the docs searchable before returning;
+    pass refresh=False for large loads, or use bulk_load_session().
+    """
+    es = get_es()
+    actions = list(_doc_actions(docs, index))
+    try:
+        result = bulk(es, actions, refresh=refresh)
+    finally:
+        bump_index_generation()  # even a failed bulk may have written some docs
 
     success_count: int = int(result[0])
     items_raw = result[1] if len(result) > 1 else []
@@ -214,20 +477,159 @@ def index_docs(docs: List[Dict[str, Any]], index: Optional[str] = None) -> Tuple
 
 
 # ---------------------------------------------------------------------
-# Search
+# Bulk-load sessions
 # ---------------------------------------------------------------------
-def search_knn(
-    es: Elasticsearch,
+BULK_LOAD_CHUNK = int(os.getenv("ES_BULK_LOAD_CHUNK", "1000"))
+BULK_LOAD_THREADS = int(os.getenv("ES_BULK_LOAD_THREADS", "4"))
+BULK_LOAD_MAX_BYTES = int(os.getenv("ES_BULK_LOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+_BULK_META_KEY = "searchsphere_bulk_load"  # mapping _meta entry holding the settings to restore
+
+
+class BulkLoadSession:
+    """Write handle yielded by bulk_load_session(); counts successes and keeps error samples."""
+
+    def __init__(self, es: Elasticsearch, index: str, chunk_size: int, thread_count: int, max_chunk_bytes: int):
+        self.es = es
+        self.index = index
+        self.chunk_size = chunk_size
+        self.thread_count = thread_count
+        self.max_chunk_bytes = max_chunk_bytes
+        self.indexed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def stream(self, actions: Iterable[Dict[str, Any]]) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+        """parallel_bulk over `actions` (default _index is the session's), yielding (ok, item)."""
+        for ok, item in parallel_bulk(
+            self.es,
+            ({"_index": self.index, **a} for a in actions),
+            thread_count=self.thread_count,
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if ok:
+                self.indexed += 1
+            elif len(self.errors) < 100:
+                self.errors.append(item)
+            yield ok, item
+
+    def index_docs(self, docs: Iterable[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Same contract as index_docs(), without the per-call refresh."""
+        before, errs = self.indexed, len(self.errors)
+        for _ in self.stream(_doc_actions(docs, self.index)):
+            pass
+        return self.indexed - before, self.errors[errs:]
+
+
+def _index_meta(es: Elasticsearch, index: str) -> Dict[str, Any]:
+    resp = es.indices.get_mapping(index=index)
+    body = next(iter(dict(resp).values()), {})
+    return dict((body.get("mappings") or {}).get("_meta") or {})
+
+
+def _put_settings(es: Elasticsearch, index: str, settings: Dict[str, Any]) -> None:
+    try:
+        es.indices.put_settings(index=index, settings={"index": settings})
+    except Exception as e:
+        if "number_of_replicas" not in settings:
+            raise
+        # e.g. serverless projects do not allow replica changes; keep going with refresh only
+        print(f"[ES] replica change rejected on {index}: {type(e).__name__}: {e}")
+        rest = {k: v for k, v in settings.items() if k != "number_of_replicas"}
+        if rest:
+            es.indices.put_settings(index=index, settings={"index": rest})
+
+
+def recover_bulk_load(index: str, es: Optional[Elasticsearch] = None) -> bool:
+    """
+    Restore settings left behind by a bulk-load session that never reached its
+    finally block (process killed). Returns True if something was restored.
+    """
+    es = es or get_es()
+    meta = _index_meta(es, index)
+    saved = meta.pop(_BULK_META_KEY, None)
+    if not saved:
+        return False
+    print(f"[ES] restoring settings from interrupted bulk load on {index}: {saved}")
+    _put_settings(es, index, saved)
+    es.indices.put_mapping(index=index, meta=meta)
+    es.indices.refresh(index=index)
+    return True
+
+
+@contextmanager
+def bulk_load_session(
     index: str,
+    es: Optional[Elasticsearch] = None,
+    replicas: Optional[int] = 0,
+    chunk_size: int = BULK_LOAD_CHUNK,
+    thread_count: int = BULK_LOAD_THREADS,
+    max_chunk_bytes: int = BULK_LOAD_MAX_BYTES,
+    forcemerge: bool = False,
+    max_num_segments: int = 1,
+) -> Iterator[BulkLoadSession]:
+    """
+    Tune `index` for a large load and always put it back.
+
+    On entry refresh_interval is set to -1 and number_of_replicas to `replicas`
+    (None leaves replicas alone). The previous values are saved in the mapping
+    _meta first, so recover_bulk_load() (also run on the next session start)
+    can restore them after a hard crash. On exit, whether the block succeeded
+    or raised, the settings are restored and the index refreshed once;
+    force-merge only runs after a successful load.
+    """
+    es = es or get_es()
+    recover_bulk_load(index, es)
+
+    current = es.indices.get_settings(index=index, name=["index.refresh_interval", "index.number_of_replicas"])
+    idx = (next(iter(dict(current).values()), {}).get("settings") or {}).get("index") or {}
+    # None resets a setting to its default, which is what an unset refresh_interval means
+    saved: Dict[str, Any] = {"refresh_interval": idx.get("refresh_interval")}
+    tuned: Dict[str, Any] = {"refresh_interval": "-1"}
+    if replicas is not None:
+        saved["number_of_replicas"] = idx.get("number_of_replicas")
+        tuned["number_of_replicas"] = replicas
+
+    meta = _index_meta(es, index)
+    meta[_BULK_META_KEY] = saved
+    es.indices.put_mapping(index=index, meta=meta)
+    _put_settings(es, index, tuned)
+
+    session = BulkLoadSession(es, index, chunk_size, thread_count, max_chunk_bytes)
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        yield session
+        ok = True
+    finally:
+        recover_bulk_load(index, es)
+        bump_index_generation()
+        if ok and forcemerge:
+            es.indices.forcemerge(index=index, max_num_segments=max_num_segments)
+        if ES_DEBUG:
+            print(f"[ES] bulk load on {index}: {session.indexed} docs, {len(session.errors)} errors, "
+                  f"{time.perf_counter() - t0:.1f}s, ok={ok}")
+
+
+# ---------------------------------------------------------------------
+# Search (request bodies are shared by the sync and async helpers)
+# ---------------------------------------------------------------------
+def _source_value(source: SourceArg) -> Union[bool, List[str]]:
+    return (SOURCE_FIELDS or True) if source is None else source
+
+
+def _knn_bodies(
     query_vector: List[float],
-    k: int = 12,
-    filters: Optional[Union[Dict[str, Any], Any]] = None,
-    vector_field: str = VECTOR_FIELD,
-    num_candidates: Optional[int] = None,
-    **kwargs,
-) -> List[Dict[str, Any]]:
-    """kNN search against dense vector field."""
+    k: int,
+    filters: Optional[Union[Dict[str, Any], Any]],
+    vector_field: str,
+    num_candidates: Optional[int],
+    source: SourceArg = None,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Return (primary_body, fallback_body) for a kNN search; fallback is None without filters."""
     must_filters = _filters_to_es(filters)
+    _source = _source_value(source)
 
     nc = num_candidates if (isinstance(num_candidates, int) and num_candidates >= k) else KNN_NUM_CANDIDATES
 
@@ -240,7 +642,7 @@ def search_knn(
 
     body: Dict[str, Any] = {
         "knn": knn_obj,
-        "_source": SOURCE_FIELDS or True,
+        "_source": _source,
         "size": k,
     }
 
@@ -248,16 +650,127 @@ def search_knn(
         # Some clusters accept top-level 'filter' with 'knn'; if not, we fallback below
         body["filter"] = must_filters  # type: ignore[assignment]
 
+    # Wrap in a bool query to ensure filters apply across versions
+    fallback_body: Dict[str, Any] = {
+        "query": {"bool": {"filter": must_filters}} if must_filters else {"match_all": {}},
+        "knn": knn_obj,
+        "_source": _source,
+        "size": k,
+    }
+    return body, fallback_body
+
+
+def bm25_tiers(index: Optional[str] = None) -> List[str]:
+    """Configured BM25 tier names for `index` (unknown names are ignored)."""
+    tiers = BM25_TIERS_BY_INDEX.get(index or "") or BM25_TIERS
+    tiers = [t for t in tiers if t in BM25_TIER_NAMES]
+    return tiers or list(BM25_TIER_NAMES)
+
+
+def _bm25_bodies(
+    query_text: str,
+    k: int,
+    filters: Optional[Union[Dict[str, Any], Any]],
+    text_field: str,
+    index: Optional[str] = None,
+    source: SourceArg = None,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Progressive BM25 ladder as (tier_name, body) pairs, in the order they are
+    tried (default: match -> multi_match -> query_string over '*' -> match_all).
+    A '*' or empty query goes straight to match_all.
+    """
+    filter_clauses = _filters_to_es(filters)
+    _source = _source_value(source)
+    # highlighting reads _source, so id-only candidate queries skip it
+    highlight = ENABLE_HIGHLIGHT and _source is not False
+
+    base_bool: Dict[str, Any] = {"must": [], "filter": []}
+    if filter_clauses:
+        base_bool["filter"] = filter_clauses
+
+    def _body(must: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "query": {"bool": {**base_bool, "must": [must]}},
+            "_source": _source,
+            "size": k,
+        }
+
+    qt = (query_text or "").strip()
+    if qt in ("", "*"):
+        return [("match_all", _body({"match_all": {}}))]
+
+    mm_fields = [text_field, "title^2", "content", "body", "meta.*"]
+
+    def _tier(name: str) -> Dict[str, Any]:
+        if name == "match":
+            # 1) Primary match
+            body = _body({"match": {text_field: {"query": qt}}})
+            if highlight:
+                body["highlight"] = {"fields": {text_field: {"number_of_fragments": 1}}}
+            return body
+        if name == "multi_match":
+            # 2) Multi-match over common fields
+            body = _body({"multi_match": {"query": qt, "fields": mm_fields}})
+            if highlight:
+                body["highlight"] = {"fields": {f: {"number_of_fragments": 1} for f in mm_fields}}
+            return body
+        if name == "query_string":
+            # 3) Query string over all fields
+            return _body({"query_string": {"query": qt, "default_field": "*"}})
+        # 4) Last-resort: match_all
+        return _body({"match_all": {}})
+
+    return [(name, _tier(name)) for name in bm25_tiers(index)]
+
+
+def _pick_tier(
+    tiers: List[Tuple[str, Dict[str, Any]]],
+    responses: List[Dict[str, Any]],
+) -> Tuple[Optional[str], List[Dict[str, Any]], Optional[int]]:
+    """
+    First tier (in ladder order) whose msearch sub-response has hits.
+    Errored tiers are skipped; if nothing matched and a tier errored, raise it.
+    Returns (tier_name, raw_hits, took).
+    """
+    first_error: Optional[Any] = None
+    took: Optional[int] = None
+    for (name, _), resp in zip(tiers, responses):
+        if resp.get("error"):
+            first_error = first_error or resp["error"]
+            continue
+        took = resp.get("took") if took is None else took
+        hits = resp.get("hits", {}).get("hits", []) or []
+        if hits:
+            return name, hits, resp.get("took")
+    if first_error is not None:
+        raise RuntimeError(f"BM25 one-shot msearch failed: {first_error}")
+    return None, [], took
+
+
+def _msearch_payload(index: str, bodies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    searches: List[Dict[str, Any]] = []
+    for body in bodies:
+        searches.extend([{"index": index}, body])
+    return searches
+
+
+def search_knn(
+    es: Elasticsearch,
+    index: str,
+    query_vector: List[float],
+    k: int = 12,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    vector_field: str = VECTOR_FIELD,
+    num_candidates: Optional[int] = None,
+    source: SourceArg = None,
+    **kwargs,
+) -> List[Dict[str, Any]]:
+    """kNN search against dense vector field (source=False: ids/scores only)."""
+    body, fallback_body = _knn_bodies(query_vector, k, filters, vector_field, num_candidates, source)
     try:
         res = es.search(index=index, body=body)
     except Exception:
-        # Wrap in a bool query to ensure filters apply across versions
-        fallback_body: Dict[str, Any] = {
-            "query": {"bool": {"filter": must_filters}} if must_filters else {"match_all": {}},
-            "knn": body["knn"],
-            "_source": SOURCE_FIELDS or True,
-            "size": k,
-        }
         res = es.search(index=index, body=fallback_body)
 
     hits = res.get("hits", {}).get("hits", []) or []
@@ -271,71 +784,477 @@ def search_bm25(
     k: int = 12,
     filters: Optional[Union[Dict[str, Any], Any]] = None,
     text_field: str = TEXT_FIELD,
+    one_shot: Optional[bool] = None,
+    source: SourceArg = None,
 ) -> List[Dict[str, Any]]:
     """
     Progressive BM25 text search with match_all fallback when query is '*' or empty.
     Uses SOURCE_FIELDS filtering and disables highlight by default for latency.
+
+    one_shot (default ES_BM25_ONE_SHOT) sends every tier in one _msearch and keeps
+    the first tier with hits, so a zero-hit query costs one round trip instead of
+    up to four. Hits carry "tier" either way.
     """
-    filter_clauses = _filters_to_es(filters)
+    tiers = _bm25_bodies(query_text, k, filters, text_field, index, source)
+    if (BM25_ONE_SHOT if one_shot is None else one_shot) and len(tiers) > 1:
+        res = es.msearch(searches=_msearch_payload(index, [b for _, b in tiers]))
+        name, hits, _ = _pick_tier(tiers, res.get("responses", []) or [])
+        return _format_hits(hits, tier=name)
 
-    def _run(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    for name, body in tiers:
         res = es.search(index=index, body=body)
-        return res.get("hits", {}).get("hits", []) or []
+        hits = res.get("hits", {}).get("hits", []) or []
+        if hits:
+            return _format_hits(hits, tier=name)
+    return []
 
-    base_bool: Dict[str, Any] = {"must": [], "filter": []}
-    if filter_clauses:
-        base_bool["filter"] = filter_clauses
 
-    qt = (query_text or "").strip()
-    if qt in ("", "*"):
-        body0: Dict[str, Any] = {
-            "query": {"bool": {**base_bool, "must": [{"match_all": {}}]}},
-            "_source": SOURCE_FIELDS or True,
-            "size": k,
-        }
-        hits = _run(body0)
-        return _format_hits(hits)
+async def async_search_knn(
+    es: AsyncElasticsearch,
+    index: str,
+    query_vector: List[float],
+    k: int = 12,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    vector_field: str = VECTOR_FIELD,
+    num_candidates: Optional[int] = None,
+    source: SourceArg = None,
+    **kwargs,
+) -> List[Dict[str, Any]]:
+    """Async twin of search_knn()."""
+    body, fallback_body = _knn_bodies(query_vector, k, filters, vector_field, num_candidates, source)
+    try:
+        res = await es.search(index=index, body=body)
+    except Exception:
+        res = await es.search(index=index, body=fallback_body)
 
-    # 1) Primary match
-    body1: Dict[str, Any] = {
-        "query": {"bool": {**base_bool, "must": [{"match": {text_field: {"query": qt}}}]}},
-        "_source": SOURCE_FIELDS or True,
-        "size": k,
-    }
-    if ENABLE_HIGHLIGHT:
-        body1["highlight"] = {"fields": {text_field: {"number_of_fragments": 1}}}
-    hits = _run(body1)
-    if hits:
-        return _format_hits(hits)
+    hits = res.get("hits", {}).get("hits", []) or []
+    return _format_hits(hits)
 
-    # 2) Multi-match over common fields
-    mm_fields = [text_field, "title^2", "content", "body", "meta.*"]
-    body2: Dict[str, Any] = {
-        "query": {"bool": {**base_bool, "must": [{"multi_match": {"query": qt, "fields": mm_fields}}]}},
-        "_source": SOURCE_FIELDS or True,
-        "size": k,
+
+async def async_search_bm25(
+    es: AsyncElasticsearch,
+    index: str,
+    query_text: str,
+    k: int = 12,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    text_field: str = TEXT_FIELD,
+    one_shot: Optional[bool] = None,
+    source: SourceArg = None,
+) -> List[Dict[str, Any]]:
+    """Async twin of search_bm25()."""
+    tiers = _bm25_bodies(query_text, k, filters, text_field, index, source)
+    if (BM25_ONE_SHOT if one_shot is None else one_shot) and len(tiers) > 1:
+        res = await es.msearch(searches=_msearch_payload(index, [b for _, b in tiers]))
+        name, hits, _ = _pick_tier(tiers, res.get("responses", []) or [])
+        return _format_hits(hits, tier=name)
+
+    for name, body in tiers:
+        res = await es.search(index=index, body=body)
+        hits = res.get("hits", {}).get("hits", []) or []
+        if hits:
+            return _format_hits(hits, tier=name)
+    return []
+
+
+# ---------------------------------------------------------------------
+# Hybrid in one round trip (_msearch)
+# ---------------------------------------------------------------------
+def _hybrid_msearch_plan(
+    index: str,
+    query_text: str,
+    query_vector: List[float],
+    k: int,
+    filters: Optional[Union[Dict[str, Any], Any]],
+    text_field: str,
+    vector_field: str,
+    num_candidates: Optional[int],
+    one_shot: bool,
+    source: SourceArg = None,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Dict[str, Any]]], int, Dict[str, Any]]:
+    """
+    Return (msearch_searches, bm25_tiers, n_bm25_sent, knn_fallback_body).
+    The kNN body goes last; one-shot sends every BM25 tier, otherwise only the first.
+    """
+    tiers = _bm25_bodies(query_text, k, filters, text_field, index, source)
+    sent = len(tiers) if one_shot else 1
+    knn_body, knn_fallback = _knn_bodies(query_vector, k, filters, vector_field, num_candidates, source)
+    searches = _msearch_payload(index, [b for _, b in tiers[:sent]] + [knn_body])
+    return searches, tiers, sent, knn_fallback
+
+
+def _msearch_hits(responses: List[Dict[str, Any]], i: int) -> Tuple[Optional[List[Dict[str, Any]]], Optional[int]]:
+    """(hits, took) for one msearch sub-response; hits is None when the sub-query errored."""
+    resp = responses[i] if i < len(responses) else {"error": "missing response"}
+    if resp.get("error"):
+        return None, resp.get("took")
+    return resp.get("hits", {}).get("hits", []) or [], resp.get("took")
+
+
+def _split_hybrid(
+    responses: List[Dict[str, Any]],
+    tiers: List[Tuple[str, Dict[str, Any]]],
+    sent: int,
+) -> Tuple[Optional[str], Optional[List[Dict[str, Any]]], Optional[int], Optional[List[Dict[str, Any]]], Optional[int]]:
+    """(bm25_tier, bm25_hits, bm25_took, knn_hits, knn_took); None hits = errored/needs retry."""
+    bm_tier: Optional[str] = None
+    bm_hits: Optional[List[Dict[str, Any]]]
+    if sent > 1:
+        try:
+            bm_tier, bm_hits, bm_took = _pick_tier(tiers[:sent], responses[:sent])
+        except RuntimeError:
+            bm_hits, bm_took = None, None
+    else:
+        bm_hits, bm_took = _msearch_hits(responses, 0)
+        bm_tier = tiers[0][0] if bm_hits else None
+    knn_hits, knn_took = _msearch_hits(responses, sent)
+    return bm_tier, bm_hits, bm_took, knn_hits, knn_took
+
+
+def _hybrid_result(
+    bm_tier: Optional[str],
+    bm_hits: List[Dict[str, Any]],
+    knn_hits: List[Dict[str, Any]],
+    bm_took: Optional[int],
+    knn_took: Optional[int],
+) -> Dict[str, Any]:
+    return {
+        "bm25": _format_hits(bm_hits, tier=bm_tier),
+        "knn": _format_hits(knn_hits),
+        "bm25_tier": bm_tier,
+        "took": {"bm25": bm_took, "knn": knn_took},
     }
-    if ENABLE_HIGHLIGHT:
-        body2["highlight"] = {"fields": {f: {"number_of_fragments": 1} for f in mm_fields}}
-    hits = _run(body2)
-    if hits:
-        return _format_hits(hits)
-
-    # 3) Query string over all fields
-    body3: Dict[str, Any] = {
-        "query": {"bool": {**base_bool, "must": [{"query_string": {"query": qt, "default_field": "*"}}]}},
-        "_source": SOURCE_FIELDS or True,
-        "size": k,
+
+
+def search_hybrid_msearch(
+    es: Elasticsearch,
+    index: str,
+    query_text: str,
+    query_vector: List[float],
+    k: int = 12,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    text_field: str = TEXT_FIELD,
+    vector_field: str = VECTOR_FIELD,
+    num_candidates: Optional[int] = None,
+    one_shot: Optional[bool] = None,
+    source: SourceArg = None,
+) -> Dict[str, Any]:
+    """
+    BM25 + kNN packed into a single _msearch request.
+
+    Returns {"bm25": hits, "knn": hits, "bm25_tier": name, "took": {"bm25": ms, "knn": ms}}
+    with hits in the same shape as search_bm25()/search_knn(), ready for rrf_fuse().
+    With one_shot every BM25 tier rides in the same request. Otherwise an empty
+    first tier continues down the ladder; an errored sub-query is retried on its
+    own (kNN with the bool-filter fallback body).
+    """
+    one_shot = BM25_ONE_SHOT if one_shot is None else one_shot
+    searches, tiers, sent, knn_fallback = _hybrid_msearch_plan(
+        index, query_text, query_vector, k, filters, text_field, vector_field, num_candidates, one_shot, source
+    )
+    responses = es.msearch(searches=searches).get("responses", []) or []
+    bm_tier, bm_hits, bm_took, knn_hits, knn_took = _split_hybrid(responses, tiers, sent)
+
+    if bm_hits is None or (not bm_hits and sent < len(tiers)):
+        # errored -> rerun the whole ladder (surfaces the real error); empty -> next tiers
+        for name, body in (tiers if bm_hits is None else tiers[sent:]):
+            res = es.search(index=index, body=body)
+            bm_hits, bm_took = res.get("hits", {}).get("hits", []) or [], res.get("took")
+            if bm_hits:
+                bm_tier = name
+                break
+    if knn_hits is None:
+        res = es.search(index=index, body=knn_fallback)
+        knn_hits, knn_took = res.get("hits", {}).get("hits", []) or [], res.get("took")
+
+    return _hybrid_result(bm_tier, bm_hits or [], knn_hits, bm_took, knn_took)
+
+
+async def async_search_hybrid_msearch(
+    es: AsyncElasticsearch,
+    index: str,
+    query_text: str,
+    query_vector: List[float],
+    k: int = 12,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    text_field: str = TEXT_FIELD,
+    vector_field: str = VECTOR_FIELD,
+    num_candidates: Optional[int] = None,
+    one_shot: Optional[bool] = None,
+    source: SourceArg = None,
+) -> Dict[str, Any]:
+    """Async twin of search_hybrid_msearch()."""
+    one_shot = BM25_ONE_SHOT if one_shot is None else one_shot
+    searches, tiers, sent, knn_fallback = _hybrid_msearch_plan(
+        index, query_text, query_vector, k, filters, text_field, vector_field, num_candidates, one_shot, source
+    )
+    responses = (await es.msearch(searches=searches)).get("responses", []) or []
+    bm_tier, bm_hits, bm_took, knn_hits, knn_took = _split_hybrid(responses, tiers, sent)
+
+    if bm_hits is None or (not bm_hits and sent < len(tiers)):
+        for name, body in (tiers if bm_hits is None else tiers[sent:]):
+            res = await es.search(index=index, body=body)
+            bm_hits, bm_took = res.get("hits", {}).get("hits", []) or [], res.get("took")
+            if bm_hits:
+                bm_tier = name
+                break
+    if knn_hits is None:
+        res = await es.search(index=index, body=knn_fallback)
+        knn_hits, knn_took = res.get("hits", {}).get("hits", []) or [], res.get("took")
+
+    return _hybrid_result(bm_tier, bm_hits or [], knn_hits, bm_took, knn_took)
+
+
+# ---------------------------------------------------------------------
+# Hybrid fused server-side (rrf retriever), client-side RRF as fallback
+# ---------------------------------------------------------------------
+# auto: `retriever.rrf` (8.14+), then the older top-level `rank.rrf` (8.8+), then
+# client-side fusion; "retriever"/"rank" pin one form, "off" always fuses in Python
+RRF_SERVER_MODE = (os.getenv("ES_RRF_SERVER") or "auto").lower()
+RRF_FORMS = ("retriever", "rank")
+RRF_RANK_CONSTANT = 60  # same k_const as rank_fusion.rrf_fuse
+# A form that failed as unsupported is retried after this many seconds (license
+# upgrades, rolling cluster upgrades); <= 0 keeps it off for the process lifetime
+RRF_RETRY_S = float(os.getenv("ES_RRF_RETRY_S", "600"))
+# form -> True/False once a request has shown whether this cluster/license supports it
+_rrf_state: Dict[str, bool] = {}
+_rrf_failed_at: Dict[str, float] = {}
+# 400s ES returns for a search body key it does not know ("Unknown key for a
+# START_OBJECT in [retriever]", "[search] unknown field [rank]", "unknown retriever [rrf]")
+_RRF_PARSE_ERRORS = ("parsing_exception", "x_content_parse_exception")
+_RRF_UNKNOWN_KEY = re.compile(r"unknown .*\[(retriever|rank|rrf)\]", re.IGNORECASE)
+
+
+def _rrf_bodies(
+    query_text: str,
+    query_vector: List[float],
+    k: int,
+    window: int,
+    filters: Optional[Union[Dict[str, Any], Any]],
+    text_field: str,
+    vector_field: str,
+    num_candidates: Optional[int],
+    rank_constant: int,
+    source: SourceArg,
+    index: Optional[str],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    The same fused query in both server-side forms, keyed by RRF_FORMS.
+    BM25 is the first ladder tier; both legs use the _filters_to_es clauses and
+    return `window` candidates (rrf_fuse's pool), of which the top `k` come back.
+    """
+    _, bm25_body = _bm25_bodies(query_text, window, filters, text_field, index, source)[0]
+    knn_body, _ = _knn_bodies(query_vector, window, filters, vector_field, num_candidates, source)
+    knn = {**knn_body["knn"], "num_candidates": max(knn_body["knn"]["num_candidates"], window)}
+    must_filters = _filters_to_es(filters)
+    if must_filters:
+        knn["filter"] = must_filters
+    query = bm25_body["query"]
+    _source = _source_value(source)
+    return {
+        "retriever": {
+            "retriever": {"rrf": {
+                "retrievers": [{"standard": {"query": query}}, {"knn": knn}],
+                "rank_constant": rank_constant,
+                "rank_window_size": window,
+            }},
+            "_source": _source,
+            "size": k,
+        },
+        "rank": {
+            "query": query,
+            "knn": knn,
+            "rank": {"rrf": {"rank_constant": rank_constant, "window_size": window}},
+            "_source": _source,
+            "size": k,
+        },
     }
-    hits = _run(body3)
-    if hits:
-        return _format_hits(hits)
-
-    # 4) Last-resort: match_all
-    body4: Dict[str, Any] = {
-        "query": {"bool": {**base_bool, "must": [{"match_all": {}}]}},
-        "_source": SOURCE_FIELDS or True,
-        "size": k,
+
+
+def _rrf_forms() -> List[str]:
+    if RRF_SERVER_MODE == "off":
+        return []
+    forms = [RRF_SERVER_MODE] if RRF_SERVER_MODE in RRF_FORMS else list(RRF_FORMS)
+    now = time.monotonic()
+    return [f for f in forms if _rrf_state.get(f) is not False
+            or (RRF_RETRY_S > 0 and now - _rrf_failed_at.get(f, 0.0) >= RRF_RETRY_S)]
+
+
+def _es_error(e: Exception) -> Tuple[Optional[int], str, str]:
+    """(HTTP status, root-cause type, reason) of an Elasticsearch ApiError."""
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "meta", None), "status", None)
+    body = getattr(e, "body", None)
+    err = body.get("error") if isinstance(body, dict) else None
+    if not isinstance(err, dict):
+        return status, "", str(e)
+    root = (err.get("root_cause") or [err])[0]
+    return status, str(root.get("type") or err.get("type") or ""), str(root.get("reason") or err.get("reason") or "")
+
+
+def _rrf_unsupported(e: Exception) -> bool:
+    """
+    True only for errors saying this RRF form cannot work here: a license
+    security_exception (403) or a parse error about an unknown retriever/rank
+    key (400). Malformed queries, bad filters etc. are not.
+    """
+    status, etype, reason = _es_error(e)
+    if status == 403:
+        return etype == "security_exception" and "license" in reason.lower()
+    return status == 400 and etype in _RRF_PARSE_ERRORS and bool(_RRF_UNKNOWN_KEY.search(reason))
+
+
+def _mark_rrf(form: str, ok: bool, err: Optional[Exception] = None) -> None:
+    if not ok:
+        if _rrf_state.get(form) is not False:
+            print(f"[es] server-side RRF ({form}) unavailable, falling back: {type(err).__name__}: {err}")
+        _rrf_failed_at[form] = time.monotonic()
+    _rrf_state[form] = ok
+
+
+def rrf_support() -> Dict[str, Optional[bool]]:
+    """Per form: True/False once probed, None while unknown."""
+    return {f: _rrf_state.get(f) for f in RRF_FORMS}
+
+
+def _rrf_server_result(res: Dict[str, Any], form: str) -> Dict[str, Any]:
+    return {
+        "fused": _format_hits(res.get("hits", {}).get("hits", []) or []),
+        "bm25": [],
+        "knn": [],
+        "bm25_tier": None,
+        "took": {"rrf": res.get("took")},
+        "fusion": "server",
+        "form": form,
     }
-    hits = _run(body4)
-    return _format_hits(hits)
+
+
+def _rrf_client_result(res: Dict[str, Any], k: int, rank_constant: int) -> Dict[str, Any]:
+    fused = rrf_fuse(res["knn"], res["bm25"], top_k=k, k_const=rank_constant) if res["knn"] else res["bm25"][:k]
+    return {**res, "fused": fused, "fusion": "client", "form": None}
+
+
+def search_hybrid_rrf(
+    es: Elasticsearch,
+    index: str,
+    query_text: str,
+    query_vector: List[float],
+    k: int = 12,
+    window: Optional[int] = None,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    text_field: str = TEXT_FIELD,
+    vector_field: str = VECTOR_FIELD,
+    num_candidates: Optional[int] = None,
+    rank_constant: int = RRF_RANK_CONSTANT,
+    source: SourceArg = None,
+    fallback_source: SourceArg = None,
+) -> Dict[str, Any]:
+    """
+    BM25 + kNN fused by Elasticsearch (RRF), returning only the fused top-k.
+
+    Returns {"fused", "bm25", "knn", "bm25_tier", "took", "fusion": "server"|"client", "form"}.
+    On clusters/licenses without RRF the first such error is remembered for
+    ES_RRF_RETRY_S and this (and later calls) fall back to search_hybrid_msearch() + rrf_fuse() over
+    `window` candidates per leg (with `fallback_source`, e.g. False for two-phase);
+    "bm25"/"knn" are only filled on that path. Other errors are raised.
+    Server-side BM25 uses the first ladder tier only; kNN fills in when it matches nothing.
+    """
+    window = max(window or k, k)
+    bodies = _rrf_bodies(query_text, query_vector, k, window, filters, text_field, vector_field,
+                         num_candidates, rank_constant, source, index)
+    for form in _rrf_forms():
+        try:
+            res = es.search(index=index, body=bodies[form])
+        except Exception as e:
+            if not _rrf_unsupported(e):
+                raise
+            _mark_rrf(form, False, e)
+            continue
+        _mark_rrf(form, True)
+        return _rrf_server_result(res, form)
+
+    res = search_hybrid_msearch(es, index, query_text, query_vector, k=window, filters=filters,
+                                text_field=text_field, vector_field=vector_field,
+                                num_candidates=num_candidates, source=fallback_source)
+    return _rrf_client_result(res, k, rank_constant)
+
+
+async def async_search_hybrid_rrf(
+    es: AsyncElasticsearch,
+    index: str,
+    query_text: str,
+    query_vector: List[float],
+    k: int = 12,
+    window: Optional[int] = None,
+    filters: Optional[Union[Dict[str, Any], Any]] = None,
+    text_field: str = TEXT_FIELD,
+    vector_field: str = VECTOR_FIELD,
+    num_candidates: Optional[int] = None,
+    rank_constant: int = RRF_RANK_CONSTANT,
+    source: SourceArg = None,
+    fallback_source: SourceArg = None,
+) -> Dict[str, Any]:
+    """Async twin of search_hybrid_rrf()."""
+    window = max(window or k, k)
+    bodies = _rrf_bodies(query_text, query_vector, k, window, filters, text_field, vector_field,
+                         num_candidates, rank_constant, source, index)
+    for form in _rrf_forms():
+        try:
+            res = await es.search(index=index, body=bodies[form])
+        except Exception as e:
+            if not _rrf_unsupported(e):
+                raise
+            _mark_rrf(form, False, e)
+            continue
+        _mark_rrf(form, True)
+        return _rrf_server_result(res, form)
+
+    res = await async_search_hybrid_msearch(es, index, query_text, query_vector, k=window, filters=filters,
+                                            text_field=text_field, vector_field=vector_field,
+                                            num_candidates=num_candidates, source=fallback_source)
+    return _rrf_client_result(res, k, rank_constant)
+
+
+# ---------------------------------------------------------------------
+# Two-phase retrieval: hydrate id-only candidates with one _mget
+# ---------------------------------------------------------------------
+def _mget_docs(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # the concrete _index from the candidate hit, so aliases spanning indices still resolve
+    return [{"_index": h["index"], "_id": h["id"]} if h.get("index") else {"_id": h["id"]} for h in hits]
+
+
+def _attach_sources(hits: List[Dict[str, Any]], resp: Dict[str, Any]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for h, doc in zip(hits, resp.get("docs", []) or []):
+        if not doc.get("found"):
+            continue  # deleted between the two phases
+        src = doc.get("_source") or {}
+        out.append({**h, "source": src, "_source": src})
+    return out
+
+
+def fetch_sources(
+    es: Elasticsearch,
+    index: str,
+    hits: List[Dict[str, Any]],
+    source: SourceArg = None,
+) -> List[Dict[str, Any]]:
+    """
+    Phase two: fill source/_source of id-only hits (source=False searches)
+    with a single _mget, keeping their order. Hits whose doc vanished are dropped.
+    """
+    if not hits:
+        return []
+    resp = es.mget(index=index, docs=_mget_docs(hits), source=_source_value(source))
+    return _attach_sources(hits, resp)
+
+
+async def async_fetch_sources(
+    es: AsyncElasticsearch,
+    index: str,
+    hits: List[Dict[str, Any]],
+    source: SourceArg = None,
+) -> List[Dict[str, Any]]:
+    """Async twin of fetch_sources()."""
+    if not hits:
+        return []
+    resp = await es.mget(index=index, docs=_mget_docs(hits), source=_source_value(source))
+    return _attach_sources(hits, resp)
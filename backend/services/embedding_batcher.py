@@ -0,0 +1,115 @@
+# micro-batching coalescer for concurrent query embeddings
+# backend/services/embedding_batcher.py
+"""
+Coalesce single-text embedding requests that arrive close together.
+
+Each caller awaits embed_query(text). Requests for the same (location, model)
+are held for at most EMBED_BATCH_WINDOW_MS or until EMBED_BATCH_MAX texts are
+queued, then sent as one embed_texts_async() call, and the vectors are fanned
+back out to the waiting callers. Under concurrent load this trades a bounded
+few milliseconds for far fewer Vertex calls per quota unit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from services.vertex_embeddings import embed_texts_async
+
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "3"))   # 0 disables coalescing
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+
+LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+EMBED_MODEL = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+
+EmbedFn = Callable[..., Awaitable[List[List[float]]]]
+BatchKey = Tuple[str, str]
+
+
+class EmbeddingBatcher:
+    """Per-event-loop batcher; futures and timers belong to the loop that created them."""
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn = embed_texts_async,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_batch: int = EMBED_BATCH_MAX,
+    ):
+        self.embed_fn = embed_fn
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[BatchKey, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()  # keep in-flight batches referenced
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text: str, location: str = LOCATION, model: str = EMBED_MODEL) -> List[float]:
+        if self.window_s <= 0:
+            return (await self.embed_fn([text], location=location, model=model))[0]
+
+        loop = asyncio.get_running_loop()
+        key = (location, model)
+        fut: asyncio.Future = loop.create_future()
+        queue = self._pending.setdefault(key, [])
+        queue.append((text, fut))
+
+        if len(queue) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window_s, self._flush, key)
+        return await fut
+
+    def _flush(self, key: BatchKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        if batch:
+            task = asyncio.ensure_future(self._run(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: BatchKey, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        location, model = key
+        self.batches += 1
+        self.texts += len(batch)
+        try:
+            vecs = await self.embed_fn([t for t, _ in batch], location=location, model=model)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), vec in zip(batch, vecs):
+            if not fut.done():
+                fut.set_result(vec)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch": (self.texts / self.batches) if self.batches else 0.0,
+            "window_ms": self.window_s * 1000.0,
+            "max_batch": self.max_batch,
+        }
+
+
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EmbeddingBatcher]" = weakref.WeakKeyDictionary()
+
+
+def get_batcher() -> EmbeddingBatcher:
+    loop = asyncio.get_running_loop()
+    b = _batchers.get(loop)
+    if b is None:
+        b = EmbeddingBatcher()
+        _batchers[loop] = b
+    return b
+
+
+async def embed_query(text: str, location: str = LOCATION, model: str = EMBED_MODEL) -> List[float]:
+    """Embed one query text via the running loop's batcher."""
+    return await get_batcher().embed(text, location=location, model=model)
@@ -0,0 +1,345 @@
+# persistent chunk-embedding store: SQLite keys + memory-mapped float32 vectors
+# backend/services/embedding_store.py
+"""
+Local store of document embeddings, keyed by (model, dims, sha256(text)).
+
+- Vectors live in one float32 file per (model, dims), opened as a numpy
+  memmap; SQLite maps each key to a row ("slot") in that file. Lookups copy
+  the rows out while holding the lock, since another process may evict a slot
+  and reuse it for a different text right after.
+- EMBED_STORE_MAX_MB caps the vector files; past it the least recently used
+  entries are evicted and their slots reused.
+- export()/import_file() move one (model, dims) group between machines as
+  .npz, so a fresh environment can rebuild an index without Vertex calls.
+
+The directory may be shared by several processes (API workers,
+scripts/ingest_local.py): reads and writes hold an exclusive flock on
+<dir>/.lock (reads also bump last_used), and vectors are written before the
+SQLite rows that point at them are committed.
+
+EMBED_STORE_DIR="" disables the store (embed_with_store then just calls the
+embed function).
+
+CLI:
+    python -m services.embedding_store stats
+    python -m services.embedding_store export out.npz --model text-embedding-005 --dims 768
+    python -m services.embedding_store import out.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.vertex_embeddings import EMBED_DIMS
+from utils.metrics import record_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: the store then only serializes writers within a process
+    fcntl = None  # type: ignore[assignment]
+
+EMBED_STORE_DIR = os.path.expanduser(os.getenv("EMBED_STORE_DIR", "~/.cache/searchsphere/embeddings"))
+EMBED_STORE_MAX_MB = float(os.getenv("EMBED_STORE_MAX_MB", "2048"))
+
+GROW_ROWS = 4096  # vector files grow by at least this many rows at a time
+
+GroupKey = Tuple[str, int]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, root: str, max_mb: float = EMBED_STORE_MAX_MB):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " model TEXT, dims INTEGER, hash TEXT, slot INTEGER, last_used REAL,"
+            " PRIMARY KEY (model, dims, hash))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vectors_lru ON vectors (model, dims, last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS free_slots (model TEXT, dims INTEGER, slot INTEGER)")
+        self._db.commit()
+        self._maps: Dict[GroupKey, np.memmap] = {}
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Serialize store access across threads and processes sharing `root`."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # -----------------------------------------------------------------
+    # Vector files
+    # -----------------------------------------------------------------
+    def _path(self, model: str, dims: int) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        return os.path.join(self.root, f"{safe}-{dims}.f32")
+
+    def _rows(self, model: str, dims: int) -> int:
+        path = self._path(model, dims)
+        return os.path.getsize(path) // (dims * 4) if os.path.exists(path) else 0
+
+    def _map(self, model: str, dims: int, min_rows: int = 0) -> Optional[np.memmap]:
+        key = (model, dims)
+        rows = self._rows(model, dims)
+        if rows < min_rows:
+            # Grow the file; views handed out from the old mapping stay valid
+            grow = max(rows + GROW_ROWS, rows * 2)
+            if self.max_bytes > 0:
+                grow = min(grow, self.max_bytes // (dims * 4))
+            rows = max(min_rows, grow)
+            with open(self._path(model, dims), "ab") as f:
+                f.truncate(rows * dims * 4)
+            self._maps.pop(key, None)
+        if rows == 0:
+            return None
+        mm = self._maps.get(key)
+        if mm is None or mm.shape[0] != rows:
+            mm = np.memmap(self._path(model, dims), dtype=np.float32, mode="r+", shape=(rows, dims))
+            self._maps[key] = mm
+        return mm
+
+    # -----------------------------------------------------------------
+    # Lookups / writes
+    # -----------------------------------------------------------------
+    def get_many(self, model: str, dims: int, hashes: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Copies of the stored vector for each hash (None where missing)."""
+        if not hashes:
+            return []
+        with self._exclusive():
+            slots: Dict[str, int] = {}
+            uniq = list(dict.fromkeys(hashes))
+            for i in range(0, len(uniq), 500):
+                part = uniq[i:i + 500]
+                q = ",".join("?" * len(part))
+                for h, slot in self._db.execute(
+                    f"SELECT hash, slot FROM vectors WHERE model=? AND dims=? AND hash IN ({q})",
+                    (model, dims, *part),
+                ):
+                    slots[h] = slot
+            if slots:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE vectors SET last_used=? WHERE model=? AND dims=? AND hash=?",
+                    [(now, model, dims, h) for h in slots],
+                )
+                self._db.commit()
+            mm = self._map(model, dims) if slots else None
+            # copy while locked: a slot can be evicted and rewritten once we let go
+            rows = {h: np.array(mm[slot]) for h, slot in slots.items()} if mm is not None else {}
+        out = [rows.get(h) for h in hashes]
+        hits = sum(v is not None for v in out)
+        record_cache("embed_store", "hit", hits)
+        record_cache("embed_store", "miss", len(out) - hits)
+        return out
+
+    def put_many(self, model: str, dims: int, hashes: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not hashes:
+            return
+        arr = np.asarray(vectors, dtype=np.float32).reshape(len(hashes), dims)
+        with self._exclusive():
+            now = time.time()
+            todo: Dict[str, np.ndarray] = dict(zip(hashes, arr))
+            existing = self._existing(model, dims, list(todo))
+            # Touch rows being rewritten so eviction prefers other entries
+            self._db.executemany(
+                "UPDATE vectors SET last_used=? WHERE model=? AND dims=? AND hash=?",
+                [(now, model, dims, h) for h in existing],
+            )
+            self._evict(model, dims, len(todo) - len(existing))
+            existing = self._existing(model, dims, list(todo))
+            new = [h for h in todo if h not in existing]
+
+            top = self._db.execute(
+                "SELECT MAX(m) FROM ("
+                " SELECT MAX(slot) AS m FROM vectors WHERE model=? AND dims=?"
+                " UNION ALL SELECT MAX(slot) FROM free_slots WHERE model=? AND dims=?)",
+                (model, dims, model, dims),
+            ).fetchone()[0]
+            top = -1 if top is None else top
+            free = [r[0] for r in self._db.execute(
+                "SELECT slot FROM free_slots WHERE model=? AND dims=? ORDER BY slot LIMIT ?",
+                (model, dims, len(new)),
+            )]
+            self._db.executemany(
+                "DELETE FROM free_slots WHERE model=? AND dims=? AND slot=?",
+                [(model, dims, s) for s in free],
+            )
+            slots = dict(existing)
+            for h in new:
+                if free:
+                    slots[h] = free.pop(0)
+                else:
+                    top += 1
+                    slots[h] = top
+            mm = self._map(model, dims, min_rows=max(slots.values()) + 1)
+            for h, row in todo.items():
+                mm[slots[h]] = row
+            mm.flush()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (model, dims, hash, slot, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(model, dims, h, slots[h], now) for h in todo],
+            )
+            self._db.commit()
+
+    def _existing(self, model: str, dims: int, hashes: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            q = ",".join("?" * len(part))
+            found.update(self._db.execute(
+                f"SELECT hash, slot FROM vectors WHERE model=? AND dims=? AND hash IN ({q})",
+                (model, dims, *part),
+            ).fetchall())
+        return found
+
+    def _evict(self, model: str, dims: int, incoming: int) -> None:
+        """Drop least-recently-used entries so the group stays under max_bytes after `incoming` adds."""
+        if self.max_bytes <= 0:
+            return
+        cap = max(1, self.max_bytes // (dims * 4))
+        count = self._db.execute(
+            "SELECT COUNT(*) FROM vectors WHERE model=? AND dims=?", (model, dims)
+        ).fetchone()[0]
+        excess = count + incoming - cap
+        if excess <= 0:
+            return
+        victims = self._db.execute(
+            "SELECT hash, slot FROM vectors WHERE model=? AND dims=? ORDER BY last_used LIMIT ?",
+            (model, dims, excess),
+        ).fetchall()
+        self._db.executemany(
+            "DELETE FROM vectors WHERE model=? AND dims=? AND hash=?", [(model, dims, h) for h, _ in victims]
+        )
+        self._db.executemany(
+            "INSERT INTO free_slots (model, dims, slot) VALUES (?, ?, ?)", [(model, dims, s) for _, s in victims]
+        )
+        record_cache("embed_store", "eviction", len(victims))
+
+    # -----------------------------------------------------------------
+    # Import / export / stats
+    # -----------------------------------------------------------------
+    def export(self, path: str, model: str, dims: int) -> int:
+        with self._exclusive():
+            rows = self._db.execute(
+                "SELECT hash, slot FROM vectors WHERE model=? AND dims=? ORDER BY slot", (model, dims)
+            ).fetchall()
+            mm = self._map(model, dims)
+            vecs = np.asarray(mm[[s for _, s in rows]]) if rows else np.zeros((0, dims), np.float32)
+        np.savez(path, hashes=np.array([h for h, _ in rows]), vectors=vecs,
+                 meta=np.array(json.dumps({"model": model, "dims": dims})))
+        return len(rows)
+
+    def import_file(self, path: str) -> int:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            hashes = [str(h) for h in data["hashes"]]
+            vecs = data["vectors"]
+            for i in range(0, len(hashes), 1000):
+                self.put_many(meta["model"], int(meta["dims"]), hashes[i:i + 1000], vecs[i:i + 1000])
+        return len(hashes)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT model, dims, COUNT(*) FROM vectors GROUP BY model, dims").fetchall()
+        return {
+            f"{m}/{d}": {"entries": n, "file_mb": round(self._rows(m, d) * d * 4 / (1024 * 1024), 1)}
+            for m, d, n in rows
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for mm in self._maps.values():
+                mm.flush()
+            self._maps.clear()
+            self._db.close()
+
+
+# ---------------------------------------------------------------------
+# Process-wide store + read-through helper
+# ---------------------------------------------------------------------
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[EmbeddingStore]:
+    global _store
+    if not EMBED_STORE_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore(EMBED_STORE_DIR)
+        return _store
+
+
+def embed_with_store(
+    texts: List[str],
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    model: str,
+    dims: int = EMBED_DIMS,
+    store: Optional[EmbeddingStore] = None,
+) -> List[List[float]]:
+    """Serve stored vectors, call embed_fn only for unseen texts, then store those."""
+    store = store or get_store()
+    if store is None or not texts:
+        return embed_fn(texts)
+    hashes = [text_hash(t) for t in texts]
+    found = store.get_many(model, dims, hashes)
+    missing: Dict[str, str] = {}
+    for h, t, v in zip(hashes, texts, found):
+        if v is None:
+            missing.setdefault(h, t)
+    fresh: Dict[str, List[float]] = {}
+    if missing:
+        vecs = embed_fn(list(missing.values()))
+        fresh = dict(zip(missing, vecs))
+        if vecs and len(vecs[0]) == dims:
+            store.put_many(model, dims, list(fresh), list(fresh.values()))
+    return [fresh[h] if v is None else v.tolist() for h, v in zip(hashes, found)]
+
+
+def _main() -> None:
+    ap = argparse.ArgumentParser(description="Inspect / move the local embedding store")
+    ap.add_argument("cmd", choices=["stats", "export", "import"])
+    ap.add_argument("path", nargs="?")
+    ap.add_argument("--model", default=os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005"))
+    ap.add_argument("--dims", type=int, default=EMBED_DIMS)
+    args = ap.parse_args()
+    store = get_store()
+    if store is None:
+        raise SystemExit("EMBED_STORE_DIR is empty; store disabled")
+    if args.cmd == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    elif args.cmd == "export":
+        print(f"[embed_store] exported {store.export(args.path, args.model, args.dims)} vectors → {args.path}")
+    else:
+        print(f"[embed_store] imported {store.import_file(args.path)} vectors from {args.path}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,154 @@
+# file → page texts, off the event loop and off the GIL
+# backend/services/extraction.py
+"""
+Text extraction for ingest, run in a process pool.
+
+- PDFs are read page by page. Documents longer than EXTRACT_PAGES_PER_TASK
+  pages are split into page ranges that run on different workers, and pages
+  are yielded in order as their range finishes, so chunking/embedding can
+  start before the whole file is parsed.
+- Spooled CSV/text files are decoded incrementally in-process and yielded
+  as ~1 MB pieces (page number None), so memory does not grow with the file;
+  a worker round-trip would need the whole decoded text at once. In-memory
+  CSV/text payloads are decoded in a worker as a single piece, or in-process
+  under EXTRACT_INLINE_BYTES where IPC costs more than the decode.
+- PDFs given by path are memory-mapped by the page readers.
+- EXTRACT_WORKERS=0 runs everything in-process (same code path, no pool).
+
+Workers use the "spawn" start method: the API process is multi-threaded
+(uvicorn, ES/Vertex clients, ingest jobs), and forking it is unsafe.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterator, Optional, Tuple
+
+from utils.chunker import (
+    iter_csv_file,
+    iter_text_file,
+    pdf_page_count,
+    read_csv_bytes,
+    read_pdf_pages,
+    read_text_bytes,
+)
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "8"))
+EXTRACT_INLINE_BYTES = int(os.getenv("EXTRACT_INLINE_BYTES", str(256 * 1024)))
+
+Page = Tuple[Optional[int], str]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Lazily start the shared pool; None when EXTRACT_WORKERS <= 0."""
+    global _pool
+    if EXTRACT_WORKERS <= 0:
+        return None
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(pool: Optional[ProcessPoolExecutor], fn: Callable[..., Any], *args: Any) -> Future:
+    if pool is not None:
+        return pool.submit(fn, *args)
+    fut: Future = Future()
+    try:
+        fut.set_result(fn(*args))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+
+# ---------------------------------------------------------------------
+# Worker entry points (top-level so they pickle)
+# ---------------------------------------------------------------------
+def _decode(kind: str, data: Optional[bytes]) -> str:
+    raw = data or b""
+    return read_csv_bytes(raw) if kind == "csv" else read_text_bytes(raw)
+
+
+# ---------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------
+def file_kind(filename: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith(".csv"):
+        return "csv"
+    return "text"
+
+
+def _pdf_pages(path: str, pool: Optional[ProcessPoolExecutor]) -> Iterator[Page]:
+    total = _submit(pool, pdf_page_count, path).result()
+    step = max(1, EXTRACT_PAGES_PER_TASK)
+    window = max(1, EXTRACT_WORKERS) * 2  # ranges in flight for this document
+    ranges = iter(range(0, total, step))
+    inflight: Deque[Future] = deque()
+    try:
+        for start in ranges:
+            inflight.append(_submit(pool, read_pdf_pages, path, start, min(start + step, total)))
+            if len(inflight) >= window:
+                yield from inflight.popleft().result()
+        while inflight:
+            yield from inflight.popleft().result()
+    finally:
+        for fut in inflight:
+            fut.cancel()
+
+
+def iter_pages(filename: str, path: Optional[str] = None, data: Optional[bytes] = None) -> Iterator[Page]:
+    """
+    Yield (page_num, text) for a file given by `path` or raw `data`.
+    PDF page numbers are 1-based; CSV/text pieces all have page None and
+    should be chunked as one continuous stream.
+    """
+    kind = file_kind(filename)
+    if kind != "pdf" and path is not None:
+        reader = iter_csv_file if kind == "csv" else iter_text_file
+        for piece in reader(path):
+            yield None, piece
+        return
+    if kind != "pdf":
+        pool = None if len(data or b"") <= EXTRACT_INLINE_BYTES else get_pool()
+        yield None, _submit(pool, _decode, kind, data).result()
+        return
+
+    pool = get_pool()
+    tmp: Optional[str] = None
+    if path is None:
+        # Workers get a path, not a pickled copy of the bytes per page range
+        fd, tmp = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data or b"")
+        path = tmp
+    try:
+        yield from _pdf_pages(path, pool)
+    finally:
+        if tmp is not None:
+            os.unlink(tmp)
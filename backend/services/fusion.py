@@ -0,0 +1,195 @@
+# N-way rank fusion (RRF, weighted RRF, normalized linear) over NumPy arrays
+# backend/services/fusion.py
+"""
+Fuse any number of ranked hit lists (kNN, BM25, future sources) into one top_k.
+
+Methods (FUSION_METHOD, overridable per call):
+  - "rrf":    score = Σ_s w_s / (k_const + rank_s); all weights 1 is plain RRF
+              and gives the same order as rank_fusion.rrf_fuse, other
+              weights (FUSION_WEIGHTS, e.g. "knn=1.0,bm25=0.6") weighted RRF
+  - "linear": score = Σ_s w_s * norm_s(score_s), norm "minmax" or "zscore"
+              (FUSION_NORM) per source and query; a candidate missing from a
+              source gets that source's lowest normalized score. With weights
+              (alpha, 1 - alpha) this is utils.scoring.linear_combine, vectorized.
+
+Candidates are keyed by hit id and mapped to array columns once; ranks and
+scores go into (queries, sources, candidates) arrays, fused in one pass, and
+the top_k comes from np.argpartition (ties: first-seen hit wins), so only k
+items are sorted. fuse_many() does a whole batch (e.g. an eval run) at once.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FUSION_METHODS = ("rrf", "linear")
+FUSION_NORMS = ("minmax", "zscore")
+SOURCES = ("knn", "bm25")  # order of the lists retrieval passes in
+
+FUSION_METHOD = (os.getenv("FUSION_METHOD") or "rrf").lower()
+FUSION_NORM = (os.getenv("FUSION_NORM") or "minmax").lower()
+FUSION_K_CONST = int(os.getenv("FUSION_K_CONST", "60"))
+
+Hits = List[Dict[str, Any]]
+
+
+def parse_weights(spec: Optional[str], sources: Sequence[str] = SOURCES) -> List[float]:
+    """'knn=1.0,bm25=0.6' -> [1.0, 0.6] in `sources` order; unnamed sources weigh 1."""
+    weights = {s: 1.0 for s in sources}
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in weights and value.strip():
+            weights[name.strip()] = float(value)
+    return [weights[s] for s in sources]
+
+
+FUSION_WEIGHTS = parse_weights(os.getenv("FUSION_WEIGHTS"))
+
+
+def _hit_key(hit: Dict[str, Any]) -> Any:
+    # raw ES hits carry "_id", elastic_client._format_hits output "id"
+    key = hit.get("_id") or hit.get("id")
+    if key is None:
+        src = hit.get("_source") or {}
+        key = f"{src.get('doc_id')}::{src.get('page_num')}"
+    return key
+
+
+def _hit_score(hit: Dict[str, Any]) -> float:
+    score = hit.get("score", hit.get("_score"))
+    return float(score) if score is not None else 0.0
+
+
+def _columns(lists: Sequence[Hits]) -> Tuple[Hits, List[List[int]], List[List[float]]]:
+    """Unique hits in first-seen order; per list the column and score of each hit."""
+    col: Dict[Any, int] = {}
+    uniq: Hits = []
+    per_list: List[List[int]] = []
+    per_score: List[List[float]] = []
+    for hits in lists:
+        cols: List[int] = []
+        scores: List[float] = []
+        for h in hits:
+            c = col.setdefault(_hit_key(h), len(uniq))
+            if c == len(uniq):
+                uniq.append(h)
+            cols.append(c)
+            scores.append(_hit_score(h))
+        per_list.append(cols)
+        per_score.append(scores)
+    return uniq, per_list, per_score
+
+
+def _arrays(runs: Sequence[Sequence[Hits]], n_sources: int) -> Tuple[List[Hits], np.ndarray, np.ndarray]:
+    """
+    (unique hits per query, ranks, scores) with ranks/scores shaped (Q, S, C_max);
+    rank 0 = not in that list (or padding). A repeated id keeps its best rank.
+    """
+    columns = [_columns(lists) for lists in runs]
+    width = max((len(c[0]) for c in columns), default=0)
+    ranks = np.zeros((len(runs), n_sources, width), dtype=np.float64)
+    scores = np.zeros_like(ranks)
+    for q, (_, per_list, per_score) in enumerate(columns):
+        for s, (cols, vals) in enumerate(zip(per_list, per_score)):
+            if not cols:
+                continue
+            # reversed so the first (best-ranked) occurrence of a repeated id wins
+            idx = np.asarray(cols[::-1], dtype=np.intp)
+            ranks[q, s, idx] = np.arange(len(cols), 0, -1, dtype=np.float64)
+            scores[q, s, idx] = vals[::-1]
+    return [c[0] for c in columns], ranks, scores
+
+
+def _normalize(scores: np.ndarray, present: np.ndarray, norm: str) -> np.ndarray:
+    """Per (query, source) normalization over present candidates; missing -> the lowest value."""
+    n = np.maximum(present.sum(axis=-1, keepdims=True), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if norm == "minmax":
+            lo = np.where(present, scores, np.inf).min(axis=-1, keepdims=True, initial=np.inf)
+            hi = np.where(present, scores, -np.inf).max(axis=-1, keepdims=True, initial=-np.inf)
+            rng = hi - lo
+            out = np.where(rng > 0, (scores - lo) / rng, 1.0)
+        else:
+            mean = np.where(present, scores, 0.0).sum(axis=-1, keepdims=True) / n
+            std = np.sqrt(np.where(present, (scores - mean) ** 2, 0.0).sum(axis=-1, keepdims=True) / n)
+            out = np.where(std > 0, (scores - mean) / std, 0.0)
+    floor = np.where(present, out, np.inf).min(axis=-1, keepdims=True, initial=np.inf)
+    floor = np.where(np.isfinite(floor), floor, 0.0)
+    return np.where(present, out, floor)
+
+
+def fused_scores(
+    ranks: np.ndarray,
+    scores: np.ndarray,
+    method: str = FUSION_METHOD,
+    weights: Optional[Sequence[float]] = None,
+    k_const: int = FUSION_K_CONST,
+    norm: str = FUSION_NORM,
+) -> np.ndarray:
+    """(Q, S, C) ranks/scores -> (Q, C) fused scores; -inf where no source has the column."""
+    if method not in FUSION_METHODS:
+        raise ValueError(f"unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+    if norm not in FUSION_NORMS:
+        raise ValueError(f"unknown fusion norm {norm!r}; expected one of {FUSION_NORMS}")
+    present = ranks > 0
+    w = np.ones(ranks.shape[-2]) if weights is None else np.asarray(weights, dtype=np.float64)
+    if w.shape != (ranks.shape[-2],):
+        raise ValueError(f"{w.size} weights for {ranks.shape[-2]} sources")
+    if method == "rrf":
+        per_source = np.where(present, 1.0 / (k_const + ranks), 0.0)
+    else:
+        per_source = _normalize(scores, present, norm)
+    fused = (w[:, None] * per_source).sum(axis=-2)
+    return np.where(present.any(axis=-2), fused, -np.inf)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best finite scores, best first; ties go to the lower index."""
+    valid = np.flatnonzero(np.isfinite(scores))
+    if k <= 0 or valid.size == 0:
+        return valid[:0]
+    if k < valid.size:
+        part = valid[np.argpartition(-scores[valid], k - 1)[:k]]
+        kth = scores[part].min()
+        # argpartition is not stable: settle ties at the cut in first-seen order
+        above = valid[scores[valid] > kth]
+        ties = valid[scores[valid] == kth][: k - above.size]
+        valid = np.concatenate([above, ties])
+    return valid[np.lexsort((valid, -scores[valid]))]
+
+
+def fuse_many(
+    runs: Sequence[Sequence[Hits]],
+    top_k: int = 12,
+    method: str = FUSION_METHOD,
+    weights: Optional[Sequence[float]] = None,
+    k_const: int = FUSION_K_CONST,
+    norm: str = FUSION_NORM,
+) -> List[Hits]:
+    """
+    Fuse a batch: runs[q] is the list of ranked hit lists for query q (same
+    sources, same order, for every query). Returns the fused top_k per query.
+    """
+    if not runs:
+        return []
+    n_sources = len(runs[0])
+    if any(len(lists) != n_sources for lists in runs):
+        raise ValueError("every query needs the same number of ranked lists")
+    uniq, ranks, scores = _arrays(runs, n_sources)
+    fused = fused_scores(ranks, scores, method, weights, k_const, norm)
+    return [[hits[i] for i in top_k_indices(fused[q], top_k)] for q, hits in enumerate(uniq)]
+
+
+def fuse(
+    lists: Sequence[Hits],
+    top_k: int = 12,
+    method: str = FUSION_METHOD,
+    weights: Optional[Sequence[float]] = None,
+    k_const: int = FUSION_K_CONST,
+    norm: str = FUSION_NORM,
+) -> Hits:
+    """Fuse N ranked hit lists for one query (see module docstring for the methods)."""
+    return fuse_many([lists], top_k, method, weights, k_const, norm)[0]
@@ -5,18 +5,21 @@
 
 - Uses Application Default Credentials (service account) via GOOGLE_APPLICATION_CREDENTIALS
 - Requires: GCP_PROJECT_ID, VERTEX_LOCATION, VERTEX_CHAT_MODEL (optional; defaults provided)
-- Returns: (answer_text, citations_list)
+- Returns: (answer_text, citations_list); stream_answer() yields the answer
+  text chunk by chunk (generate_content(stream=True)) and citations_for()
+  gives the matching citations up front
 """
 
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig
+from vertexai.generative_models import GenerationConfig
 from google.api_core.exceptions import GoogleAPICallError, NotFound, PermissionDenied
 
+from services.vertex_models import get_generative_model, init_vertex
+
 
 # ---------------------------------------------------------------------------
 # System instruction used in the prompt
@@ -64,7 +67,8 @@ def _normalize_model_id(model: str | None) -> str:
 # ---------------------------------------------------------------------------
 def _ensure_vertex() -> Tuple[str, str]:
     """
-    Initialize Vertex AI with project & location from environment.
+    Initialize Vertex AI with project & location from environment
+    (once per process; see services.vertex_models).
     """
     project = os.getenv("GCP_PROJECT_ID")
     location = os.getenv("VERTEX_LOCATION", "us-central1")
@@ -74,9 +78,7 @@ def _ensure_vertex() -> Tuple[str, str]:
     if not location:
         location = "us-central1"
 
-    # Initialize Vertex SDK
-    vertexai.init(project=project, location=location)
-    return project, location
+    return init_vertex(location, project)
 
 
 # ---------------------------------------------------------------------------
@@ -142,9 +144,40 @@ def _extract_text(gen_response: Any) -> str:
     return (str(gen_response) or "").strip()
 
 
+def _chunk_text(chunk: Any) -> str:
+    """
+    Text of one streamed chunk; "" for chunks without text (e.g. the final
+    finish-reason/usage chunk, where .text raises).
+    """
+    try:
+        t = chunk.text
+        if isinstance(t, str):
+            return t
+    except Exception:
+        pass
+    try:
+        return "".join(p.text for p in chunk.candidates[0].content.parts if getattr(p, "text", None))
+    except Exception:
+        return ""
+
+
+def _generation_config(temperature: float, max_output_tokens: int, top_p: float, top_k: int) -> GenerationConfig:
+    return GenerationConfig(
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        top_p=top_p,
+        top_k=top_k,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
+def citations_for(contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The citations list answer_with_citations()/stream_answer() number the context with."""
+    return _build_prompt("", contexts)[1]
+
+
 def answer_with_citations(
     query: str,
     contexts: List[Dict[str, Any]],
@@ -161,19 +194,14 @@ def answer_with_citations(
     Returns: (answer_text, citations_list)
     Raises: PermissionDenied, NotFound, GoogleAPICallError, RuntimeError (bad config)
     """
-    _ensure_vertex()
+    _, location = _ensure_vertex()
     model_id = _normalize_model_id(model or os.getenv("VERTEX_CHAT_MODEL"))
 
     prompt, citations = _build_prompt(query, contexts)
 
     try:
-        gen = GenerativeModel(model_id)
-        cfg = GenerationConfig(
-            temperature=temperature,
-            max_output_tokens=max_output_tokens,
-            top_p=top_p,
-            top_k=top_k,
-        )
+        gen = get_generative_model(model_id, location)
+        cfg = _generation_config(temperature, max_output_tokens, top_p, top_k)
         response = gen.generate_content(prompt, generation_config=cfg)
         text = _extract_text(response)
         if not text:
@@ -196,3 +224,52 @@ def answer_with_citations(
     except Exception as e:
         print(f"[gemini_rag] Vertex unexpected error model={model_id}: {e}")
         raise
+
+
+def stream_answer(
+    query: str,
+    contexts: List[Dict[str, Any]],
+    model: Optional[str] = None,
+    *,
+    temperature: float = 0.2,
+    max_output_tokens: int = 2048,
+    top_p: float = 0.95,
+    top_k: int = 40,
+) -> Iterator[str]:
+    """
+    Streaming twin of answer_with_citations(): yields answer text chunks as the
+    model produces them (blocking iterator; run it off the event loop).
+    Citations for the same numbering come from citations_for(contexts).
+
+    Raises (on iteration): PermissionDenied, NotFound, GoogleAPICallError, RuntimeError
+    """
+    _, location = _ensure_vertex()
+    model_id = _normalize_model_id(model or os.getenv("VERTEX_CHAT_MODEL"))
+
+    prompt, _ = _build_prompt(query, contexts)
+
+    try:
+        gen = get_generative_model(model_id, location)
+        cfg = _generation_config(temperature, max_output_tokens, top_p, top_k)
+        chunks = 0
+        for chunk in gen.generate_content(prompt, generation_config=cfg, stream=True):
+            text = _chunk_text(chunk)
+            if text:
+                chunks += 1
+                yield text
+        if not chunks:
+            raise GoogleAPICallError("Empty response from model")
+        print(f"[gemini_rag] Vertex stream success model={model_id} chunks={chunks}")
+
+    except NotFound as nf:
+        print(f"[gemini_rag] Vertex not found model={model_id}: {nf}")
+        raise
+    except PermissionDenied as pd:
+        print(f"[gemini_rag] Vertex permission denied model={model_id}: {pd}")
+        raise
+    except GoogleAPICallError as ge:
+        print(f"[gemini_rag] Vertex API error model={model_id}: {ge}")
+        raise
+    except Exception as e:
+        print(f"[gemini_rag] Vertex unexpected error model={model_id}: {e}")
+        raise
@@ -0,0 +1,228 @@
+# backend/services/index_schema.py
+# Index body (settings + mappings) and the managed index template for SearchSphere indices.
+"""
+Storage layout of the chunk index, shared by ingest_local, migrate_index and
+the managed index template:
+
+- 'vector' is indexed (HNSW) but left out of _source (ELASTIC_SOURCE_MODE=
+  exclude_vectors), or the whole _source is synthetic (=synthetic, needs a
+  license that allows it); =stored keeps the old layout
+- stored fields use the best_compression codec (ELASTIC_INDEX_CODEC)
+- segments are sorted on team, doc_type, created_at (the filter fields), so
+  filtered queries touch fewer, denser blocks
+- HNSW graph parameters come from ELASTIC_HNSW_M / ELASTIC_HNSW_EF_CONSTRUCTION
+
+Index settings such as codec and sort only apply at creation; move an
+existing index onto them with scripts/migrate_index.py (or reindex).
+
+    python -m services.index_schema --install-template   # put/refresh the template
+    python -m services.index_schema --show               # print the index body
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from services.vertex_embeddings import EMBED_DIMS
+
+ALIAS = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+VECTOR_SIMILARITY = os.getenv("ELASTIC_VECTOR_SIMILARITY", "cosine")
+# HNSW variant for the vector field: "hnsw" (float32), "int8_hnsw" (scalar-quantized,
+# ~4x less vector memory; what ES 8.14+ picks for new indices anyway) or "" to leave
+# index_options to the cluster (then m/ef_construction are not set). Dims come from VERTEX_EMBED_DIMS.
+VECTOR_INDEX_TYPE = os.getenv("ELASTIC_VECTOR_INDEX_TYPE", "int8_hnsw")
+VECTOR_INDEX_TYPES = ("hnsw", "int8_hnsw", "int4_hnsw", "flat", "int8_flat")
+# Graph degree / build beam; ES defaults are 16 / 100. A wider build beam costs
+# indexing time only and buys recall back from quantization.
+HNSW_M = int(os.getenv("ELASTIC_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("ELASTIC_HNSW_EF_CONSTRUCTION", "200"))
+
+SOURCE_MODE = os.getenv("ELASTIC_SOURCE_MODE", "exclude_vectors")  # exclude_vectors | synthetic | stored
+SOURCE_MODES = ("exclude_vectors", "synthetic", "stored")
+INDEX_CODEC = os.getenv("ELASTIC_INDEX_CODEC", "best_compression")  # "" = ES default (LZ4)
+INDEX_SORT = [("team", "asc"), ("doc_type", "asc"), ("created_at", "desc")]
+
+TEMPLATE_NAME = os.getenv("ELASTIC_INDEX_TEMPLATE", f"{ALIAS}-template")
+TEMPLATE_VERSION = 2  # bump when the body below changes so ensure_template() re-puts it
+TEMPLATE_PRIORITY = 200
+
+
+def vector_mapping(
+    dims: int = EMBED_DIMS,
+    index_type: str = VECTOR_INDEX_TYPE,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+) -> Dict[str, Any]:
+    field: Dict[str, Any] = {"type": "dense_vector", "dims": dims, "index": True, "similarity": VECTOR_SIMILARITY}
+    if not index_type:
+        return field
+    if index_type not in VECTOR_INDEX_TYPES:
+        raise ValueError(f"unknown vector index type {index_type!r}; expected one of {VECTOR_INDEX_TYPES}")
+    options: Dict[str, Any] = {"type": index_type}
+    if index_type.endswith("hnsw"):
+        options.update(m=m, ef_construction=ef_construction)
+    field["index_options"] = options
+    return field
+
+
+def _source_mapping(mode: str) -> Optional[Dict[str, Any]]:
+    if mode not in SOURCE_MODES:
+        raise ValueError(f"unknown source mode {mode!r}; expected one of {SOURCE_MODES}")
+    if mode == "exclude_vectors":
+        return {"excludes": ["vector"]}
+    if mode == "synthetic":
+        return {"mode": "synthetic"}
+    return None
+
+
+def index_body(
+    dims: int = EMBED_DIMS,
+    replicas: int = 1,
+    index_type: str = VECTOR_INDEX_TYPE,
+    source_mode: str = SOURCE_MODE,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+) -> Dict[str, Any]:
+    """Settings + mappings for a searchsphere chunk index with a `dims`-wide 'vector' field."""
+    index_settings: Dict[str, Any] = {"number_of_shards": 1, "number_of_replicas": replicas}
+    if INDEX_CODEC:
+        index_settings["codec"] = INDEX_CODEC
+    if INDEX_SORT:
+        index_settings["sort.field"] = [f for f, _ in INDEX_SORT]
+        index_settings["sort.order"] = [o for _, o in INDEX_SORT]
+    mappings: Dict[str, Any] = {
+        "properties": {
+            "title":    {"type": "text"},
+            "doc_id":   {"type": "keyword"},
+            "chunk_id": {"type": "keyword"},
+            "url":      {"type": "keyword"},
+            "text":     {"type": "text"},
+            "team":     {"type": "keyword"},
+            "doc_type": {"type": "keyword"},
+            "page_num": {"type": "integer"},
+            "content_hash": {"type": "keyword"},
+            "created_at": {"type": "date"},
+            "vector":   vector_mapping(dims, index_type, m, ef_construction),
+        }
+    }
+    source = _source_mapping(source_mode)
+    if source is not None:
+        mappings["_source"] = source
+    return {"settings": {"index": index_settings}, "mappings": mappings}
+
+
+def vector_dims(es: Any, index: str, field: str = "vector") -> int:
+    """dims of `field` in the index (or alias target) `index`; 0 if unmapped."""
+    resp = es.indices.get_mapping(index=index)
+    for body in dict(resp).values():
+        prop = ((body.get("mappings") or {}).get("properties") or {}).get(field) or {}
+        if prop.get("dims"):
+            return int(prop["dims"])
+    return 0
+
+
+def source_has_vectors(es: Any, index: str, field: str = "vector") -> bool:
+    """False when `field` is excluded from _source (or _source is synthetic/disabled)."""
+    resp = es.indices.get_mapping(index=index)
+    for body in dict(resp).values():
+        src = (body.get("mappings") or {}).get("_source") or {}
+        if src.get("enabled") is False or src.get("mode") == "synthetic" or field in (src.get("excludes") or []):
+            return False
+    return True
+
+
+def storage_stats(es: Any, index: str, field: str = "vector") -> Dict[str, Optional[int]]:
+    """Primary store bytes, doc/segment counts and (if _disk_usage is allowed) per-field bytes."""
+    stats = es.indices.stats(index=index, metric=["store", "docs", "segments"])["_all"]["primaries"]
+    out: Dict[str, Optional[int]] = {
+        "store_bytes": stats["store"]["size_in_bytes"],
+        "docs": stats["docs"]["count"],
+        "segments": stats["segments"]["count"],
+        "vector_bytes": None,
+        "source_bytes": None,
+    }
+    try:
+        usage = dict(es.indices.disk_usage(index=index, run_expensive_tasks=True))
+        body = next(v for k, v in usage.items() if k != "_shards")
+        fields = body.get("fields", {})
+        out["vector_bytes"] = (fields.get(field) or {}).get("total_in_bytes")
+        out["source_bytes"] = (fields.get("_source") or {}).get("total_in_bytes")
+    except Exception as e:
+        print(f"[schema] _disk_usage unavailable on {index}: {type(e).__name__}")
+    return out
+
+
+# ---------------------------------------------------------------------
+# Managed index template
+# ---------------------------------------------------------------------
+def template_patterns(alias: str = ALIAS) -> List[str]:
+    # the bare name covers a first, unaliased index; _v* covers migrate_index.py targets
+    return [alias, f"{alias}_v*"]
+
+
+def _vector_meta(index_type: str, m: int, ef_construction: int) -> Dict[str, Any]:
+    return {"type": index_type, "m": m, "ef_construction": ef_construction}
+
+
+def template_body(
+    alias: str = ALIAS,
+    dims: int = EMBED_DIMS,
+    index_type: str = VECTOR_INDEX_TYPE,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+) -> Dict[str, Any]:
+    return {
+        "index_patterns": template_patterns(alias),
+        "priority": TEMPLATE_PRIORITY,
+        "template": index_body(dims=dims, index_type=index_type, m=m, ef_construction=ef_construction),
+        "_meta": {"managed_by": "searchsphere", "version": TEMPLATE_VERSION, "dims": dims,
+                  "vector": _vector_meta(index_type, m, ef_construction)},
+    }
+
+
+def ensure_template(
+    es: Any,
+    alias: str = ALIAS,
+    dims: int = EMBED_DIMS,
+    name: str = TEMPLATE_NAME,
+    index_type: str = VECTOR_INDEX_TYPE,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+) -> bool:
+    """
+    Install the index template unless the same version, dims and vector options
+    are already there. Returns True when it was (re)written. Existing indices are
+    not touched.
+    """
+    try:
+        current = es.indices.get_index_template(name=name)["index_templates"][0]["index_template"]
+        meta = current.get("_meta") or {}
+        if (meta.get("version"), meta.get("dims"), meta.get("vector")) == (
+            TEMPLATE_VERSION, dims, _vector_meta(index_type, m, ef_construction)
+        ):
+            return False
+    except Exception:
+        pass  # missing (404) -> create
+    es.indices.put_index_template(name=name, **template_body(alias, dims, index_type, m, ef_construction))
+    print(f"[schema] installed index template {name} for {template_patterns(alias)}")
+    return True
+
+
+def _main() -> None:
+    ap = argparse.ArgumentParser(description="SearchSphere index template / mapping")
+    ap.add_argument("--install-template", action="store_true", help="put the managed index template")
+    ap.add_argument("--show", action="store_true", help="print the index body")
+    ap.add_argument("--alias", default=ALIAS)
+    ap.add_argument("--dims", type=int, default=EMBED_DIMS)
+    args = ap.parse_args()
+    if args.show or not args.install_template:
+        print(json.dumps(template_body(args.alias, args.dims), indent=2))
+    if args.install_template:
+        from services.elastic_client import get_es
+
+        ensure_template(get_es(), args.alias, args.dims)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,316 @@
+# background ingest jobs: spooled uploads + SQLite job store + bounded worker pool
+# backend/services/ingest_jobs.py
+"""
+Ingest jobs for uploads too large to process inside one HTTP request.
+
+- The endpoint spools files under INGEST_SPOOL_DIR/<job_id>/ and calls
+  create_job(), which records the job in SQLite and queues it.
+- INGEST_JOB_WORKERS threads run services.ingest_pipeline.run_pipeline,
+  writing progress (chunks extracted/embedded/indexed, throughput, errors)
+  back to the store roughly once a second.
+- Job rows survive restarts: start_workers() re-queues jobs that were queued
+  or running when the process stopped. Re-running is safe because chunk ids
+  are stable, so bulk indexing overwrites instead of duplicating.
+- Several processes may share one store. A worker claims a job with a single
+  queued -> running UPDATE and keeps a heartbeat on it while it runs; only
+  running jobs whose heartbeat is older than INGEST_JOB_LEASE_S are treated as
+  abandoned and re-queued. Cancellation is also relayed through the store, so
+  any process can cancel a job another one is running.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.ingest_pipeline import IngestCancelled, run_pipeline
+
+INGEST_JOBS_DIR = os.getenv("INGEST_JOBS_DIR", "/tmp/searchsphere_ingest")
+INGEST_JOBS_DB = os.getenv("INGEST_JOBS_DB", os.path.join(INGEST_JOBS_DIR, "jobs.sqlite"))
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", os.path.join(INGEST_JOBS_DIR, "spool"))
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+INGEST_JOB_LEASE_S = float(os.getenv("INGEST_JOB_LEASE_S", "60"))
+
+ACTIVE = ("queued", "running")
+FINAL = ("done", "failed", "cancelled")
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_cancel_events: Dict[str, threading.Event] = {}
+_stopping = threading.Event()  # process shutdown: interrupt jobs but keep them queued
+_owned: set = set()  # ids of jobs this process has claimed and is running
+_heartbeat: Optional[threading.Thread] = None
+_BOOT_ID = uuid.uuid4().hex[:8]
+_migrated: set = set()
+
+
+# ---------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """Short-lived connection per operation (safe across worker threads); commits on success."""
+    os.makedirs(os.path.dirname(INGEST_JOBS_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(INGEST_JOBS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, index_name TEXT,"
+            " sources TEXT NOT NULL, progress TEXT, error TEXT,"
+            " cancel_requested INTEGER DEFAULT 0,"
+            " created_at REAL, started_at REAL, finished_at REAL, updated_at REAL,"
+            " owner TEXT, heartbeat REAL)"
+        )
+        if INGEST_JOBS_DB not in _migrated:
+            # stores created before claims/leases lack these columns
+            cols = {r["name"] for r in conn.execute("PRAGMA table_info(ingest_jobs)")}
+            for col, typ in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if col not in cols:
+                    conn.execute(f"ALTER TABLE ingest_jobs ADD COLUMN {col} {typ}")
+            _migrated.add(INGEST_JOBS_DB)
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _update(job_id: str, **fields: Any) -> None:
+    fields["updated_at"] = time.time()
+    if "progress" in fields and not isinstance(fields["progress"], str):
+        fields["progress"] = json.dumps(fields["progress"])
+    cols = ", ".join(f"{k}=?" for k in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE ingest_jobs SET {cols} WHERE id=?", (*fields.values(), job_id))
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["progress"] = json.loads(job["progress"]) if job.get("progress") else None
+    sources = json.loads(job.pop("sources") or "[]")
+    job["files"] = [s.get("title") or s.get("doc_id") for s in sources]
+    job["cancel_requested"] = bool(job.get("cancel_requested"))
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM ingest_jobs WHERE id=?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(limit: int = 20) -> List[Dict[str, Any]]:
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT * FROM ingest_jobs ORDER BY created_at DESC LIMIT ?", (max(1, limit),)
+        ).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def spool_dir(job_id: str) -> str:
+    path = os.path.join(INGEST_SPOOL_DIR, job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+# ---------------------------------------------------------------------
+# Progress
+# ---------------------------------------------------------------------
+def _progress(stats: Dict[str, Any], t0: float) -> Dict[str, Any]:
+    stages = stats["stages"]
+    elapsed = max(1e-9, time.time() - t0)
+    return {
+        "chunks_extracted": stages["chunk"]["items"],
+        "chunks_embedded": stages["embed"]["items"],
+        "chunks_indexed": stages["index"]["items"],
+        "chunks_unchanged": stats["dedup"]["unchanged"],
+        "chunks_deleted": stats["dedup"]["deleted"],
+        "files_extracted": stages["extract"]["items"],
+        "chunks_per_sec": round(stages["index"]["items"] / elapsed, 1),
+        "errors": sum(st["errors"] for st in stages.values()),
+        "error_samples": list(stats["errors"][:5]),
+        "elapsed_s": round(elapsed, 1),
+    }
+
+
+# ---------------------------------------------------------------------
+# Claims and leases
+# ---------------------------------------------------------------------
+def _owner() -> str:
+    # evaluated per call so forked workers don't share an identity
+    return f"{socket.gethostname()}:{os.getpid()}:{_BOOT_ID}"
+
+
+def _claim(job_id: str) -> bool:
+    """Atomically move a queued job to running for this process; False if someone else has it."""
+    now = time.time()
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE ingest_jobs SET status='running', owner=?, heartbeat=?, started_at=?, updated_at=?"
+            " WHERE id=? AND status='queued'",
+            (_owner(), now, now, now, job_id),
+        )
+    return cur.rowcount == 1
+
+
+def _beat() -> None:
+    """Renew the lease on every job this process runs and pick up cancels made elsewhere."""
+    ids = list(_owned)
+    if not ids:
+        return
+    marks = ", ".join("?" * len(ids))
+    with _connect() as conn:
+        conn.execute(
+            f"UPDATE ingest_jobs SET heartbeat=? WHERE owner=? AND status='running' AND id IN ({marks})",
+            (time.time(), _owner(), *ids),
+        )
+        rows = conn.execute(
+            f"SELECT id FROM ingest_jobs WHERE cancel_requested=1 AND id IN ({marks})", ids
+        ).fetchall()
+    for r in rows:
+        if r["id"] in _owned:
+            _cancel_events.setdefault(r["id"], threading.Event()).set()
+
+
+def _heartbeat_loop() -> None:
+    interval = max(0.05, INGEST_JOB_LEASE_S / 4)
+    while not _stopping.wait(interval):
+        try:
+            _beat()
+        except Exception as e:
+            print(f"[ingest] heartbeat failed: {e}")
+
+
+# ---------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------
+def _run_job(job_id: str) -> None:
+    if not _claim(job_id):
+        return  # finished, cancelled, or claimed by another worker/process
+    _owned.add(job_id)
+    try:
+        _run_claimed(job_id)
+    finally:
+        _owned.discard(job_id)
+
+
+def _run_claimed(job_id: str) -> None:
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM ingest_jobs WHERE id=?", (job_id,)).fetchone()
+    cancel = _cancel_events.setdefault(job_id, threading.Event())
+    if row["cancel_requested"]:
+        cancel.set()
+    if cancel.is_set():
+        _finish(job_id, "cancelled")
+        return
+
+    t0 = row["started_at"]
+    sources = json.loads(row["sources"])
+    try:
+        stats = run_pipeline(
+            sources,
+            index_name=row["index_name"],
+            on_progress=lambda st: _update(job_id, progress=_progress(st, t0)),
+            should_cancel=lambda: cancel.is_set() or _stopping.is_set(),
+        )
+    except IngestCancelled:
+        if cancel.is_set():
+            _finish(job_id, "cancelled")
+        else:
+            # Shutting down: leave the spool in place so start_workers() can resume it
+            _update(job_id, status="queued", owner=None, heartbeat=None)
+        return
+    except Exception as e:
+        _finish(job_id, "failed", error=f"{type(e).__name__}: {e}")
+        return
+    progress = _progress(stats, t0)
+    progress["stages"] = stats["stages"]
+    _finish(job_id, "done", progress=progress)
+
+
+def _finish(job_id: str, status: str, **fields: Any) -> None:
+    _update(job_id, status=status, finished_at=time.time(), **fields)
+    _cancel_events.pop(job_id, None)
+    shutil.rmtree(os.path.join(INGEST_SPOOL_DIR, job_id), ignore_errors=True)
+
+
+def _submit(job_id: str) -> None:
+    global _executor, _heartbeat
+    with _lock:
+        if _executor is None:
+            _stopping.clear()
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, INGEST_JOB_WORKERS), thread_name_prefix="ingest-job"
+            )
+        if _heartbeat is None or not _heartbeat.is_alive():
+            _heartbeat = threading.Thread(target=_heartbeat_loop, name="ingest-heartbeat", daemon=True)
+            _heartbeat.start()
+        _executor.submit(_run_job, job_id)
+
+
+def create_job(sources: List[Dict[str, Any]], index_name: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+    """Record a queued job for already-spooled `sources` (dicts with `path`) and submit it."""
+    job_id = job_id or new_job_id()
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO ingest_jobs (id, status, index_name, sources, created_at, updated_at)"
+            " VALUES (?, 'queued', ?, ?, ?, ?)",
+            (job_id, index_name, json.dumps(sources), now, now),
+        )
+    _submit(job_id)
+    return get_job(job_id) or {"id": job_id, "status": "queued"}
+
+
+def request_cancel(job_id: str) -> Optional[Dict[str, Any]]:
+    """Flag a job for cancellation; running jobs stop at the next document boundary."""
+    job = get_job(job_id)
+    if job is None or job["status"] in FINAL:
+        return job
+    _update(job_id, cancel_requested=1)
+    _cancel_events.setdefault(job_id, threading.Event()).set()
+    return get_job(job_id)
+
+
+def start_workers() -> int:
+    """
+    Re-queue running jobs whose lease expired (their process died) and submit
+    everything queued. Jobs another live process is running are left alone.
+    Returns how many jobs were submitted.
+    """
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE ingest_jobs SET status='queued', owner=NULL, heartbeat=NULL"
+            " WHERE status='running' AND (heartbeat IS NULL OR heartbeat < ?)",
+            (time.time() - INGEST_JOB_LEASE_S,),
+        )
+        rows = conn.execute(
+            "SELECT id FROM ingest_jobs WHERE status='queued' ORDER BY created_at"
+        ).fetchall()
+    for r in rows:
+        _submit(r["id"])
+    return len(rows)
+
+
+def shutdown_workers() -> None:
+    """Stop accepting work; in-flight jobs are re-queued on the next start_workers()."""
+    global _executor
+    with _lock:
+        ex, _executor = _executor, None
+    _stopping.set()
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,559 @@
+# staged ingest: extract → chunk → embed (bounded batches) → streaming bulk
+# backend/services/ingest_pipeline.py
+"""
+Generator pipeline used by /api/ingest.
+
+Extraction runs in services.extraction's process pool and streams pages, so
+a long PDF starts chunking and embedding while later pages are still parsing,
+and every chunk records the page it came from. Spooled text/CSV is decoded
+and chunked incrementally. RSS is sampled while the pipeline runs and reported
+in stats["memory"]. INGEST_MEMORY_LIMIT_MB is a process-wide guard: /ingest
+requests and job workers run concurrently in one process, so growth is measured
+from the RSS when the oldest ingest still running started, and whichever run
+samples it past the limit aborts with IngestMemoryExceeded.
+
+Re-ingest is incremental (INGEST_INCREMENTAL): chunk ids are numbered per page
+(see chunk_id()), so an edit that changes how many chunks one page produces
+only renumbers that page's chunks. Each chunk carries a content_hash, existing hashes are fetched for INGEST_DEDUP_LOOKAHEAD documents
+per ES request, unchanged chunks are skipped before embedding, changed/new ones
+are upserted (created_at is kept) and chunks a document no longer produces are
+deleted. Counts are reported in stats["dedup"]. Paged documents indexed before
+ids were page-local are re-embedded once on their next ingest; their old
+`<doc_id>::chunk::<i>` ids are deleted as orphans. Page-less text is still one
+stream, so a length-changing edit renumbers every chunk after it.
+
+Every stage pulls from the previous one, so at most a few embedding batches
+(INGEST_EMBED_BATCH x INGEST_EMBED_CONCURRENCY chunks) plus one bulk request
+are held in memory, however large the upload is. Per-stage counters, timings
+and errors are collected in a stats dict that the endpoint returns. Stage
+"seconds" is busy time inside that stage; for "embed" it is summed Vertex call
+time, so with concurrency it can exceed wall time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from collections import deque
+from itertools import groupby
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from elasticsearch import NotFoundError
+from elasticsearch.helpers import scan, streaming_bulk
+
+from services.elastic_client import VECTOR_FIELD, bump_index_generation, get_es
+from services.embedding_store import embed_with_store
+from services.vertex_embeddings import embed_texts
+from services.extraction import Page, iter_pages
+from utils.chunker import iter_chunks
+from utils.memory import peak_rss_mb, rss_mb
+
+INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+EMBED_MODEL = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_BULK_CHUNK = int(os.getenv("INGEST_BULK_CHUNK", "500"))
+INGEST_BULK_MAX_BYTES = int(os.getenv("INGEST_BULK_MAX_BYTES", str(10 * 1024 * 1024)))
+INGEST_INCREMENTAL = os.getenv("INGEST_INCREMENTAL", "1").lower() not in ("0", "false", "no")
+INGEST_DEDUP_LOOKAHEAD = int(os.getenv("INGEST_DEDUP_LOOKAHEAD", "32"))  # documents per hash lookup
+INGEST_MEMORY_LIMIT_MB = float(os.getenv("INGEST_MEMORY_LIMIT_MB", "1024"))  # process RSS growth while ingesting; 0 = off
+
+STAGES = ("extract", "chunk", "embed", "index")
+# Everything a chunk is indexed with except timestamps and the vector
+HASH_FIELDS = ("title", "text", "source", "url", "tags", "team", "doc_type", "page_num")
+MAX_ERROR_SAMPLES = 20
+PROGRESS_INTERVAL_S = 1.0
+MEMORY_SAMPLE_S = 0.2
+
+
+class IngestCancelled(Exception):
+    """Raised inside the pipeline when the caller's should_cancel() returns true."""
+
+
+class IngestMemoryExceeded(RuntimeError):
+    """Raised when process RSS grows past the memory limit while ingests are running."""
+
+
+# Baseline shared by all concurrent runs (see module docstring)
+_mem_lock = threading.Lock()
+_mem_runs = 0
+_mem_base = 0.0
+
+
+def _memory_guard_enter() -> float:
+    global _mem_runs, _mem_base
+    with _mem_lock:
+        if _mem_runs == 0:
+            _mem_base = rss_mb()
+        _mem_runs += 1
+        return _mem_base
+
+
+def _memory_guard_exit() -> None:
+    global _mem_runs
+    with _mem_lock:
+        _mem_runs = max(0, _mem_runs - 1)
+
+
+class _Hooks:
+    """Cancellation check, memory sampling + throttled progress callback, polled from the stages."""
+
+    def __init__(
+        self,
+        stats: Dict[str, Any],
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        memory_limit_mb: float = INGEST_MEMORY_LIMIT_MB,
+    ):
+        self.stats = stats
+        self.on_progress = on_progress
+        self.should_cancel = should_cancel
+        self.memory_limit_mb = memory_limit_mb
+        self._last = 0.0
+        self._last_mem = 0.0
+        self._base = _memory_guard_enter()
+        start = rss_mb()
+        stats["memory"] = {
+            "limit_mb": memory_limit_mb or None,
+            "rss_base_mb": round(self._base, 1),
+            "rss_start_mb": round(start, 1),
+            "rss_max_mb": round(start, 1),
+        }
+
+    def close(self) -> None:
+        _memory_guard_exit()
+
+    def sample_memory(self) -> None:
+        mem = self.stats["memory"]
+        rss = rss_mb()
+        mem["rss_max_mb"] = round(max(mem["rss_max_mb"], rss), 1)
+        growth = rss - self._base
+        if self.memory_limit_mb > 0 and growth > self.memory_limit_mb:
+            raise IngestMemoryExceeded(
+                f"process RSS grew {growth:.0f} MB while ingesting (limit {self.memory_limit_mb:.0f} MB)"
+            )
+
+    def tick(self, force: bool = False) -> None:
+        if self.should_cancel is not None and self.should_cancel():
+            raise IngestCancelled()
+        now = time.monotonic()
+        if force or now - self._last_mem >= MEMORY_SAMPLE_S:
+            self._last_mem = now
+            self.sample_memory()
+        if self.on_progress is not None and (force or now - self._last >= PROGRESS_INTERVAL_S):
+            self._last = now
+            self.on_progress(self.stats)
+
+
+# ---------------------------------------------------------------------
+# Stats
+# ---------------------------------------------------------------------
+def new_stats() -> Dict[str, Any]:
+    return {
+        "stages": {s: {"items": 0, "seconds": 0.0, "errors": 0} for s in STAGES},
+        "dedup": {"unchanged": 0, "changed": 0, "new": 0, "deleted": 0},
+        "errors": [],
+    }
+
+
+def _add_error(stats: Dict[str, Any], stage: str, msg: str, n: int = 1) -> None:
+    stats["stages"][stage]["errors"] += n
+    if len(stats["errors"]) < MAX_ERROR_SAMPLES:
+        stats["errors"].append(f"{stage}: {msg}")
+
+
+def finalize_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Add per-stage items/sec (based on busy time inside that stage)."""
+    for st in stats["stages"].values():
+        secs = st["seconds"]
+        st["seconds"] = round(secs, 3)
+        st["per_sec"] = round(st["items"] / secs, 1) if secs > 0 else None
+    return stats
+
+
+# ---------------------------------------------------------------------
+# Incremental re-ingest
+# ---------------------------------------------------------------------
+_CHUNK_ID = re.compile(r"^(.*?)(?:::p\d+)?::chunk::\d+$")
+
+
+def chunk_id(doc_id: str, page_num: Optional[int], n: int) -> str:
+    """Id of the n-th chunk of a page; page-less sources (text/CSV) number the whole stream."""
+    if page_num is None:
+        return f"{doc_id}::chunk::{n}"
+    return f"{doc_id}::p{page_num}::chunk::{n}"
+
+
+def doc_id_of(chunk_id: str) -> str:
+    """Inverse of chunk_id() for the doc_id part."""
+    m = _CHUNK_ID.match(chunk_id)
+    return m.group(1) if m else chunk_id
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    payload = json.dumps([doc.get(f) for f in HASH_FIELDS], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _Dedup:
+    """Existing {_id: content_hash} per doc_id plus the orphan ids waiting to be deleted."""
+
+    def __init__(self, es: Any, index_name: str, stats: Dict[str, Any]):
+        self.es = es
+        self.index_name = index_name
+        self.stats = stats
+        self.counts = stats["dedup"]
+        self.deletes: Deque[str] = deque()
+        self._known: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def prefetch(self, doc_ids: List[str]) -> None:
+        ids = [d for d in doc_ids if d not in self._known]
+        if not ids:
+            return
+        found: Dict[str, Dict[str, Optional[str]]] = {d: {} for d in ids}
+        try:
+            for hit in scan(
+                self.es,
+                index=self.index_name,
+                query={"query": {"terms": {"doc_id": ids}}, "_source": ["doc_id", "content_hash"]},
+                size=1000,
+            ):
+                src = hit.get("_source") or {}
+                found.setdefault(src.get("doc_id"), {})[hit["_id"]] = src.get("content_hash")
+        except NotFoundError:
+            pass  # index not created yet: everything is new
+        except Exception as e:
+            # Without hashes, upsert everything and delete nothing
+            _add_error(self.stats, "chunk", f"hash lookup failed: {type(e).__name__}: {e}")
+            found = {d: {} for d in ids}
+        self._known.update(found)
+
+    def keep(self, doc: Dict[str, Any]) -> bool:
+        """True when the chunk must be (re-)embedded and written."""
+        old = self._known.get(doc["doc_id"], {}).get(doc["chunk_id"], False)
+        if old == doc["content_hash"]:
+            self.counts["unchanged"] += 1
+            return False
+        self.counts["new" if old is False else "changed"] += 1
+        return True
+
+    def finish(self, doc_id: str, seen: set, complete: bool) -> None:
+        known = self._known.pop(doc_id, {})
+        if complete:
+            # a document that failed mid-extraction keeps its old tail
+            self.deletes.extend(i for i in known if i not in seen)
+
+
+def _lookahead(sources: Iterable[Dict[str, Any]], dedup: _Dedup, size: int) -> Iterator[Dict[str, Any]]:
+    """Prefetch hashes for the next `size` sources (their pages are still lazy)."""
+    buf: List[Dict[str, Any]] = []
+    for src in sources:
+        buf.append(src)
+        if len(buf) >= size:
+            dedup.prefetch([b["doc_id"] for b in buf])
+            yield from buf
+            buf = []
+    if buf:
+        dedup.prefetch([b["doc_id"] for b in buf])
+        yield from buf
+
+
+# ---------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------
+def _pages(src: Dict[str, Any], stats: Dict[str, Any]) -> Iterator[Page]:
+    """Pages of one source; time spent waiting on extraction counts toward "extract"."""
+    st = stats["stages"]["extract"]
+    if src.get("text") is not None:
+        st["items"] += 1
+        yield None, src.pop("text")
+        return
+    pages = iter_pages(src.get("filename") or "", path=src.get("path"), data=src.pop("data", None))
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                page = next(pages, None)
+            except Exception as e:
+                # pages already yielded stay indexed; the rest of the document is skipped
+                _add_error(stats, "extract", f"{src.get('doc_id')}: {type(e).__name__}: {e}")
+                src["failed"] = True
+                return
+            finally:
+                st["seconds"] += time.perf_counter() - t0
+            if page is None:
+                break
+            yield page
+    finally:
+        pages.close()
+    st["items"] += 1
+
+
+def extract(
+    sources: Iterable[Dict[str, Any]],
+    stats: Dict[str, Any],
+    hooks: Optional[_Hooks] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    sources: dicts with doc_id/title/meta and either `text`, `path` (spooled file)
+    or (`filename`, `data` bytes).
+    Yields a copy of the source with a lazy `pages` iterator of (page_num, text);
+    extraction failures are reported in stats, end that document's pages and set
+    `failed` on the copy.
+    """
+    for src in sources:
+        if hooks is not None:
+            hooks.tick()
+        item = dict(src)
+        src.pop("data", None)  # the caller's list should not pin upload bytes
+        item["pages"] = _pages(item, stats)
+        yield item
+
+
+def chunk(
+    sources: Iterable[Dict[str, Any]],
+    stats: Dict[str, Any],
+    dedup: Optional[_Dedup] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one ES document (without vector) per chunk; chunks never span pages.
+    Consecutive pieces with the same page_num (streamed text/CSV) are chunked
+    as one stream. With `dedup`, chunks whose content_hash is already indexed
+    are dropped here, before they cost an embedding.
+    """
+    st = stats["stages"]["chunk"]
+    extract_st = stats["stages"]["extract"]
+    if dedup is not None:
+        sources = _lookahead(sources, dedup, max(1, INGEST_DEDUP_LOOKAHEAD))
+    for src in sources:
+        now = datetime.utcnow().isoformat()
+        meta = src.get("meta") or {}
+        seen: set = set()
+        per_page: Dict[Optional[int], int] = {}
+        for page_num, pieces in groupby(src.pop("pages"), key=lambda p: p[0]):
+            parts = iter_chunks(text or "" for _, text in pieces)
+            while True:
+                e0, t0 = extract_st["seconds"], time.perf_counter()
+                part = next(parts, None)
+                # waiting on extraction inside next() is already counted as "extract"
+                st["seconds"] += time.perf_counter() - t0 - (extract_st["seconds"] - e0)
+                if part is None:
+                    break
+                st["items"] += 1
+                doc = {
+                    "doc_id": src["doc_id"],
+                    "chunk_id": chunk_id(src["doc_id"], page_num, per_page.get(page_num, 0)),
+                    "title": src.get("title") or src["doc_id"],
+                    "text": part,
+                    "source": src.get("source", "upload"),
+                    "url": src.get("url"),
+                    "tags": list(meta.get("tags", [])),
+                    "team": src.get("team") or "public",
+                    "doc_type": src.get("doc_type") or "generic",
+                    "created_at": now,
+                    "updated_at": now,
+                    "page_num": page_num,
+                }
+                doc["content_hash"] = content_hash(doc)
+                per_page[page_num] = per_page.get(page_num, 0) + 1
+                seen.add(doc["chunk_id"])
+                if dedup is None or dedup.keep(doc):
+                    yield doc
+        if dedup is not None:
+            dedup.finish(src["doc_id"], seen, complete=not src.get("failed"))
+
+
+def _batches(docs: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for d in docs:
+        batch.append(d)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def embed(
+    docs: Iterable[Dict[str, Any]],
+    stats: Dict[str, Any],
+    batch_size: int = INGEST_EMBED_BATCH,
+    concurrency: int = INGEST_EMBED_CONCURRENCY,
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Embed chunks in batches with at most `concurrency` Vertex calls in flight.
+    By default texts already in the local embedding store skip Vertex.
+    Output order matches input order; a failed batch is dropped and reported.
+    """
+    st = stats["stages"]["embed"]
+    fn = embed_fn or (lambda texts: embed_with_store(
+        texts,
+        lambda missing: embed_texts(missing, location=LOCATION, model=EMBED_MODEL, use_cache=False),
+        model=EMBED_MODEL,
+    ))
+
+    lock = threading.Lock()
+
+    def _run(batch: List[Dict[str, Any]]) -> List[List[float]]:
+        t0 = time.perf_counter()
+        try:
+            return fn([d["text"] for d in batch])
+        finally:
+            with lock:
+                st["seconds"] += time.perf_counter() - t0
+
+    inflight: Deque[tuple] = deque()
+
+    def _drain_one() -> Iterator[Dict[str, Any]]:
+        batch, fut = inflight.popleft()
+        try:
+            vecs = fut.result()
+        except Exception as e:
+            _add_error(stats, "embed", f"batch of {len(batch)}: {type(e).__name__}: {e}", n=len(batch))
+            return
+        if len(vecs) != len(batch):
+            _add_error(stats, "embed", f"embedding count mismatch: {len(vecs)} vs {len(batch)}", n=len(batch))
+            return
+        for d, vec in zip(batch, vecs):
+            d[VECTOR_FIELD] = vec
+            st["items"] += 1
+            yield d
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="ingest-embed") as pool:
+        for batch in _batches(docs, max(1, batch_size)):
+            fut: Future = pool.submit(_run, batch)
+            inflight.append((batch, fut))
+            if len(inflight) >= max(1, concurrency):
+                yield from _drain_one()
+        while inflight:
+            yield from _drain_one()
+
+
+def upsert_action(index_name: str, d: Dict[str, Any]) -> Dict[str, Any]:
+    """Bulk update+upsert for one chunk: an existing chunk keeps its created_at."""
+    update = {k: v for k, v in d.items() if k != "created_at"}
+    return {"_op_type": "update", "_index": index_name, "_id": d["chunk_id"], "doc": update, "upsert": d}
+
+
+def index(
+    docs: Iterable[Dict[str, Any]],
+    stats: Dict[str, Any],
+    index_name: str = INDEX,
+    es: Optional[Any] = None,
+    chunk_size: int = INGEST_BULK_CHUNK,
+    hooks: Optional[_Hooks] = None,
+    dedup: Optional[_Dedup] = None,
+) -> int:
+    """
+    streaming_bulk into ES (one refresh at the end instead of per batch). Returns docs indexed.
+    With `dedup`, chunks are upserted (keeping created_at) and orphaned chunk ids deleted.
+    """
+    st = stats["stages"]["index"]
+    es = es or get_es()
+    upstream = 0.0  # time spent waiting on earlier stages, excluded from "index" seconds
+
+    def _deletes() -> Iterator[Dict[str, Any]]:
+        while dedup is not None and dedup.deletes:
+            yield {"_op_type": "delete", "_index": index_name, "_id": dedup.deletes.popleft()}
+
+    def _write(d: Dict[str, Any]) -> Dict[str, Any]:
+        if dedup is None:
+            return {"_op_type": "index", "_index": index_name, "_id": d["chunk_id"], "_source": d}
+        return upsert_action(index_name, d)
+
+    def _actions() -> Iterator[Dict[str, Any]]:
+        nonlocal upstream
+        it = iter(docs)
+        while True:
+            t = time.perf_counter()
+            d = next(it, None)
+            upstream += time.perf_counter() - t
+            yield from _deletes()
+            if d is None:
+                return
+            if hooks is not None:
+                hooks.tick()
+            yield _write(d)
+
+    t0 = time.perf_counter()
+    for ok, item in streaming_bulk(
+        es,
+        _actions(),
+        chunk_size=chunk_size,
+        max_chunk_bytes=INGEST_BULK_MAX_BYTES,
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        op, info = next(iter(item.items()))
+        if ok:
+            bump_index_generation()  # visible after the next refresh; keep caches from serving older results
+        if op == "delete":
+            if ok or info.get("status") == 404:
+                stats["dedup"]["deleted"] += 1
+            else:
+                _add_error(stats, "index", f"delete {info.get('_id')}: {info.get('error')}")
+        elif ok:
+            st["items"] += 1
+        else:
+            _add_error(stats, "index", f"{info.get('_id')}: {info.get('error')}")
+    if st["items"] or stats["dedup"]["deleted"]:
+        es.indices.refresh(index=index_name)
+        bump_index_generation()
+    st["seconds"] += max(0.0, time.perf_counter() - t0 - upstream)
+    return st["items"]
+
+
+# ---------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------
+def run_pipeline(
+    sources: Iterable[Dict[str, Any]],
+    index_name: str = INDEX,
+    es: Optional[Any] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    memory_limit_mb: float = INGEST_MEMORY_LIMIT_MB,
+    incremental: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Run extract → chunk → embed → index lazily over `sources` and return stats.
+
+    on_progress(stats) is called at most every PROGRESS_INTERVAL_S; should_cancel()
+    is polled between documents and raises IngestCancelled (chunks already
+    bulk-indexed stay in the index). Process RSS growth above memory_limit_mb
+    (process-wide, see the module docstring) raises IngestMemoryExceeded the same
+    way. incremental=None follows INGEST_INCREMENTAL.
+    """
+    stats = new_stats()
+    hooks = _Hooks(stats, on_progress, should_cancel, memory_limit_mb)
+    try:
+        es = es or get_es()
+        incremental = INGEST_INCREMENTAL if incremental is None else incremental
+        dedup = _Dedup(es, index_name, stats) if incremental else None
+        t0 = time.perf_counter()
+        indexed = index(
+            embed(chunk(extract(sources, stats, hooks), stats, dedup), stats),
+            stats,
+            index_name=index_name,
+            es=es,
+            hooks=hooks,
+            dedup=dedup,
+        )
+        hooks.sample_memory()
+    finally:
+        hooks.close()
+    stats["memory"]["process_peak_rss_mb"] = round(peak_rss_mb(), 1)
+    stats["indexed"] = indexed
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_sec"] = round(indexed / elapsed, 1) if elapsed > 0 else None
+    return finalize_stats(stats)
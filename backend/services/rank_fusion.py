@@ -3,8 +3,9 @@
 from typing import List, Dict, Any
 
 def _key(hit: Dict[str, Any]) -> str:
-    src = hit.get("_source", {})
-    return f"{src.get('doc_id')}::{src.get('page_num')}::{hit.get('_id')}"
+    src = hit.get("_source") or {}
+    # formatted hits (elastic_client._format_hits) carry the ES _id as "id"
+    return f"{src.get('doc_id')}::{src.get('page_num')}::{hit.get('_id') or hit.get('id')}"
 
 def rrf_fuse(knn_hits: List[Dict[str, Any]], bm25_hits: List[Dict[str, Any]], top_k=12, k_const: int = 60) -> List[Dict[str, Any]]:
     """
@@ -0,0 +1,225 @@
+# hybrid retrieval (BM25 + embed → kNN, one _msearch or concurrent), then fusion
+# backend/services/retrieval.py
+"""
+Asyncio retrieval used by /api/chat, /api/eval/precision and /api/eval/label-assist.
+
+Strategies (RETRIEVAL_STRATEGY, overridable per call):
+  - "auto":     "msearch" when the query vector is already known (passed in, as
+                /api/chat does after its answer-cache lookup), else "parallel"
+                (default)
+  - "msearch":  embed, then BM25 + kNN in a single _msearch round trip; BM25
+                waits for the embedding, so it only saves time with a vector
+  - "parallel": BM25 and (embed -> kNN) as concurrent requests, so latency is
+                max(BM25, embed + kNN) instead of the sum of all three
+  - "rrf":      embed, then one search fused by Elasticsearch (rrf retriever),
+                which ships only the top_k; falls back to client-side RRF on
+                clusters/licenses without it (result["fusion"] says which ran)
+Stage failures are captured in result["errors"] rather than raised, so callers
+can degrade to whichever list succeeded.
+
+Two-phase (RETRIEVAL_TWO_PHASE, default on): the candidate searches return only
+_id/_score (_source: false), fusion runs on ids, and one _mget fetches the
+sources of the final top_k. result["payload"] reports response bytes and JSON
+decode time for each phase.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.elastic_client import (
+    get_async_es,
+    async_fetch_sources,
+    async_search_bm25,
+    async_search_knn,
+    async_search_hybrid_msearch,
+    async_search_hybrid_rrf,
+    payload_meter,
+)
+from services.fusion import FUSION_WEIGHTS, fuse
+from services.embedding_batcher import embed_query
+
+INDEX = os.getenv("ELASTIC_INDEX", "searchsphere_docs")
+LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+EMBED_MODEL = os.getenv("VERTEX_EMBED_MODEL", "text-embedding-005")
+RETRIEVAL_STRATEGY = (os.getenv("RETRIEVAL_STRATEGY") or "auto").lower()
+STRATEGIES = ("auto", "msearch", "parallel", "rrf")
+TWO_PHASE = (os.getenv("RETRIEVAL_TWO_PHASE") or "1").lower() not in ("0", "false", "no")
+
+
+def _err(label: str, e: Exception) -> str:
+    return f"{label} failed: {type(e).__name__}: {e}"
+
+
+async def hybrid_retrieve(
+    query: str,
+    *,
+    top_k: int,
+    pool: Optional[int] = None,
+    filters: Optional[Any] = None,
+    query_vector: Optional[List[float]] = None,
+    embed: bool = True,
+    num_candidates: Optional[int] = None,
+    index: Optional[str] = None,
+    es: Optional[Any] = None,
+    strategy: Optional[str] = None,
+    two_phase: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Retrieve BM25 + kNN candidates and fuse them (services.fusion; RRF by default).
+
+    If `query_vector` is given it is used as-is; otherwise the query is embedded
+    when `embed` is true. Returns:
+      {"fused", "bm25", "knn", "bm25_tier", "query_vector", "strategy", "fusion",
+       "errors": {"embed", "bm25", "knn", "fetch"}, "timings_ms": {...},
+       "took": {"bm25", "knn"} (msearch only),
+       "payload": {"two_phase", "candidates": {bytes, decode_ms, responses}, "fetch": {...}}}
+    With two_phase, "bm25"/"knn" hold id-only hits and only "fused" has sources.
+    With server-side fusion ("fusion": "server") "bm25"/"knn" are empty.
+    """
+    es = es or get_async_es()
+    index = index or INDEX
+    pool = pool or max(60, top_k)
+    strategy = (strategy or RETRIEVAL_STRATEGY).lower()
+    if strategy not in STRATEGIES:
+        strategy = "auto"
+    if strategy == "auto":
+        # one round trip only pays off if nothing has to be embedded first;
+        # otherwise BM25 should run while the query is embedding
+        strategy = "msearch" if query_vector is not None or not embed else "parallel"
+    two_phase = TWO_PHASE if two_phase is None else two_phase
+    source = False if two_phase else None
+
+    errors: Dict[str, Optional[str]] = {"embed": None, "bm25": None, "knn": None, "fetch": None}
+    timings: Dict[str, float] = {}
+    took: Dict[str, Optional[int]] = {}
+    qvec: Dict[str, Optional[List[float]]] = {"value": query_vector}
+
+    async def _embed() -> None:
+        if qvec["value"] is not None or not embed:
+            return
+        t0 = time.perf_counter()
+        try:
+            # Coalesced with concurrent requests into one Vertex call (see embedding_batcher)
+            qvec["value"] = await embed_query(query, location=LOCATION, model=EMBED_MODEL)
+        except Exception as e:
+            errors["embed"] = _err("Embedding", e)
+        finally:
+            timings["embed"] = (time.perf_counter() - t0) * 1000.0
+
+    async def _bm25() -> List[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        try:
+            return await async_search_bm25(es, index, query, k=pool, filters=filters, source=source)
+        except Exception as e:
+            errors["bm25"] = _err("BM25", e)
+            return []
+        finally:
+            timings["bm25"] = (time.perf_counter() - t0) * 1000.0
+
+    async def _knn() -> List[Dict[str, Any]]:
+        await _embed()
+        if qvec["value"] is None:
+            errors["knn"] = errors["embed"] or "embedding_unavailable"
+            return []
+
+        t0 = time.perf_counter()
+        try:
+            return await async_search_knn(
+                es, index, qvec["value"], k=pool, filters=filters, num_candidates=num_candidates, source=source
+            )
+        except Exception as e:
+            errors["knn"] = _err("kNN", e)
+            return []
+        finally:
+            timings["knn"] = (time.perf_counter() - t0) * 1000.0
+
+    async def _msearch() -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        await _embed()
+        if qvec["value"] is None:
+            errors["knn"] = errors["embed"] or "embedding_unavailable"
+            return await _bm25(), []
+        t0 = time.perf_counter()
+        try:
+            res = await async_search_hybrid_msearch(
+                es, index, query, qvec["value"], k=pool, filters=filters, num_candidates=num_candidates,
+                source=source,
+            )
+        except Exception as e:
+            # One combined request failed; let the parallel path retry each side separately
+            print(f"[retrieval] msearch failed, falling back to parallel: {type(e).__name__}: {e}")
+            return None
+        finally:
+            timings["msearch"] = (time.perf_counter() - t0) * 1000.0
+        took.update(res["took"])
+        return res["bm25"], res["knn"]
+
+    async def _rrf() -> Optional[Dict[str, Any]]:
+        await _embed()
+        if qvec["value"] is None:
+            return None  # BM25-only via the parallel path
+        t0 = time.perf_counter()
+        try:
+            # server-side hits are only the top_k, so they keep their sources
+            return await async_search_hybrid_rrf(
+                es, index, query, qvec["value"], k=top_k, window=pool, filters=filters,
+                num_candidates=num_candidates, fallback_source=source,
+            )
+        except Exception as e:
+            print(f"[retrieval] rrf search failed, falling back to parallel: {type(e).__name__}: {e}")
+            return None
+        finally:
+            timings["rrf"] = (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    fused: Optional[List[Dict[str, Any]]] = None
+    fusion = "client"
+    with payload_meter() as candidates_payload:
+        combined = None
+        if strategy == "msearch":
+            combined = await _msearch()
+        elif strategy == "rrf":
+            res = await _rrf()
+            if res is not None:
+                took.update(res["took"])
+                combined, fused, fusion = (res["bm25"], res["knn"]), res["fused"], res["fusion"]
+        if combined is None:
+            strategy = "parallel"
+            combined = await asyncio.gather(_bm25(), _knn())
+    bm25_hits, knn_hits = combined
+
+    # Fuse (fallback to BM25 if needed); with two_phase this runs on ids only
+    if fused is None:
+        try:
+            fused = fuse([knn_hits, bm25_hits], top_k=top_k, weights=FUSION_WEIGHTS)
+        except Exception:
+            fused = bm25_hits[:top_k]
+
+    # Phase two: one _mget for the sources of the final top_k
+    with payload_meter() as fetch_payload:
+        if any(not h.get("_source") for h in fused):
+            t1 = time.perf_counter()
+            try:
+                fused = await async_fetch_sources(es, index, fused)
+            except Exception as e:
+                errors["fetch"] = _err("Source fetch", e)
+            finally:
+                timings["fetch"] = (time.perf_counter() - t1) * 1000.0
+    timings["total"] = (time.perf_counter() - t0) * 1000.0
+
+    return {
+        "fused": fused,
+        "bm25": bm25_hits,
+        "knn": knn_hits,
+        "bm25_tier": bm25_hits[0].get("tier") if bm25_hits else None,
+        "query_vector": qvec["value"],
+        "strategy": strategy,
+        "fusion": fusion,
+        "errors": errors,
+        "timings_ms": timings,
+        "took": took,
+        "payload": {"two_phase": two_phase, "candidates": candidates_payload, "fetch": fetch_payload},
+    }
@@ -0,0 +1,113 @@
+# /api/search result cache (LRU + TTL + byte bound, invalidated by index writes)
+# backend/services/search_cache.py
+"""
+Dashboards and the web UI repeat identical /api/search calls; this keeps the
+finished responses.
+
+- key: normalized query (NFC, collapsed whitespace; case kept, since
+  query_string operators are case-sensitive) + mode + filters (lists sorted,
+  empty values dropped) + k + a digest of the query vector + index
+- bounds: SEARCH_CACHE_SIZE entries, SEARCH_CACHE_TTL seconds and
+  SEARCH_CACHE_MAX_MB of serialized (JSON) response bytes; 0 size disables it
+- invalidation: each entry remembers elastic_client.index_generation() from
+  before its search ran; a write through this process (or, within
+  ES_LIVENESS_INTERVAL, one noticed on the index) bumps the generation and
+  older entries are dropped on their next lookup ("stale")
+
+lookup() returns a status for the response's "cache" field:
+"hit" | "miss" | "stale" | "bypass" (cache disabled).
+"""
+
+import hashlib
+import json
+import os
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.elastic_client import index_generation
+from utils.ttl_cache import TTLCache
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))           # entries; 0 disables
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))             # seconds
+SEARCH_CACHE_MAX_MB = float(os.getenv("SEARCH_CACHE_MAX_MB", "64"))        # serialized responses
+
+
+def _json_bytes(value: Any) -> int:
+    return len(json.dumps(value, default=str, separators=(",", ":")).encode("utf-8"))
+
+
+_cache = TTLCache(
+    maxsize=SEARCH_CACHE_SIZE or 1,
+    ttl=SEARCH_CACHE_TTL,
+    name="search_results",
+    max_bytes=int(SEARCH_CACHE_MAX_MB * 1024 * 1024),
+    sizeof=_json_bytes,
+)
+
+
+def normalize_query(query: Optional[str]) -> str:
+    return " ".join(unicodedata.normalize("NFC", query or "").split())
+
+
+def normalize_filters(filters: Any) -> Dict[str, Any]:
+    if filters is None:
+        return {}
+    raw = filters.model_dump() if hasattr(filters, "model_dump") else dict(filters)
+    out: Dict[str, Any] = {}
+    for k, v in raw.items():
+        if v in (None, "", [], {}):
+            continue
+        out[k] = sorted(map(str, v)) if isinstance(v, (list, tuple, set)) else v
+    return out
+
+
+def vector_digest(vector: Optional[List[float]]) -> Optional[str]:
+    if not vector:
+        return None
+    return hashlib.blake2b(array("f", vector).tobytes(), digest_size=12).hexdigest()
+
+
+def cache_key(
+    query: Optional[str],
+    mode: str,
+    filters: Any,
+    k: int,
+    query_vector: Optional[List[float]] = None,
+    index: str = "",
+) -> str:
+    parts = [index, normalize_query(query), (mode or "").lower(), normalize_filters(filters), int(k),
+             vector_digest(query_vector)]
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def lookup(key: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """(status, cached response or None)."""
+    if not SEARCH_CACHE_SIZE:
+        return "bypass", None
+    generation = index_generation()
+    stale = {"value": False}
+
+    def _fresh(entry: Dict[str, Any]) -> bool:
+        stale["value"] = entry["generation"] != generation
+        return not stale["value"]
+
+    entry = _cache.get(key, validate=_fresh)
+    if entry is None:
+        return ("stale" if stale["value"] else "miss"), None
+    return "hit", entry["response"]
+
+
+def store(key: str, response: Dict[str, Any], generation: int) -> None:
+    """Keep `response`; `generation` is index_generation() from before the search ran."""
+    if SEARCH_CACHE_SIZE:
+        _cache.set(key, {"generation": generation, "response": response})
+
+
+def stats() -> Dict[str, Any]:
+    return {**_cache.stats(), "generation": index_generation()}
+
+
+def clear() -> None:
+    _cache.clear()
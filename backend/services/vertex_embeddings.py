@@ -1,21 +1,186 @@
 # text-embedding-005 client
 # backend/services/vertex_embeddings.py
+import asyncio
 import os
-from typing import List
-from google.cloud import aiplatform
-import vertexai
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import List, Optional, Sequence, Tuple
 from vertexai.language_models import TextEmbeddingModel
 
-def _init_vertex(location: str):
-    project = os.getenv("GCP_PROJECT_ID")
-    if not project:
-        raise RuntimeError("GCP_PROJECT_ID not set")
-    aiplatform.init(project=project, location=location)
-    vertexai.init(project=project, location=location)
-
-def embed_texts(texts: List[str], location="us-central1", model="text-embedding-005") -> List[List[float]]:
-    _init_vertex(location)
-    mdl = TextEmbeddingModel.from_pretrained(model)
-    # Vertex returns one embedding per input
-    res = mdl.get_embeddings(texts)
-    return [e.values for e in res]
+from services.vertex_models import get_embedding_model
+from utils.metrics import record_cache
+from utils.ttl_cache import TTLCache
+
+# ---------------------------------------------------------------------
+# Query-embedding cache: in-process LRU/TTL, optional SQLite disk tier
+# ---------------------------------------------------------------------
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))         # 0 disables the cache
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", "3600"))          # seconds
+EMBED_CACHE_DISK_PATH = os.getenv("EMBED_CACHE_DISK_PATH")             # unset = memory only
+EMBED_CACHE_DISK_TTL = float(os.getenv("EMBED_CACHE_DISK_TTL", str(30 * 24 * 3600)))
+# Vertex output_dimensionality (e.g. 256 for a reduced-dims index); 0/unset = model's native size.
+# Ingest, query embedding and the index mapping must agree, so everything reads this one knob.
+EMBED_OUTPUT_DIMS = int(os.getenv("VERTEX_EMBED_DIMS") or 0)
+NATIVE_EMBED_DIMS = 768  # text-embedding-005 without output_dimensionality
+EMBED_DIMS = EMBED_OUTPUT_DIMS or NATIVE_EMBED_DIMS  # dims of stored / indexed vectors
+
+CacheKey = Tuple[str, str, str]
+
+_cache = TTLCache(maxsize=EMBED_CACHE_SIZE or 1, ttl=EMBED_CACHE_TTL, name="embed")
+_disk: Optional[sqlite3.Connection] = None
+_disk_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    # NFC + collapsed whitespace; case is kept since embeddings are case-sensitive
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def _cache_key(model: str, location: str, text: str) -> CacheKey:
+    return (model, location, _normalize(text))
+
+
+def _model_key(model: str, dims: int) -> str:
+    # vectors of different output_dimensionality must not share cache entries
+    return f"{model}@{dims}" if dims else model
+
+
+def _dims(dims: Optional[int]) -> int:
+    return EMBED_OUTPUT_DIMS if dims is None else int(dims)
+
+
+def _disk_conn() -> Optional[sqlite3.Connection]:
+    global _disk
+    if not EMBED_CACHE_DISK_PATH:
+        return None
+    if _disk is None:
+        conn = sqlite3.connect(EMBED_CACHE_DISK_PATH, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT, location TEXT, text TEXT, vec BLOB, created REAL,"
+            " PRIMARY KEY (model, location, text))"
+        )
+        conn.commit()
+        _disk = conn
+    return _disk
+
+
+def _disk_get(key: CacheKey) -> Optional[List[float]]:
+    with _disk_lock:
+        conn = _disk_conn()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT vec, created FROM embeddings WHERE model=? AND location=? AND text=?", key
+        ).fetchone()
+        if row is None:
+            return None
+        if EMBED_CACHE_DISK_TTL > 0 and row[1] + EMBED_CACHE_DISK_TTL < time.time():
+            conn.execute("DELETE FROM embeddings WHERE model=? AND location=? AND text=?", key)
+            conn.commit()
+            record_cache("embed_disk", "eviction")
+            return None
+    return array("f", row[0]).tolist()
+
+
+def _disk_put(items: Sequence[Tuple[CacheKey, List[float]]]) -> None:
+    with _disk_lock:
+        conn = _disk_conn()
+        if conn is None or not items:
+            return
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, location, text, vec, created) VALUES (?, ?, ?, ?, ?)",
+            [(*k, array("f", v).tobytes(), now) for k, v in items],
+        )
+        conn.commit()
+
+
+def _lookup(keys: List[CacheKey]) -> List[Optional[List[float]]]:
+    """Memory first, then disk (promoting disk hits into memory)."""
+    out: List[Optional[List[float]]] = []
+    for key in keys:
+        vec = _cache.get(key)
+        if vec is None and EMBED_CACHE_DISK_PATH:
+            vec = _disk_get(key)
+            record_cache("embed_disk", "hit" if vec is not None else "miss")
+            if vec is not None:
+                _cache.set(key, vec)
+        out.append(vec)
+    return out
+
+
+def _store(keys: List[CacheKey], vecs: List[List[float]]) -> None:
+    for key, vec in zip(keys, vecs):
+        _cache.set(key, vec)
+    _disk_put(list(zip(keys, vecs)))
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+# ---------------------------------------------------------------------
+# Vertex calls
+# ---------------------------------------------------------------------
+def _load_model(location: str, model: str) -> TextEmbeddingModel:
+    # Memoised per (project, location, model); only the first call pays for init/from_pretrained
+    return get_embedding_model(model, location)
+
+def _plan(texts: List[str], location: str, model: str, use_cache: bool):
+    """Return (results_with_holes, keys, unique_missing_texts) for a batch."""
+    if not use_cache or EMBED_CACHE_SIZE <= 0:
+        return [None] * len(texts), None, list(texts)
+    keys = [_cache_key(model, location, t) for t in texts]
+    found = _lookup(keys)
+    missing: List[str] = []
+    seen = set()
+    for t, k, v in zip(texts, keys, found):
+        if v is None and k not in seen:
+            seen.add(k)
+            missing.append(t)
+    return found, keys, missing
+
+def _merge(found, keys, missing: List[str], fresh: List[List[float]], location: str, model: str) -> List[List[float]]:
+    if keys is None:
+        return fresh
+    new_keys = [_cache_key(model, location, t) for t in missing]
+    _store(new_keys, fresh)
+    by_key = dict(zip(new_keys, fresh))
+    return [v if v is not None else by_key[k] for k, v in zip(keys, found)]
+
+def _embed_kwargs(dims: int) -> dict:
+    return {"output_dimensionality": dims} if dims else {}
+
+def embed_texts(texts: List[str], location="us-central1", model="text-embedding-005", use_cache: bool = True,
+                dims: Optional[int] = None) -> List[List[float]]:
+    """
+    Embed texts; cached ones skip Vertex entirely (use_cache=False for bulk ingest).
+    dims sets output_dimensionality (default VERTEX_EMBED_DIMS; 0 = native size).
+    """
+    dims = _dims(dims)
+    found, keys, missing = _plan(texts, location, _model_key(model, dims), use_cache)
+    fresh: List[List[float]] = []
+    if missing:
+        mdl = _load_model(location, model)
+        # Vertex returns one embedding per input
+        fresh = [e.values for e in mdl.get_embeddings(missing, **_embed_kwargs(dims))]
+    return _merge(found, keys, missing, fresh, location, _model_key(model, dims))
+
+async def embed_texts_async(texts: List[str], location="us-central1", model="text-embedding-005", use_cache: bool = True,
+                            dims: Optional[int] = None) -> List[List[float]]:
+    """Non-blocking embed_texts(): SDK setup runs in a thread, the predict call is awaited."""
+    dims = _dims(dims)
+    found, keys, missing = _plan(texts, location, _model_key(model, dims), use_cache)
+    fresh: List[List[float]] = []
+    if missing:
+        mdl = await asyncio.to_thread(_load_model, location, model)
+        fresh = [e.values for e in await mdl.get_embeddings_async(missing, **_embed_kwargs(dims))]
+    return _merge(found, keys, missing, fresh, location, _model_key(model, dims))
@@ -0,0 +1,89 @@
+# process-wide Vertex AI init + model handle registry
+# backend/services/vertex_models.py
+"""
+Vertex AI setup that runs once per process instead of once per request.
+
+- vertexai.init() runs once per (project, location); it is only called
+  again when a different pair is requested
+- TextEmbeddingModel / GenerativeModel handles are memoised per
+  (project, location, model_id) and built lazily under a lock
+- reset() drops everything (tests, credential rotation)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import vertexai
+from vertexai.generative_models import GenerativeModel
+from vertexai.language_models import TextEmbeddingModel
+
+DEFAULT_LOCATION = "us-central1"
+
+ModelKey = Tuple[str, str, str]
+
+_lock = threading.RLock()
+_active: Optional[Tuple[str, str]] = None
+_embedding_models: Dict[ModelKey, TextEmbeddingModel] = {}
+_generative_models: Dict[ModelKey, GenerativeModel] = {}
+
+
+def resolve_project() -> Optional[str]:
+    return (
+        os.getenv("GCP_PROJECT_ID")
+        or os.getenv("VERTEX_PROJECT")
+        or os.getenv("GOOGLE_CLOUD_PROJECT")
+    )
+
+
+def init_vertex(location: Optional[str] = None, project: Optional[str] = None) -> Tuple[str, str]:
+    """Make (project, location) the active Vertex config; no-op when it already is."""
+    global _active
+    project = project or resolve_project()
+    location = location or os.getenv("VERTEX_LOCATION") or DEFAULT_LOCATION
+    if not project:
+        raise RuntimeError("GCP_PROJECT_ID not set")
+
+    pair = (project, location)
+    if _active == pair:
+        return pair
+    with _lock:
+        if _active != pair:
+            vertexai.init(project=project, location=location)
+            _active = pair
+    return pair
+
+
+def _get(cache: Dict[ModelKey, Any], factory, model_id: str, location: Optional[str]) -> Any:
+    project, loc = init_vertex(location)
+    key = (project, loc, model_id)
+    handle = cache.get(key)
+    if handle is not None:
+        return handle
+    with _lock:
+        handle = cache.get(key)
+        if handle is None:
+            # Handles capture project/location at construction, so build under the active pair
+            init_vertex(loc, project)
+            handle = factory(model_id)
+            cache[key] = handle
+    return handle
+
+
+def get_embedding_model(model_id: str, location: Optional[str] = None) -> TextEmbeddingModel:
+    return _get(_embedding_models, TextEmbeddingModel.from_pretrained, model_id, location)
+
+
+def get_generative_model(model_id: str, location: Optional[str] = None) -> GenerativeModel:
+    return _get(_generative_models, GenerativeModel, model_id, location)
+
+
+def reset() -> None:
+    """Forget init state and cached handles (for tests)."""
+    global _active
+    with _lock:
+        _active = None
+        _embedding_models.clear()
+        _generative_models.clear()
@@ -0,0 +1,63 @@
+# backend/tests/test_answer_cache.py
+from fastapi.testclient import TestClient
+
+import routers.chat as chat_router
+import services.answer_cache as answer_cache
+import services.elastic_client as ec
+from app import app
+from services.answer_cache import SemanticCache, scope_key
+
+
+def test_semantic_cache_threshold_scope_generation_and_capacity():
+    c = SemanticCache(capacity=2, threshold=0.95, ttl=60)
+    team_a = scope_key({"team": ["a"]}, 8)
+    c.put([1.0, 0.0, 0.0], team_a, 1, "finops")
+
+    assert c.get([0.99, 0.05, 0.0], team_a, 1)[0] == "finops"       # cosine ~0.999
+    assert c.get([0.7, 0.7, 0.0], team_a, 1) is None                  # cosine ~0.71
+    assert c.get([1.0, 0.0, 0.0], scope_key(None, 8), 1) is None      # other filters
+    assert scope_key({"team": ["a"], "since": None}, 8) == team_a
+
+    c.put([0.0, 1.0, 0.0], team_a, 1, "b")
+    c.get([1.0, 0.0, 0.0], team_a, 1)                                 # "finops" most recent
+    c.put([0.0, 0.0, 1.0], team_a, 1, "c")                            # full -> evicts "b"
+    assert c.get([0.0, 1.0, 0.0], team_a, 1) is None and len(c) == 2
+
+    assert c.get([1.0, 0.0, 0.0], team_a, 2) is None                  # index changed
+    assert len(c) == 0
+
+
+def test_chat_reuses_answer_for_near_identical_question(monkeypatch):
+    vectors = {"what is finops": [1.0, 0.0], "what's FinOps?": [0.98, 0.1], "who owns billing": [0.0, 1.0]}
+    llm_calls = []
+
+    async def fake_embed(text, location=None, model=None):
+        return vectors[text]
+
+    async def fake_retrieve(query, top_k, pool, filters=None, es=None, query_vector=None):
+        assert query_vector == vectors[query]  # embedded once, reused for kNN
+        hit = {"id": "1", "_source": {"title": "FinOps", "text": "FinOps is cloud cost management."}}
+        return {"fused": [hit], "errors": {"embed": None, "bm25": None, "knn": None, "fetch": None},
+                "payload": {}, "timings_ms": {}}
+
+    def fake_answer(query, contexts, model=None):
+        llm_calls.append(query)
+        return f"answer to {query}", []
+
+    monkeypatch.setattr(chat_router, "embed_query", fake_embed)
+    monkeypatch.setattr(chat_router, "hybrid_retrieve", fake_retrieve)
+    monkeypatch.setattr(chat_router, "get_async_es", lambda: object())
+    monkeypatch.setattr(chat_router.gemini_rag, "answer_with_citations", fake_answer)
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SIZE", 8)
+    answer_cache.clear()
+    client = TestClient(app)
+
+    first = client.post("/api/chat", json={"query": "what is finops"}).json()
+    second = client.post("/api/chat", json={"query": "what's FinOps?"}).json()
+    other = client.post("/api/chat", json={"query": "who owns billing"}).json()
+    ec.bump_index_generation()
+    after_ingest = client.post("/api/chat", json={"query": "what's FinOps?"}).json()
+
+    assert (first["cache"], second["cache"], other["cache"], after_ingest["cache"]) == ("miss", "hit", "miss", "miss")
+    assert second["answer"] == "answer to what is finops" and second["cache_similarity"] >= 0.95
+    assert llm_calls == ["what is finops", "who owns billing", "what's FinOps?"]
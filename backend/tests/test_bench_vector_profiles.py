@@ -0,0 +1,33 @@
+# backend/tests/test_bench_vector_profiles.py
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import bench_vector_profiles as bench  # noqa: E402
+from services.index_schema import index_body  # noqa: E402
+
+
+def test_exact_topk_recall_and_truncate():
+    docs = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+    queries = np.array([[1.0, 0.1, 0.0], [0.1, 0.0, 1.0]], dtype=np.float32)
+    assert bench.exact_topk(docs, queries, 2).tolist() == [[0, 2], [3, 0]]
+
+    assert bench.recall_at_k([["a", "b"], ["c", "x"]], [["b", "a"], ["c", "d"]], 2) == 0.75
+
+    cut = bench.truncate(np.array([[3.0, 4.0, 12.0]]), 2)
+    assert np.allclose(cut, [[0.6, 0.8]])
+    assert bench.parse_profile("256:int8_hnsw") == (256, "int8_hnsw")
+
+
+def test_index_body_profiles():
+    vec = index_body(dims=256, index_type="int8_hnsw")["mappings"]["properties"]["vector"]
+    assert vec["dims"] == 256 and vec["index_options"]["type"] == "int8_hnsw"
+    assert "index_options" not in index_body(index_type="")["mappings"]["properties"]["vector"]
+    try:
+        index_body(index_type="int3_hnsw")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
@@ -0,0 +1,111 @@
+# backend/tests/test_chat_stream.py
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import routers.chat as chat_router
+import services.answer_cache as answer_cache
+import services.gemini_rag as gemini_rag
+from app import app
+
+
+def _events(body: str):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def _patch_retrieval(monkeypatch):
+    async def fake_embed(text, location=None, model=None):
+        return [1.0, 0.0]
+
+    async def fake_retrieve(query, top_k, pool, filters=None, es=None, query_vector=None):
+        hit = {"id": "1", "_source": {"title": "FinOps", "url": "https://x/finops", "text": "FinOps is cost management."}}
+        return {"fused": [hit], "errors": {"embed": None, "bm25": None, "knn": None, "fetch": None},
+                "payload": {}, "timings_ms": {"bm25": 1.0}}
+
+    monkeypatch.setattr(chat_router, "embed_query", fake_embed)
+    monkeypatch.setattr(chat_router, "hybrid_retrieve", fake_retrieve)
+    monkeypatch.setattr(chat_router, "get_async_es", lambda: object())
+    monkeypatch.setattr(gemini_rag, "_ensure_vertex", lambda: ("p", "us-central1"))
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SIZE", 8)
+    answer_cache.clear()
+
+
+class _FakeModel:
+    def __init__(self, chunks, fail=False):
+        self.chunks = chunks
+        self.fail = fail
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        assert stream
+        self.calls += 1
+        for c in self.chunks:
+            yield SimpleNamespace(text=c)
+        if self.fail:
+            raise RuntimeError("quota")
+
+
+def test_chat_stream_sends_citations_then_tokens_then_metrics(monkeypatch):
+    _patch_retrieval(monkeypatch)
+    model = _FakeModel(["FinOps is ", "cost management [1]."])
+    monkeypatch.setattr(gemini_rag, "get_generative_model", lambda model_id, location: model)
+    client = TestClient(app)
+
+    r = client.post("/api/chat/stream", json={"query": "what is finops"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert [e for e, _ in events] == ["citations", "token", "token", "metrics"]
+    assert events[0][1]["citations"][0]["url"] == "https://x/finops" and events[0][1]["cache"] == "miss"
+    assert "".join(d["text"] for e, d in events if e == "token") == "FinOps is cost management [1]."
+    metrics = events[-1][1]
+    assert metrics["chunks"] == 2 and metrics["first_token_ms"] <= metrics["latency_ms"]
+
+    # the streamed answer is cached: a repeat replays it without calling the model
+    again = _events(client.post("/api/chat/stream", json={"query": "what is finops"}).text)
+    assert [e for e, _ in again] == ["citations", "token", "metrics"] and again[-1][1]["cache"] == "hit"
+    assert again[1][1]["text"] == "FinOps is cost management [1]." and model.calls == 1
+
+
+def test_chat_stream_falls_back_to_snippets_when_the_model_fails(monkeypatch):
+    _patch_retrieval(monkeypatch)
+    monkeypatch.setattr(gemini_rag, "get_generative_model", lambda model_id, location: _FakeModel([], fail=True))
+    client = TestClient(app)
+
+    events = _events(client.post("/api/chat/stream", json={"query": "what is finops"}).text)
+    assert [e for e, _ in events] == ["citations", "warning", "token", "metrics"]
+    assert "quota" in events[1][1]["warning"] and "FinOps" in events[2][1]["text"]
+    assert answer_cache.stats()["size"] == 0
+
+
+def test_stream_pump_closes_generator_in_its_thread_after_disconnect():
+    import asyncio
+    import threading
+
+    release, closed = threading.Event(), threading.Event()
+    pulled = []
+
+    def slow_chunks():
+        try:
+            for i in range(100):
+                if i == 1:
+                    release.wait(5)  # still inside next() when the client goes away
+                pulled.append(i)
+                yield f"chunk {i}"
+        finally:
+            closed.set()
+
+    async def consume_one_then_disconnect():
+        stream = chat_router._iterate_in_thread(slow_chunks())
+        first = await stream.__anext__()
+        await stream.aclose()  # must not raise "generator already executing"
+        return first
+
+    assert asyncio.run(consume_one_then_disconnect()) == "chunk 0"
+    release.set()
+    assert closed.wait(5)
+    assert pulled == [0, 1]
@@ -0,0 +1,22 @@
+# backend/tests/test_chunker.py
+import random
+
+from utils.chunker import chunk_text, iter_chunks
+
+
+def _split(text, rng):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 6))))
+    return [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+
+
+def test_iter_chunks_matches_chunk_text_exactly():
+    rng = random.Random(7)
+    cases = ["", "   ", "abc", " x " * 5, "a" * 100 + " " * 10, "a" * 95 + " " * 30 + "b" * 3]
+    for _ in range(300):
+        words = [rng.choice(["word", "x", " ", "\n\n", "  \t", "longer-token"]) for _ in range(rng.randint(0, 120))]
+        cases.append("".join(words))
+    for text in cases:
+        for size, overlap in ((100, 15), (40, 0), (25, 24)):
+            expected = chunk_text(text, size, overlap)
+            assert list(iter_chunks([text], size, overlap)) == expected
+            assert list(iter_chunks(_split(text, rng), size, overlap)) == expected, (text, size, overlap)
@@ -0,0 +1,25 @@
+# backend/tests/test_compare_fusion.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import compare_fusion  # noqa: E402
+
+
+def test_compare_reports_overlap_and_latency_per_side():
+    calls = []
+
+    def side(name, ids):
+        def run(query, vec):
+            calls.append(name)
+            return [{"id": i} for i in ids[query]]
+        return run
+
+    sides = {"server": side("server", {"a": ["1", "2", "3"], "b": ["4", "5", "6"]}),
+             "client": side("client", {"a": ["1", "3", "9"], "b": ["4", "5", "6"]})}
+    rep = compare_fusion.compare(sides, ["a", "b"], [[0.1], [0.2]], k=3, repeat=2)
+
+    assert calls[:6] == ["server", "client", "client", "server", "server", "client"]  # warm-up + alternating
+    assert rep["overlap_at_k"] == {"mean": round((2 / 3 + 1.0) / 2, 3), "min": 0.667}
+    assert rep["top1_agreement"] == 1.0
+    assert set(rep["latency_ms"]) == {"server", "client"} and rep["queries"] == 2
@@ -0,0 +1,260 @@
+# backend/tests/test_elastic_client.py
+import time
+
+import services.elastic_client as ec
+
+
+def test_get_es_is_pooled(monkeypatch):
+    monkeypatch.setenv("ELASTIC_ENDPOINT", "http://localhost:9200")
+    monkeypatch.setenv("ELASTIC_API_KEY", "test-key")
+    monkeypatch.setattr(ec, "ES_LIVENESS_INTERVAL", 0)
+    ec.close_es()
+    try:
+        a = ec.get_es()
+        b = ec.get_es()
+        assert a is b
+    finally:
+        ec.close_es()
+    assert ec.es_liveness()["ok"] is None
+
+
+def test_index_watch_bumps_generation_on_outside_writes(monkeypatch):
+    state = {"indices": {"docs-v1": {}}, "count": 10, "index_total": 10}
+
+    class _WatchES:
+        class indices:
+            @staticmethod
+            def stats(index, metric):
+                return {"indices": state["indices"], "_all": {"primaries": {
+                    "docs": {"count": state["count"], "deleted": 0},
+                    "indexing": {"index_total": state["index_total"], "delete_total": 0}}}}
+
+    monkeypatch.setitem(ec._index_watch, "signature", None)
+    es = _WatchES()
+    gen = ec.index_generation()
+    ec._watch_index_writes(es)      # baseline
+    ec._watch_index_writes(es)      # unchanged
+    assert ec.index_generation() == gen
+    state["index_total"] = 12       # another process wrote
+    ec._watch_index_writes(es)
+    assert ec.index_generation() == gen + 1
+    state["indices"] = {"docs-v2": {}}  # migrate_index swapped the alias
+    ec._watch_index_writes(es)
+    assert ec.index_generation() == gen + 2
+
+
+class _FakeES:
+    """Answers each msearch sub-query / search from a list of hit counts."""
+
+    def __init__(self, hit_counts):
+        self.hit_counts = list(hit_counts)
+        self.calls = []
+
+    def _resp(self, n):
+        return {"took": 1, "hits": {"hits": [{"_id": str(i), "_source": {}} for i in range(n)]}}
+
+    def msearch(self, searches):
+        self.calls.append("msearch")
+        bodies = searches[1::2]
+        return {"responses": [self._resp(self.hit_counts[i]) for i in range(len(bodies))]}
+
+    def search(self, index, body):
+        self.calls.append("search")
+        return self._resp(self.hit_counts.pop(0))
+
+
+def test_search_bm25_one_shot_single_round_trip():
+    es = _FakeES([0, 0, 2, 5])
+    hits = ec.search_bm25(es, "idx", "rare words", k=5, one_shot=True)
+    assert es.calls == ["msearch"]
+    assert len(hits) == 2
+    assert hits[0]["tier"] == "query_string"
+
+
+def test_search_bm25_ladder_reports_tier():
+    es = _FakeES([0, 3])
+    hits = ec.search_bm25(es, "idx", "words", k=5, one_shot=False)
+    assert es.calls == ["search", "search"]
+    assert hits[0]["tier"] == "multi_match"
+
+
+def test_bm25_tiers_per_index(monkeypatch):
+    monkeypatch.setattr(ec, "BM25_TIERS_BY_INDEX", {"small": ["match", "bogus", "match_all"]})
+    assert ec.bm25_tiers("small") == ["match", "match_all"]
+    assert ec.bm25_tiers("other") == list(ec.BM25_TIER_NAMES)
+
+
+class _FakeIndices:
+    def __init__(self, settings, meta=None):
+        self.settings = dict(settings)
+        self.meta = dict(meta or {})
+        self.calls = []
+
+    def get_settings(self, index, name):
+        return {"idx-v1": {"settings": {"index": dict(self.settings)}}}
+
+    def put_settings(self, index, settings):
+        self.calls.append(("put_settings", settings["index"]))
+        for k, v in settings["index"].items():
+            if v is None:
+                self.settings.pop(k, None)
+            else:
+                self.settings[k] = v
+
+    def get_mapping(self, index):
+        return {"idx-v1": {"mappings": {"_meta": dict(self.meta)}}}
+
+    def put_mapping(self, index, meta):
+        self.meta = dict(meta)
+
+    def refresh(self, index):
+        self.calls.append(("refresh",))
+
+    def forcemerge(self, index, max_num_segments):
+        self.calls.append(("forcemerge", max_num_segments))
+
+
+class _BulkES:
+    def __init__(self, indices):
+        self.indices = indices
+
+
+def test_bulk_load_session_restores_settings_even_on_failure(monkeypatch):
+    indices = _FakeIndices({"number_of_replicas": "1"}, meta={"owner": "search"})
+    es = _BulkES(indices)
+    seen = []
+
+    def fake_parallel_bulk(client, actions, **kw):
+        for a in actions:
+            seen.append(dict(indices.settings))
+            yield True, {"index": {"_id": a["_id"]}}
+
+    monkeypatch.setattr(ec, "parallel_bulk", fake_parallel_bulk)
+    try:
+        with ec.bulk_load_session("idx", es=es, forcemerge=True) as session:
+            assert session.index_docs([{"_id": "a", "text": "x"}, {"_id": "b", "text": "y"}]) == (2, [])
+            raise RuntimeError("embedding quota")
+    except RuntimeError:
+        pass
+
+    assert seen[0] == {"number_of_replicas": 0, "refresh_interval": "-1"}
+    assert indices.settings == {"number_of_replicas": "1"}  # refresh_interval back to its default
+    assert indices.meta == {"owner": "search"}
+    assert indices.calls[-1] == ("refresh",)  # no force-merge after a failed load
+
+
+def test_bulk_load_session_forcemerges_and_recovers_after_crash():
+    # a previous session died after tuning the index
+    indices = _FakeIndices(
+        {"number_of_replicas": 0, "refresh_interval": "-1"},
+        meta={ec._BULK_META_KEY: {"refresh_interval": "30s", "number_of_replicas": "2"}},
+    )
+    with ec.bulk_load_session("idx", es=_BulkES(indices), forcemerge=True):
+        assert indices.settings == {"number_of_replicas": 0, "refresh_interval": "-1"}
+        assert indices.meta[ec._BULK_META_KEY] == {"refresh_interval": "30s", "number_of_replicas": "2"}
+
+    assert indices.settings == {"number_of_replicas": "2", "refresh_interval": "30s"}
+    assert indices.meta == {}
+    assert indices.calls[-2:] == [("refresh",), ("forcemerge", 1)]
+
+
+class _RRFError(Exception):
+    def __init__(self, status_code, error_type, reason):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.body = {"error": {"root_cause": [{"type": error_type, "reason": reason}], "type": error_type}}
+
+
+class _RRFES(_FakeES):
+    """search() fails for the listed RRF forms; msearch answers BM25 + kNN."""
+
+    def __init__(self, errors):
+        super().__init__([3, 3])
+        self.errors = dict(errors)
+        self.bodies = []
+
+    def search(self, index, body):
+        form = "retriever" if "retriever" in body else "rank"
+        self.bodies.append(body)
+        self.calls.append(form)
+        if form in self.errors:
+            raise self.errors[form]
+        return {"took": 2, "hits": {"hits": [{"_id": "7", "_score": 0.03, "_source": {"title": "t"}}]}}
+
+
+def test_search_hybrid_rrf_fuses_server_side(monkeypatch):
+    monkeypatch.setattr(ec, "_rrf_state", {})
+    es = _RRFES({})
+    res = ec.search_hybrid_rrf(es, "idx", "words", [0.1, 0.2], k=5, window=60, filters={"team": ["a"]})
+
+    assert es.calls == ["retriever"] and res["fusion"] == "server"
+    assert [h["id"] for h in res["fused"]] == ["7"]
+    rrf = es.bodies[0]["retriever"]["rrf"]
+    assert (rrf["rank_constant"], rrf["rank_window_size"], es.bodies[0]["size"]) == (60, 60, 5)
+    standard, knn = rrf["retrievers"][0]["standard"], rrf["retrievers"][1]["knn"]
+    assert standard["query"]["bool"]["filter"] == knn["filter"] == [{"terms": {"team": ["a"]}}]
+    assert knn["k"] == 60 and knn["num_candidates"] >= 60
+
+
+def test_search_hybrid_rrf_falls_back_to_client_fusion_once(monkeypatch):
+    monkeypatch.setattr(ec, "_rrf_state", {})
+    monkeypatch.setattr(ec, "_rrf_failed_at", {})
+    es = _RRFES({"retriever": _RRFError(400, "parsing_exception", "Unknown key for a START_OBJECT in [retriever]."),
+                 "rank": _RRFError(403, "security_exception",
+                                   "current license is non-compliant for [Reciprocal Rank Fusion (RRF)]")})
+    res = ec.search_hybrid_rrf(es, "idx", "words", [0.1, 0.2], k=2, window=3)
+    assert es.calls == ["retriever", "rank", "msearch"]
+    assert res["fusion"] == "client" and len(res["fused"]) == 2 and len(res["bm25"]) == 3
+    assert ec.rrf_support() == {"retriever": False, "rank": False}
+
+    es.calls.clear()
+    ec.search_hybrid_rrf(es, "idx", "words", [0.1, 0.2], k=2, window=3)
+    assert es.calls == ["msearch"]  # unsupported forms are not retried within ES_RRF_RETRY_S
+
+    es.calls.clear()
+    es.errors.pop("retriever")  # e.g. the cluster was upgraded
+    monkeypatch.setattr(ec, "RRF_RETRY_S", 0.001)
+    time.sleep(0.01)
+    assert ec.search_hybrid_rrf(es, "idx", "words", [0.1, 0.2], k=2)["fusion"] == "server"
+    assert es.calls == ["retriever"] and ec.rrf_support()["retriever"] is True
+
+    # malformed queries / bad filters mention rank or retriever too, but must surface
+    for err in (_RRFError(400, "search_phase_execution_exception", "failed to create query: dims mismatch"),
+                _RRFError(400, "parsing_exception", "[terms] query does not support [rank]"),
+                _RRFError(403, "security_exception", "action [indices:data/read/search] is unauthorized")):
+        es = _RRFES({"retriever": err})
+        monkeypatch.setattr(ec, "_rrf_state", {})
+        try:
+            ec.search_hybrid_rrf(es, "idx", "words", [0.1], k=2)
+        except _RRFError:
+            pass
+        else:
+            raise AssertionError(f"unrelated error should surface: {err}")
+        assert ec.rrf_support()["retriever"] is None
+
+
+def test_healthz_pings_inline_until_background_check_ran(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import routers.health_routes as health
+    from app import app
+
+    calls = []
+
+    class _ES:
+        def info(self):
+            calls.append("info")
+            return {}
+
+        class indices:
+            exists = staticmethod(lambda index: True)
+
+    monkeypatch.setattr(health, "get_es", lambda: _ES())
+    monkeypatch.setattr(health, "PROJECT", None)
+    monkeypatch.setattr(ec, "_liveness", {"ok": None, "checked_at": None, "reason": None})
+    client = TestClient(app)
+
+    first = client.get("/healthz").json()["elastic"]
+    assert first["ok"] is True and first["index_ok"] is True and calls == ["info"]
+    client.get("/healthz")
+    assert calls == ["info"]  # later probes read the stored result
@@ -0,0 +1,69 @@
+# backend/tests/test_embed_cache.py
+import services.vertex_embeddings as ve
+from utils.ttl_cache import TTLCache
+
+
+class _Emb:
+    def __init__(self, values):
+        self.values = values
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+        self.kwargs = []
+
+    def get_embeddings(self, texts, **kw):
+        self.calls.append(list(texts))
+        self.kwargs.append(kw)
+        return [_Emb([float(len(t)), 1.0][:kw.get("output_dimensionality", 2)]) for t in texts]
+
+
+def _setup(monkeypatch, disk_path=None):
+    model = _FakeModel()
+    monkeypatch.setattr(ve, "_load_model", lambda location, model_id: model)
+    monkeypatch.setattr(ve, "_cache", TTLCache(maxsize=8, ttl=60, name="embed"))
+    monkeypatch.setattr(ve, "EMBED_CACHE_DISK_PATH", disk_path)
+    monkeypatch.setattr(ve, "_disk", None)
+    return model
+
+
+def test_repeat_queries_skip_vertex(monkeypatch):
+    model = _setup(monkeypatch)
+    a = ve.embed_texts(["what is finops", "hello"])
+    b = ve.embed_texts(["what  is finops ", "new one"])
+    assert model.calls == [["what is finops", "hello"], ["new one"]]
+    assert b[0] == a[0]
+    assert ve.cache_stats()["hits"] == 1
+
+
+def test_lru_eviction_and_bypass(monkeypatch):
+    model = _setup(monkeypatch)
+    ve._cache.maxsize = 2
+    ve.embed_texts(["a", "b", "c"])
+    assert ve.cache_stats()["evictions"] == 1
+    ve.embed_texts(["a"])
+    ve.embed_texts(["c"], use_cache=False)
+    assert model.calls[-2:] == [["a"], ["c"]]
+
+
+def test_disk_tier_survives_memory_clear(monkeypatch, tmp_path):
+    model = _setup(monkeypatch, str(tmp_path / "embed.sqlite"))
+    first = ve.embed_texts(["persist me"])
+    ve.clear_cache()
+    again = ve.embed_texts(["persist me"])
+    assert len(model.calls) == 1
+    assert again == first
+
+
+def test_output_dims_are_forwarded_and_cached_apart(monkeypatch):
+    model = _setup(monkeypatch)
+    native = ve.embed_texts(["q"])
+    reduced = ve.embed_texts(["q"], dims=1)
+    assert ve.embed_texts(["q"], dims=1) == reduced
+    assert model.kwargs == [{}, {"output_dimensionality": 1}]
+    assert len(native[0]) == 2 and len(reduced[0]) == 1
+
+    monkeypatch.setattr(ve, "EMBED_OUTPUT_DIMS", 1)
+    assert ve.embed_texts(["q"]) == reduced  # VERTEX_EMBED_DIMS default, served from cache
+    assert len(model.calls) == 2
@@ -0,0 +1,47 @@
+# backend/tests/test_embedding_batcher.py
+import asyncio
+
+from services.embedding_batcher import EmbeddingBatcher
+
+
+def _fake_embed(calls):
+    async def embed(texts, location=None, model=None):
+        calls.append(list(texts))
+        await asyncio.sleep(0)
+        return [[float(len(t))] for t in texts]
+    return embed
+
+
+def test_concurrent_queries_share_one_call():
+    calls = []
+
+    async def run():
+        b = EmbeddingBatcher(_fake_embed(calls), window_ms=5, max_batch=32)
+        return await asyncio.gather(*[b.embed(q) for q in ["a", "bb", "ccc"]])
+
+    vecs = asyncio.run(run())
+    assert calls == [["a", "bb", "ccc"]]
+    assert vecs == [[1.0], [2.0], [3.0]]
+
+
+def test_max_batch_flushes_early():
+    calls = []
+
+    async def run():
+        b = EmbeddingBatcher(_fake_embed(calls), window_ms=10_000, max_batch=2)
+        return await asyncio.gather(*[b.embed(q) for q in ["a", "b", "c", "d"]])
+
+    asyncio.run(run())
+    assert calls == [["a", "b"], ["c", "d"]]
+
+
+def test_errors_reach_every_waiter():
+    async def boom(texts, location=None, model=None):
+        raise RuntimeError("quota")
+
+    async def run():
+        b = EmbeddingBatcher(boom, window_ms=1)
+        return await asyncio.gather(b.embed("a"), b.embed("b"), return_exceptions=True)
+
+    res = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in res)
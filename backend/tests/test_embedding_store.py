@@ -0,0 +1,72 @@
+# backend/tests/test_embedding_store.py
+import os
+
+import numpy as np
+
+import services.embedding_store as es_mod
+
+
+def test_read_through_only_embeds_unseen_texts(tmp_path):
+    store = es_mod.EmbeddingStore(str(tmp_path))
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0, 2.0] for t in texts]
+
+    first = es_mod.embed_with_store(["a", "bb", "a"], fake_embed, model="m", dims=3, store=store)
+    again = es_mod.embed_with_store(["bb", "ccc"], fake_embed, model="m", dims=3, store=store)
+
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert first == [[1.0, 1.0, 2.0], [2.0, 1.0, 2.0], [1.0, 1.0, 2.0]]
+    assert again == [[2.0, 1.0, 2.0], [3.0, 1.0, 2.0]]
+    got = store.get_many("m", 3, [es_mod.text_hash("bb")])[0]
+    assert not isinstance(got, np.memmap)  # a copy, not a view into the file
+    store.put_many("m", 3, [es_mod.text_hash("bb")], [[9.0, 9.0, 9.0]])  # slot rewritten
+    assert got.tolist() == [2.0, 1.0, 2.0]
+    # other (model, dims) keys are separate
+    assert store.get_many("m", 4, [es_mod.text_hash("bb")]) == [None]
+
+
+def test_size_eviction_reuses_slots_and_export_import(tmp_path):
+    dims = 256  # 1 KiB per vector
+    store = es_mod.EmbeddingStore(str(tmp_path / "a"), max_mb=4 / 1024)  # room for 4 vectors
+    hashes = [es_mod.text_hash(str(i)) for i in range(6)]
+    for i, h in enumerate(hashes):
+        store.put_many("m", dims, [h], [[float(i)] * dims])
+
+    found = store.get_many("m", dims, hashes)
+    assert [v is not None for v in found] == [False, False, True, True, True, True]
+    assert [float(v[0]) for v in found[2:]] == [2.0, 3.0, 4.0, 5.0]
+    assert store.stats()["m/256"]["entries"] == 4
+    assert os.path.getsize(store._path("m", dims)) == 4 * dims * 4  # evicted slots were reused
+
+    out = str(tmp_path / "dump.npz")
+    assert store.export(out, "m", dims) == 4
+    other = es_mod.EmbeddingStore(str(tmp_path / "b"))
+    assert other.import_file(out) == 4
+    assert float(other.get_many("m", dims, [hashes[5]])[0][0]) == 5.0
+
+
+def _put_range(root, start):
+    store = es_mod.EmbeddingStore(root)
+    for i in range(start, start + 40):
+        store.put_many("m", 8, [es_mod.text_hash(str(i))], [[float(i)] * 8])
+    store.close()
+
+
+def test_concurrent_writer_processes_do_not_share_slots(tmp_path):
+    import multiprocessing as mp
+
+    ctx = mp.get_context("fork")
+    procs = [ctx.Process(target=_put_range, args=(str(tmp_path), s)) for s in (0, 100)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+        assert p.exitcode == 0
+
+    store = es_mod.EmbeddingStore(str(tmp_path))
+    keys = [*range(40), *range(100, 140)]
+    found = store.get_many("m", 8, [es_mod.text_hash(str(i)) for i in keys])
+    assert [float(v[0]) for v in found] == [float(i) for i in keys]
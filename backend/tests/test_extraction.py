@@ -0,0 +1,71 @@
+# backend/tests/test_extraction.py
+import services.extraction as ex
+import services.ingest_pipeline as ip
+
+
+def _pdf(pages):
+    """Minimal uncompressed PDF with one line of Helvetica text per page."""
+    n = len(pages)
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n)).encode(),
+    ]
+    font = 3 + 2 * n
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> >>".encode()
+        )
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+def test_pdf_pages_split_into_ranges_keep_order(monkeypatch):
+    monkeypatch.setattr(ex, "EXTRACT_WORKERS", 0)
+    monkeypatch.setattr(ex, "EXTRACT_PAGES_PER_TASK", 2)
+    calls = []
+    real = ex.read_pdf_pages
+    monkeypatch.setattr(ex, "read_pdf_pages", lambda *a: calls.append(a[1:]) or real(*a))
+
+    pages = list(ex.iter_pages("doc.pdf", data=_pdf([f"page {i} words" for i in range(1, 6)])))
+
+    assert calls == [(0, 2), (2, 4), (4, 5)]
+    assert [p for p, _ in pages] == [1, 2, 3, 4, 5]
+    assert [t.strip() for _, t in pages] == [f"page {i} words" for i in range(1, 6)]
+
+
+def test_pipeline_records_real_page_numbers(monkeypatch):
+    monkeypatch.setattr(ex, "EXTRACT_WORKERS", 0)
+    stats = ip.new_stats()
+    sources = [
+        {"doc_id": "d.pdf", "filename": "d.pdf", "data": _pdf(["first", "second", "third"])},
+        {"doc_id": "n.txt", "text": "plain"},
+    ]
+    docs = list(ip.chunk(ip.extract(sources, stats), stats))
+
+    assert [(d["chunk_id"], d["page_num"]) for d in docs] == [
+        ("d.pdf::p1::chunk::0", 1), ("d.pdf::p2::chunk::0", 2), ("d.pdf::p3::chunk::0", 3), ("n.txt::chunk::0", None),
+    ]
+    assert stats["stages"]["extract"]["items"] == 2
+
+
+def test_process_pool_extraction():
+    try:
+        pages = list(ex.iter_pages("doc.pdf", data=_pdf(["alpha", "beta", "gamma"])))
+        text = list(ex.iter_pages("big.txt", data=b"x" * (ex.EXTRACT_INLINE_BYTES + 1)))
+    finally:
+        ex.shutdown_pool()
+    assert [(p, t.strip()) for p, t in pages] == [(1, "alpha"), (2, "beta"), (3, "gamma")]
+    assert text[0][0] is None and len(text[0][1]) == ex.EXTRACT_INLINE_BYTES + 1
@@ -0,0 +1,55 @@
+# backend/tests/test_fusion.py
+import random
+
+import numpy as np
+
+from services.fusion import fuse, fuse_many, parse_weights, top_k_indices
+from services.rank_fusion import rrf_fuse
+
+
+def _hits(ids, scores=None):
+    return [{"id": i, "score": s, "_source": {"doc_id": i, "page_num": 0}}
+            for i, s in zip(ids, scores or [None] * len(ids))]
+
+
+def _ids(hits):
+    return [h["id"] for h in hits]
+
+
+def test_rrf_matches_rrf_fuse_order():
+    rng = random.Random(3)
+    for _ in range(50):
+        knn = _hits(rng.sample(range(40), 20))
+        bm25 = _hits(rng.sample(range(40), 25))
+        assert _ids(fuse([knn, bm25], top_k=10, method="rrf")) == _ids(rrf_fuse(knn, bm25, top_k=10))
+
+
+def test_weighted_rrf_and_three_sources():
+    knn, bm25, extra = _hits(["a", "b"]), _hits(["b", "a"]), _hits(["c"])
+    assert _ids(fuse([knn, bm25], top_k=2, method="rrf")) == ["a", "b"]  # tie -> first seen
+    assert _ids(fuse([knn, bm25], top_k=2, method="rrf", weights=[1.0, 2.0])) == ["b", "a"]
+    assert _ids(fuse([knn, bm25, extra], top_k=3, method="rrf", weights=[1.0, 1.0, 3.0])) == ["c", "a", "b"]
+    assert parse_weights("bm25=0.5, bogus=3") == [1.0, 0.5]
+
+
+def test_linear_minmax_and_zscore():
+    knn = _hits(["a", "b", "c"], [0.9, 0.8, 0.1])
+    bm25 = _hits(["c", "d"], [30.0, 10.0])
+    # minmax: a=1+0, b=0.875+0, c=0+1, d=0+0 (missing -> source minimum)
+    assert _ids(fuse([knn, bm25], top_k=4, method="linear", norm="minmax")) == ["a", "c", "b", "d"]
+    assert _ids(fuse([knn, bm25], top_k=2, method="linear", norm="minmax", weights=[0.2, 0.8])) == ["c", "a"]
+    # zscore: a=0.84-1, c=-1.40+1, b=0.56-1, d=-1.40-1
+    assert _ids(fuse([knn, bm25], top_k=4, method="linear", norm="zscore")) == ["a", "c", "b", "d"]
+
+
+def test_fuse_many_equals_per_query_and_top_k_ties():
+    runs = [[_hits(["a", "b"], [1.0, 0.5]), _hits(["b"], [3.0])],
+            [_hits([]), _hits(["x", "y", "z"], [3.0, 2.0, 1.0])],
+            [_hits([]), _hits([])]]
+    for method in ("rrf", "linear"):
+        assert fuse_many(runs, top_k=2, method=method) == [fuse(r, top_k=2, method=method) for r in runs]
+    assert _ids(fuse_many(runs, top_k=5)[1]) == ["x", "y", "z"]
+
+    scores = np.array([1.0, 2.0, 2.0, 2.0, -np.inf, 0.5])
+    assert top_k_indices(scores, 2).tolist() == [1, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 2, 3, 0, 5]
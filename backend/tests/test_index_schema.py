@@ -0,0 +1,52 @@
+# backend/tests/test_index_schema.py
+import services.index_schema as schema
+
+
+class _Indices:
+    def __init__(self):
+        self.templates = {}
+        self.puts = 0
+
+    def get_index_template(self, name):
+        if name not in self.templates:
+            raise KeyError(name)
+        return {"index_templates": [{"name": name, "index_template": self.templates[name]}]}
+
+    def put_index_template(self, name, **body):
+        self.puts += 1
+        self.templates[name] = body
+
+    def get_mapping(self, index):
+        return {index: {"mappings": schema.index_body()["mappings"]}}
+
+
+class _ES:
+    def __init__(self):
+        self.indices = _Indices()
+
+
+def test_storage_layout():
+    body = schema.index_body(dims=256, index_type="int8_hnsw")
+    idx = body["settings"]["index"]
+    assert idx["codec"] == "best_compression"
+    assert "knn" not in idx  # OpenSearch-only setting
+    assert idx["sort.field"] == ["team", "doc_type", "created_at"]
+    assert idx["sort.order"] == ["asc", "asc", "desc"]
+    assert body["mappings"]["_source"] == {"excludes": ["vector"]}
+    assert body["mappings"]["properties"]["vector"]["index_options"] == {
+        "type": "int8_hnsw", "m": schema.HNSW_M, "ef_construction": schema.HNSW_EF_CONSTRUCTION,
+    }
+    assert "_source" not in schema.index_body(source_mode="stored")["mappings"]
+    assert schema.index_body(source_mode="synthetic")["mappings"]["_source"] == {"mode": "synthetic"}
+
+
+def test_template_is_installed_once_per_version_and_dims():
+    es = _ES()
+    assert schema.ensure_template(es, alias="docs", dims=768, name="t") is True
+    assert schema.ensure_template(es, alias="docs", dims=768, name="t") is False
+    assert schema.ensure_template(es, alias="docs", dims=256, name="t") is True
+    tpl = es.indices.templates["t"]
+    assert tpl["index_patterns"] == ["docs", "docs_v*"]
+    assert tpl["template"]["mappings"]["properties"]["vector"]["dims"] == 256
+    assert es.indices.puts == 2
+    assert schema.source_has_vectors(es, "docs") is False
@@ -1,9 +1,54 @@
 # backend/tests/test_ingest.py
+import asyncio
+
 from fastapi.testclient import TestClient
 from app import app
+import routers.ingest as ingest_router
 
 client = TestClient(app)
 
 def test_ingest_empty():
     r = client.post("/api/ingest", json={})
     assert r.status_code in (400, 422)  # requires content
+
+
+def test_blobs_from_separate_requests_keep_their_own_chunks(tmp_path, monkeypatch):
+    import services.embedding_store as embedding_store
+    import services.ingest_pipeline as ip
+
+    index = {}  # _id -> _source, standing in for Elastic
+
+    def fake_scan(es, index_name, query, size):
+        ids = set(query["query"]["terms"]["doc_id"])
+        return iter([{"_id": k, "_source": v} for k, v in index.items() if v["doc_id"] in ids])
+
+    def fake_bulk(es, actions, **kw):
+        for a in actions:
+            if a["_op_type"] == "delete":
+                index.pop(a["_id"], None)
+            else:
+                index[a["_id"]] = {**a["upsert"], **a["doc"]}
+            yield True, {a["_op_type"]: {"_id": a["_id"]}}
+
+    class _ES:
+        class indices:
+            refresh = staticmethod(lambda index: None)
+
+    monkeypatch.setattr(ip, "get_es", lambda: _ES())
+    monkeypatch.setattr(ip, "scan", fake_scan)
+    monkeypatch.setattr(ip, "streaming_bulk", fake_bulk)
+    monkeypatch.setattr(ip, "embed_texts", lambda texts, **kw: [[0.0]] * len(texts))
+    monkeypatch.setattr(embedding_store, "EMBED_STORE_DIR", "")
+
+    def ingest(tmp, **req):
+        # what each /api/ingest request does: build its sources, run the pipeline
+        sources = asyncio.run(ingest_router._spool_sources(ingest_router.IngestRequest(**req), None, str(tmp)))
+        ip.run_pipeline(sources, "idx")
+
+    ingest(tmp_path, text_blobs=["first note"])
+    ingest(tmp_path, text_blobs=["second note"])
+    ingest(tmp_path, text_blobs=["first note"], team="ops")
+
+    texts = sorted((v["team"], v["text"]) for v in index.values())
+    assert texts == [("ops", "first note"), ("public", "first note"), ("public", "second note")]
+    assert len({v["doc_id"] for v in index.values()}) == 3
@@ -0,0 +1,102 @@
+# backend/tests/test_ingest_jobs.py
+import os
+import threading
+import time
+
+import pytest
+
+import services.ingest_jobs as ij
+import services.ingest_pipeline as ip
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ij, "INGEST_JOBS_DB", str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(ij, "INGEST_SPOOL_DIR", str(tmp_path / "spool"))
+    yield tmp_path
+    ij.shutdown_workers()
+
+
+def _wait(job_id, statuses, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = ij.get_job(job_id)
+        if job and job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}: {ij.get_job(job_id)}")
+
+
+def test_job_runs_to_done_and_cleans_spool(jobs_dir, monkeypatch):
+    def fake_run(sources, index_name, on_progress=None, should_cancel=None):
+        stats = ip.new_stats()
+        stats["stages"]["chunk"]["items"] = stats["stages"]["index"]["items"] = len(sources)
+        on_progress(stats)
+        stats["indexed"] = len(sources)
+        return ip.finalize_stats(stats)
+
+    monkeypatch.setattr(ij, "run_pipeline", fake_run)
+    job_id = ij.new_job_id()
+    path = os.path.join(ij.spool_dir(job_id), "a.txt")
+    with open(path, "w") as f:
+        f.write("hello")
+
+    ij.create_job([{"doc_id": "a.txt", "title": "a.txt", "path": path}], "idx", job_id)
+    job = _wait(job_id, ij.FINAL)
+
+    assert job["status"] == "done"
+    assert job["files"] == ["a.txt"]
+    assert job["progress"]["chunks_indexed"] == 1
+    assert not os.path.exists(os.path.join(ij.INGEST_SPOOL_DIR, job_id))
+
+
+def test_cancel_stops_running_job(jobs_dir, monkeypatch):
+    started = threading.Event()
+
+    def fake_run(sources, index_name, on_progress=None, should_cancel=None):
+        started.set()
+        while not should_cancel():
+            time.sleep(0.01)
+        raise ip.IngestCancelled()
+
+    monkeypatch.setattr(ij, "run_pipeline", fake_run)
+    job = ij.create_job([{"doc_id": "x", "text": "x"}], "idx")
+    assert started.wait(5)
+
+    ij.request_cancel(job["id"])
+    job = _wait(job["id"], ij.FINAL)
+    assert job["status"] == "cancelled"
+    assert job["cancel_requested"] is True
+
+
+def test_job_endpoint_rejects_empty_uploads_and_drops_spool(jobs_dir):
+    from fastapi.testclient import TestClient
+    from app import app
+
+    r = TestClient(app).post("/api/ingest/jobs", files=[("files", ("empty.txt", b"", "text/plain"))])
+    assert r.status_code == 400
+    assert os.listdir(ij.INGEST_SPOOL_DIR) == []
+
+
+def test_job_is_claimed_once_and_live_leases_survive_restart(jobs_dir, monkeypatch):
+    release = threading.Event()
+
+    def fake_run(sources, index_name, on_progress=None, should_cancel=None):
+        release.wait(5)
+        return ip.finalize_stats(ip.new_stats())
+
+    monkeypatch.setattr(ij, "run_pipeline", fake_run)
+    job = ij.create_job([{"doc_id": "x", "text": "x"}], "idx")
+    _wait(job["id"], ("running",))
+    assert ij._claim(job["id"]) is False  # a second worker can't take it
+
+    # another process starting up must leave a job with a live lease alone...
+    submitted = []
+    monkeypatch.setattr(ij, "_submit", submitted.append)
+    assert ij.start_workers() == 0 and ij.get_job(job["id"])["status"] == "running"
+
+    # ...but re-queues one whose owner stopped heartbeating
+    ij._update(job["id"], heartbeat=time.time() - ij.INGEST_JOB_LEASE_S - 1)
+    assert ij.start_workers() == 1 and submitted == [job["id"]]
+    assert ij.get_job(job["id"])["status"] == "queued"
+    release.set()
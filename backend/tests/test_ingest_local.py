@@ -0,0 +1,83 @@
+# backend/tests/test_ingest_local.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import ingest_local  # noqa: E402
+
+
+class _FakeES:
+    class indices:
+        exists = staticmethod(lambda index: True)
+        refresh = staticmethod(lambda index: None)
+
+
+def test_corpus_load_parses_embeds_and_bulk_writes(tmp_path, monkeypatch):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("alpha " * 300)
+    (tmp_path / "sub" / "b.csv").write_text("x,y\n1,2\n")
+    (tmp_path / "skip.bin").write_bytes(b"\0")
+
+    written = []
+
+    def fake_parallel_bulk(es, actions, **kw):
+        for a in actions:
+            written.append(a)
+            yield True, {"update": {"_id": a["_id"]}}
+
+    monkeypatch.setattr(ingest_local, "parallel_bulk", fake_parallel_bulk)
+    batches = []
+    result = ingest_local.main(
+        [str(tmp_path)], team="t", index="idx", workers=2, embed_batch=2,
+        es=_FakeES(), embed_fn=lambda texts: batches.append(len(texts)) or [[0.5]] * len(texts),
+    )
+
+    assert result["files"] == 2 and result["errors"] == 0
+    assert result["indexed"] == result["chunks"] == len(written) == 3
+    assert sorted(a["_id"] for a in written) == ["a.txt::chunk::0", "a.txt::chunk::1", "sub/b.csv::chunk::0"]
+    assert all(a["upsert"]["vector"] == [0.5] and a["upsert"]["content_hash"] for a in written)
+    # re-ingesting must not reset created_at on chunks that already exist
+    assert all(a["_op_type"] == "update" and "created_at" not in a["doc"] for a in written)
+    assert sum(batches) == 3
+
+
+def test_sync_ingests_only_changes_and_deletes_removed(tmp_path, monkeypatch):
+    root = tmp_path / "drive"
+    root.mkdir()
+    (root / "a.txt").write_text("alpha " * 300)
+    (root / "b.txt").write_text("beta")
+    manifest = str(tmp_path / "manifest.json")
+
+    ingested, deletes = [], []
+
+    def fake_ingest(files, **kw):
+        ingested.append(sorted(d for _, d in files))
+        return {"complete": {d for _, d in files}, "chunks_by_doc": {d: [f"{d}::chunk::0"] for _, d in files}}
+
+    class _ES:
+        def delete_by_query(self, index, query, **kw):
+            deletes.append(query)
+            return {"deleted": 1}
+
+    monkeypatch.setattr(ingest_local, "ingest_files", fake_ingest)
+
+    def run():
+        return ingest_local.sync(str(root), index="idx", manifest_file=manifest, es=_ES())
+
+    first = run()
+    assert ingested == [["a.txt", "b.txt"]] and first["changed"] == 2
+
+    second = run()  # nothing touched: stat only, no ES calls
+    assert len(ingested) == 1 and second["changed"] == 0 and len(deletes) == 2
+
+    os.utime(root / "a.txt", None)  # touched but same bytes → skipped after hashing
+    (root / "b.txt").write_text("beta v2")
+    (root / "c.txt").write_text("gamma")
+    third = run()
+    assert ingested[-1] == ["b.txt", "c.txt"]
+    assert (third["changed"], third["removed"]) == (2, 0)
+
+    (root / "a.txt").unlink()
+    fourth = run()
+    assert fourth["removed"] == 1
+    assert deletes[-1] == {"terms": {"doc_id": ["a.txt"]}}
@@ -0,0 +1,135 @@
+# backend/tests/test_ingest_pipeline.py
+import services.embedding_store as embedding_store
+import services.ingest_pipeline as ip
+
+
+def test_stages_stream_in_order_and_report_errors():
+    stats = ip.new_stats()
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(len(texts))
+        if any("boom" in t for t in texts):
+            raise RuntimeError("quota")
+        return [[1.0, 2.0] for _ in texts]
+
+    sources = [
+        {"doc_id": "a.txt", "filename": "a.txt", "data": b"alpha " * 400},
+        {"doc_id": "b.txt", "text": "boom"},
+        {"doc_id": "c.txt", "text": "gamma"},
+    ]
+    docs = list(ip.embed(ip.chunk(ip.extract(sources, stats), stats), stats, batch_size=3, concurrency=2, embed_fn=fake_embed))
+
+    assert calls == [3, 2]
+    assert stats["stages"]["extract"]["items"] == 3
+    assert stats["stages"]["chunk"]["items"] == 5
+    # the batch holding "boom" is dropped and counted, everything else keeps its order
+    assert [d["chunk_id"] for d in docs] == ["a.txt::chunk::0", "a.txt::chunk::1", "a.txt::chunk::2"]
+    assert all(d[ip.VECTOR_FIELD] == [1.0, 2.0] for d in docs)
+    assert stats["stages"]["embed"]["errors"] == 2
+    assert stats["errors"][0].startswith("embed: batch of 2")
+
+
+def test_spooled_text_streams_in_pieces(tmp_path, monkeypatch):
+    import utils.chunker as ch
+
+    text = "".join(f"line {i} " for i in range(3000))
+    path = tmp_path / "big.txt"
+    path.write_text(text, encoding="utf-8")
+    monkeypatch.setattr(ch, "READ_BLOCK_BYTES", 4096)
+
+    stats = ip.new_stats()
+    docs = list(ip.chunk(ip.extract([{"doc_id": "big", "filename": "big.txt", "path": str(path)}], stats), stats))
+
+    assert [d["text"] for d in docs] == ch.chunk_text(text)
+    assert {d["page_num"] for d in docs} == {None}
+
+
+def test_memory_ceiling_aborts_run(monkeypatch):
+    rss = iter([100.0, 900.0])
+    monkeypatch.setattr(ip, "rss_mb", lambda: next(rss, 900.0))
+    monkeypatch.setattr(ip, "MEMORY_SAMPLE_S", 0.0)
+    monkeypatch.setattr(ip, "streaming_bulk", lambda es, actions, **kw: ((True, a) for a in actions))
+    try:
+        ip.run_pipeline([{"doc_id": "a", "text": "alpha"}], es=object(), memory_limit_mb=512)
+    except ip.IngestMemoryExceeded as e:
+        assert "limit 512 MB" in str(e)
+    else:
+        raise AssertionError("expected IngestMemoryExceeded")
+    assert ip._mem_runs == 0  # the aborted run released the guard
+
+
+def test_memory_guard_baseline_is_shared_by_concurrent_runs(monkeypatch):
+    rss = {"mb": 100.0}
+    monkeypatch.setattr(ip, "rss_mb", lambda: rss["mb"])
+    running = ip._Hooks(ip.new_stats(), memory_limit_mb=512)
+    rss["mb"] = 400.0
+    joined = ip._Hooks(ip.new_stats(), memory_limit_mb=512)
+    assert joined.stats["memory"]["rss_base_mb"] == 100.0
+    rss["mb"] = 700.0  # 600 MB over the shared baseline trips either run
+    try:
+        joined.sample_memory()
+    except ip.IngestMemoryExceeded:
+        pass
+    else:
+        raise AssertionError("expected IngestMemoryExceeded")
+    running.close()
+    joined.close()
+    later = ip._Hooks(ip.new_stats(), memory_limit_mb=512)  # idle in between: fresh baseline
+    assert later.stats["memory"]["rss_base_mb"] == 700.0
+    later.close()
+
+
+def test_incremental_reingest_skips_unchanged_and_deletes_orphans(monkeypatch):
+    text = "".join(f"word{i} " for i in range(200))  # 2 chunks
+    first = list(ip.chunk(ip.extract([{"doc_id": "a", "text": text}], ip.new_stats()), ip.new_stats()))
+    assert [d["chunk_id"] for d in first] == ["a::chunk::0", "a::chunk::1"]
+
+    existing = [
+        {"_id": "a::chunk::0", "_source": {"doc_id": "a", "content_hash": first[0]["content_hash"]}},
+        {"_id": "a::chunk::1", "_source": {"doc_id": "a", "content_hash": "stale"}},
+        {"_id": "a::chunk::7", "_source": {"doc_id": "a", "content_hash": "gone"}},
+    ]
+    lookups, actions, embedded = [], [], []
+    monkeypatch.setattr(ip, "scan", lambda es, index, query, size: lookups.append(query) or iter(existing))
+
+    def fake_bulk(es, acts, **kw):
+        for a in acts:
+            actions.append(a)
+            yield True, {a["_op_type"]: {"_id": a["_id"]}}
+
+    monkeypatch.setattr(ip, "streaming_bulk", fake_bulk)
+    monkeypatch.setattr(ip, "embed_texts", lambda texts, **kw: embedded.extend(texts) or [[0.0]] * len(texts))
+    monkeypatch.setattr(embedding_store, "EMBED_STORE_DIR", "")
+
+    class _ES:
+        class indices:
+            refresh = staticmethod(lambda index: None)
+
+    sources = [{"doc_id": "a", "text": text}, {"doc_id": "b", "text": "brand new"}]
+    stats = ip.run_pipeline(sources, es=_ES(), incremental=True)
+
+    assert len(lookups) == 1 and lookups[0]["query"]["terms"]["doc_id"] == ["a", "b"]
+    assert stats["dedup"] == {"unchanged": 1, "changed": 1, "new": 1, "deleted": 1}
+    assert embedded == [first[1]["text"], "brand new"]
+    assert sorted((a["_op_type"], a["_id"]) for a in actions) == [
+        ("delete", "a::chunk::7"), ("update", "a::chunk::1"), ("update", "b::chunk::0"),
+    ]
+    upd = next(a for a in actions if a["_id"] == "a::chunk::1")
+    assert "created_at" not in upd["doc"] and "created_at" in upd["upsert"]
+    assert stats["indexed"] == 2
+
+
+def test_chunk_ids_are_page_local():
+    long_page = "".join(f"word{i} " for i in range(200))  # 2 chunks
+    pages = [(1, long_page), (2, "second page"), (3, "third page")]
+    docs = list(ip.chunk([{"doc_id": "d.pdf", "pages": iter(pages)}], ip.new_stats()))
+
+    assert [d["chunk_id"] for d in docs] == [
+        "d.pdf::p1::chunk::0", "d.pdf::p1::chunk::1", "d.pdf::p2::chunk::0", "d.pdf::p3::chunk::0",
+    ]
+    # shrinking page 1 leaves the later pages' ids and hashes untouched
+    edited = list(ip.chunk([{"doc_id": "d.pdf", "pages": iter([(1, "short"), *pages[1:]])}], ip.new_stats()))
+    assert [(d["chunk_id"], d["content_hash"]) for d in edited[1:]] == [(d["chunk_id"], d["content_hash"]) for d in docs[2:]]
+    assert {ip.doc_id_of(d["chunk_id"]) for d in docs} == {"d.pdf"}
+    assert ip.doc_id_of("a::chunk::3") == "a"
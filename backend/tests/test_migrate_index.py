@@ -0,0 +1,167 @@
+# backend/tests/test_migrate_index.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import migrate_index  # noqa: E402
+import services.elastic_client as ec  # noqa: E402
+import services.embedding_store as embedding_store  # noqa: E402
+
+
+class _Indices:
+    def __init__(self, es):
+        self.es = es
+
+    def _name(self, index):
+        return self.es.aliases.get(index, index)
+
+    def exists(self, index):
+        return index in self.es.docs or index in self.es.aliases
+
+    def exists_alias(self, name):
+        return name in self.es.aliases
+
+    def get_alias(self, name):
+        return {self.es.aliases[name]: {"aliases": {name: {}}}}
+
+    def get(self, index):
+        prefix = index.rstrip("*")
+        return {n: {} for n in self.es.docs if n.startswith(prefix)}
+
+    def create(self, index, body):
+        self.es.bodies[index] = body
+        self.es.docs[index] = {}
+        self.es.meta[index] = {}
+
+    def delete(self, index, **kw):
+        self.es.docs.pop(index, None)
+
+    def refresh(self, index):
+        pass
+
+    def update_aliases(self, actions):
+        self.es.alias_calls.append(actions)
+        for a in actions:
+            if "remove_index" in a:
+                self.es.docs.pop(a["remove_index"]["index"])
+            elif "add" in a:
+                self.es.aliases[a["add"]["alias"]] = a["add"]["index"]
+
+    def get_index_template(self, name):
+        return {"index_templates": [{"name": name, "index_template": self.es.template}]}
+
+    def put_index_template(self, name, **body):
+        self.es.template = body
+
+    def get_settings(self, index, name):
+        return {index: {"settings": {"index": {"number_of_replicas": "1"}}}}
+
+    def put_settings(self, index, settings):
+        pass
+
+    def get_mapping(self, index):
+        return {index: {"mappings": {"_meta": dict(self.es.meta.get(index, {}))}}}
+
+    def put_mapping(self, index, meta):
+        self.es.meta[index] = dict(meta)
+
+
+class _ES:
+    def __init__(self, docs):
+        self.docs = {"searchsphere_docs": docs}
+        self.meta = {}
+        self.aliases = {}
+        self.alias_calls = []
+        self.pits = {}
+        self.template = {}
+        self.bodies = {}
+        self.indices = _Indices(self)
+
+    def count(self, index, query=None):
+        docs = self.docs[self.indices._name(index)]
+        if query:
+            docs = {k: d for k, d in docs.items() if "chunk_id" not in d}
+        return {"count": len(docs)}
+
+    def open_point_in_time(self, index, keep_alive):
+        pid = f"pit{len(self.pits)}"
+        self.pits[pid] = dict(self.docs[self.indices._name(index)])
+        return {"id": pid}
+
+    def close_point_in_time(self, id):
+        self.pits.pop(id)
+
+    def search(self, body):
+        snapshot = self.pits[body["pit"]["id"]]
+        after = (body.get("search_after") or [""])[0]
+        rows = sorted((d["chunk_id"], i, d) for i, d in snapshot.items() if d["chunk_id"] > after)
+        hits = [{"_id": i, "_source": {k: v for k, v in d.items() if k != "vector"}, "sort": [c]}
+                for c, i, d in rows[:body["size"]]]
+        return {"pit_id": body["pit"]["id"], "hits": {"hits": hits}}
+
+
+def test_migration_resumes_from_checkpoint_and_swaps_alias(tmp_path, monkeypatch):
+    docs = {f"d::chunk::{i}": {"chunk_id": f"d::chunk::{i}", "text": f"text {i}", "vector": [0.0]}
+            for i in range(5)}
+    es = _ES(docs)
+
+    def fake_parallel_bulk(client, actions, **kw):
+        for a in actions:
+            es.docs[a["_index"]][a["_id"]] = a["_source"]
+            yield True, {"index": {"_id": a["_id"]}}
+
+    monkeypatch.setattr(ec, "parallel_bulk", fake_parallel_bulk)
+    monkeypatch.setattr(embedding_store, "EMBED_STORE_DIR", "")
+    ckpt = str(tmp_path / "ckpt.json")
+    calls = []
+
+    def flaky_embed(texts):
+        calls.append(list(texts))
+        if "text 2" in texts and len(calls) == 2:
+            raise RuntimeError("quota")
+        return [[1.0, 2.0]] * len(texts)
+
+    monkeypatch.setattr(migrate_index, "EMBED_RETRIES", 1)
+    opts = dict(es=es, model="m2", dims=2, index_type="hnsw", m=32, ef_construction=300,
+                checkpoint_file=ckpt, embed_fn=flaky_embed, page_size=2, replace_index=True)
+    try:
+        migrate_index.migrate(**opts)
+    except RuntimeError as e:
+        assert "quota" in str(e)
+    else:
+        raise AssertionError("expected the second page to fail")
+
+    state = migrate_index.load_checkpoint(ckpt)
+    assert state["target"] == "searchsphere_docs_v2" and state["copied"] == 2
+    assert state["after"] == ["d::chunk::1"]
+    assert es.meta["searchsphere_docs_v2"] == {}  # bulk-load settings restored despite the failure
+
+    state = migrate_index.migrate(**opts)
+
+    assert state["phase"] == "swapped" and state["copied"] == 5
+    assert [t for c in calls[2:] for t in c] == ["text 2", "text 3", "text 4"]  # resumed, not restarted
+    assert es.aliases == {"searchsphere_docs": "searchsphere_docs_v2"}
+    assert es.alias_calls == [[{"remove_index": {"index": "searchsphere_docs"}},
+                               {"add": {"index": "searchsphere_docs_v2", "alias": "searchsphere_docs"}}]]
+    assert all(d["vector"] == [1.0, 2.0] for d in es.docs["searchsphere_docs_v2"].values())
+    assert not os.path.exists(ckpt)
+    assert es.template["_meta"]["dims"] == 2
+    # the template carries the vector layout the migration built, not the env defaults
+    built = es.bodies["searchsphere_docs_v2"]["mappings"]["properties"]["vector"]["index_options"]
+    assert built == {"type": "hnsw", "m": 32, "ef_construction": 300}
+    assert es.template["template"]["mappings"]["properties"]["vector"]["index_options"] == built
+    assert es.pits == {}
+
+
+def test_next_version_and_dims_guard():
+    es = _ES({})
+    es.docs["searchsphere_docs_v3"] = {}
+    assert migrate_index.next_version(es, "searchsphere_docs") == "searchsphere_docs_v4"
+
+    fn = migrate_index.make_embed_fn("m", 3, 0.0, embed_fn=lambda texts: [[0.0]] * len(texts))
+    try:
+        fn(["a"])
+    except RuntimeError as e:
+        assert "1-dim" in str(e)
+    else:
+        raise AssertionError("expected a dims mismatch")
@@ -0,0 +1,10 @@
+# backend/tests/test_rank_fusion.py
+from services.rank_fusion import rrf_fuse
+
+
+def test_rrf_fuse_keys_id_only_hits_by_id():
+    # two-phase candidates: formatted hits with an empty _source
+    bm25 = [{"id": i, "_source": {}} for i in ("a", "b", "c")]
+    knn = [{"id": i, "_source": {}} for i in ("c", "d")]
+    fused = rrf_fuse(knn, bm25, top_k=4)
+    assert [h["id"] for h in fused] == ["c", "a", "d", "b"]
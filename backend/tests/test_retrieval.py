@@ -0,0 +1,166 @@
+# backend/tests/test_retrieval.py
+import asyncio
+import time
+
+import services.retrieval as retrieval
+
+
+def _hit(i):
+    return {"_id": str(i), "_source": {"doc_id": f"d{i}", "page_num": 0}}
+
+
+def test_hybrid_retrieve_runs_bm25_and_knn_concurrently(monkeypatch):
+    async def fake_bm25(es, index, query, k=12, filters=None, source=None):
+        await asyncio.sleep(0.1)
+        return [_hit(1), _hit(2)]
+
+    async def fake_embed(text, location=None, model=None):
+        await asyncio.sleep(0.05)
+        return [0.1, 0.2]
+
+    async def fake_knn(es, index, vec, k=12, filters=None, num_candidates=None, source=None):
+        await asyncio.sleep(0.05)
+        return [_hit(2), _hit(3)]
+
+    monkeypatch.setattr(retrieval, "async_search_bm25", fake_bm25)
+    monkeypatch.setattr(retrieval, "async_search_knn", fake_knn)
+    monkeypatch.setattr(retrieval, "embed_query", fake_embed)
+
+    t0 = time.perf_counter()
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=3, es=object(), strategy="parallel"))
+    elapsed = time.perf_counter() - t0
+
+    assert elapsed < 0.18  # max(0.1, 0.05 + 0.05), not the 0.2 sum
+    assert [h["_id"] for h in r["fused"]][0] == "2"
+    assert r["errors"] == {"embed": None, "bm25": None, "knn": None, "fetch": None}
+
+
+def test_hybrid_retrieve_degrades_when_embedding_fails(monkeypatch):
+    async def fake_bm25(es, index, query, k=12, filters=None, source=None):
+        return [_hit(1)]
+
+    async def fail_embed(text, location=None, model=None):
+        raise RuntimeError("no quota")
+
+    monkeypatch.setattr(retrieval, "async_search_bm25", fake_bm25)
+    monkeypatch.setattr(retrieval, "embed_query", fail_embed)
+
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=3, es=object()))
+    assert [h["_id"] for h in r["fused"]] == ["1"]
+    assert r["errors"]["embed"].startswith("Embedding failed")
+    assert r["errors"]["knn"] == r["errors"]["embed"]
+
+
+def test_hybrid_retrieve_msearch_uses_one_request(monkeypatch):
+    calls = []
+
+    async def fake_embed(text, location=None, model=None):
+        return [0.1, 0.2]
+
+    async def fake_msearch(es, index, query, vec, k=12, filters=None, num_candidates=None, source=None):
+        calls.append(query)
+        return {"bm25": [_hit(1)], "knn": [_hit(1), _hit(2)], "took": {"bm25": 3, "knn": 5}}
+
+    monkeypatch.setattr(retrieval, "embed_query", fake_embed)
+    monkeypatch.setattr(retrieval, "async_search_hybrid_msearch", fake_msearch)
+
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=2, es=object(), strategy="msearch"))
+    assert calls == ["q"]
+    assert r["strategy"] == "msearch"
+    assert r["took"] == {"bm25": 3, "knn": 5}
+    assert [h["_id"] for h in r["fused"]] == ["1", "2"]
+
+
+def test_auto_strategy_only_batches_when_the_vector_is_known(monkeypatch):
+    order = []
+
+    async def fake_bm25(es, index, query, k=12, filters=None, source=None):
+        order.append("bm25")
+        return [_hit(1)]
+
+    async def fake_embed(text, location=None, model=None):
+        await asyncio.sleep(0.05)
+        order.append("embedded")
+        return [0.1, 0.2]
+
+    async def fake_knn(es, index, vec, k=12, filters=None, num_candidates=None, source=None):
+        return [_hit(2)]
+
+    async def fake_msearch(es, index, query, vec, k=12, filters=None, num_candidates=None, source=None):
+        return {"bm25": [_hit(1)], "knn": [_hit(2)], "took": {"bm25": 1, "knn": 1}}
+
+    monkeypatch.setattr(retrieval, "async_search_bm25", fake_bm25)
+    monkeypatch.setattr(retrieval, "async_search_knn", fake_knn)
+    monkeypatch.setattr(retrieval, "async_search_hybrid_msearch", fake_msearch)
+    monkeypatch.setattr(retrieval, "embed_query", fake_embed)
+
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=2, es=object(), strategy="auto"))
+    assert r["strategy"] == "parallel" and order == ["bm25", "embedded"]  # BM25 didn't wait for the embed
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=2, es=object(), strategy="auto", query_vector=[0.3]))
+    assert r["strategy"] == "msearch" and r["took"] == {"bm25": 1, "knn": 1}
+
+
+def test_two_phase_fuses_ids_then_fetches_top_k_sources(monkeypatch):
+    seen = {}
+
+    async def fake_embed(text, location=None, model=None):
+        return [0.1, 0.2]
+
+    async def fake_msearch(es, index, query, vec, k=12, filters=None, num_candidates=None, source=None):
+        seen["source"] = source
+
+        def ids(*ns):
+            return [{"id": str(n), "_id": str(n), "index": "idx_v2", "_source": {}} for n in ns]
+
+        return {"bm25": ids(1, 2, 3), "knn": ids(3, 1, 4), "took": {"bm25": 1, "knn": 1}}
+
+    class _ES:
+        async def mget(self, index, docs, source):
+            seen["mget"] = [d["_id"] for d in docs]
+            return {"docs": [{"_id": d["_id"], "found": d["_id"] != "4", "_source": {"text": f"t{d['_id']}"}}
+                             for d in docs]}
+
+    monkeypatch.setattr(retrieval, "embed_query", fake_embed)
+    monkeypatch.setattr(retrieval, "async_search_hybrid_msearch", fake_msearch)
+
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=2, es=_ES(), strategy="msearch", two_phase=True))
+    assert seen["source"] is False
+    assert seen["mget"] == ["1", "3"]  # only the fused top_k
+    assert [(h["_id"], h["_source"]["text"]) for h in r["fused"]] == [("1", "t1"), ("3", "t3")]
+    assert r["payload"]["two_phase"] is True and r["errors"]["fetch"] is None
+
+
+def test_payload_meter_counts_response_bytes():
+    import services.elastic_client as ec
+
+    ser = ec._MeteredJsonSerializer()
+    assert ser.loads(b'{"a": 1}') == {"a": 1}  # no meter active: plain decode
+    with ec.payload_meter() as acc:
+        ser.loads(b'{"hits": []}')
+        ser.loads(b"{}")
+    assert acc["bytes"] == 14 and acc["responses"] == 2 and acc["decode_ms"] >= 0
+    # keeps the client's numpy handling for request bodies
+    import numpy as np
+    assert ser.dumps({"v": np.array([0.5, 1.0], dtype=np.float32), "n": np.int64(3)}) == b'{"v":[0.5,1.0],"n":3}'
+
+
+def test_rrf_strategy_uses_server_fused_hits(monkeypatch):
+    async def fake_embed(text, location=None, model=None):
+        return [0.1, 0.2]
+
+    async def fake_rrf(es, index, query, vec, k=12, window=None, filters=None, num_candidates=None,
+                       fallback_source=None):
+        assert (k, window, fallback_source) == (3, 60, False)
+        return {"fused": [_hit(4)], "bm25": [], "knn": [], "bm25_tier": None,
+                "took": {"rrf": 2}, "fusion": "server", "form": "retriever"}
+
+    async def no_fetch(*a, **kw):
+        raise AssertionError("server-fused hits already carry sources")
+
+    monkeypatch.setattr(retrieval, "embed_query", fake_embed)
+    monkeypatch.setattr(retrieval, "async_search_hybrid_rrf", fake_rrf)
+    monkeypatch.setattr(retrieval, "async_fetch_sources", no_fetch)
+
+    r = asyncio.run(retrieval.hybrid_retrieve("q", top_k=3, es=object(), strategy="rrf", two_phase=True))
+    assert [h["_id"] for h in r["fused"]] == ["4"]
+    assert (r["strategy"], r["fusion"], r["took"]) == ("rrf", "server", {"rrf": 2})
@@ -0,0 +1,79 @@
+# backend/tests/test_search_cache.py
+from fastapi.testclient import TestClient
+
+import routers.search as search_router
+import services.elastic_client as ec
+import services.search_cache as search_cache
+from app import app
+from utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_byte_bound_evicts_lru():
+    c = TTLCache(maxsize=10, ttl=60, max_bytes=10, sizeof=len)
+    c.set("a", "xxxx")
+    c.set("b", "yyyy")
+    assert c.get("a") == "xxxx"      # a is now most recent
+    c.set("c", "zzzz")               # 12 bytes > 10 -> evict b
+    assert c.get("b") is None and c.stats()["bytes"] == 8
+    c.set("big", "x" * 11)           # larger than the bound: not stored
+    assert c.get("big") is None and len(c) == 2
+    assert c.get("a", validate=lambda v: False) is None and c.stats()["bytes"] == 4
+
+
+def test_cache_key_normalization():
+    key = search_cache.cache_key
+    assert key("  hello   world ", "Hybrid", {"team": ["b", "a"], "since": None}, 10, [0.1, 0.2]) == \
+        key("hello world", "hybrid", {"team": ["a", "b"]}, 10, [0.1, 0.2])
+    assert key("hello", "hybrid", None, 10) != key("Hello", "hybrid", None, 10)
+    assert key("hello", "hybrid", None, 10, [0.1]) != key("hello", "hybrid", None, 10, [0.2])
+    assert key("hello", "hybrid", None, 10) != key("hello", "hybrid", None, 5)
+
+
+def test_search_endpoint_serves_hits_until_index_write(monkeypatch):
+    calls = []
+
+    async def fake_search(body, k, t0):
+        calls.append(body.query)
+        return {"results": [{"id": "1"}], "mode": "bm25", "__latency_ms": 5.0}
+
+    monkeypatch.setattr(search_router, "_search", fake_search)
+    monkeypatch.setattr(search_cache, "SEARCH_CACHE_SIZE", 16)
+    search_cache.clear()
+    client = TestClient(app)
+    req = {"query": "cost  report", "mode": "bm25", "k": 5}
+
+    statuses = [client.post("/api/search", json=req).json()["cache"] for _ in range(2)]
+    ec.bump_index_generation()
+    statuses += [client.post("/api/search", json={**req, "query": "cost report"}).json()["cache"] for _ in range(2)]
+
+    assert statuses == ["miss", "hit", "stale", "hit"]
+    assert len(calls) == 2
+    assert search_cache.stats()["size"] == 1
+
+
+def test_degraded_hybrid_is_not_cached(monkeypatch):
+    knn_calls = []
+
+    async def fake_bm25(**kw):
+        return [{"_id": "1", "_score": 1.0, "_source": {"title": "t", "text": "x"}}]
+
+    async def fake_knn(**kw):
+        knn_calls.append(1)
+        if len(knn_calls) == 1:
+            raise RuntimeError("knn timeout")
+        return [{"_id": "2", "_score": 0.9, "_source": {"title": "u", "text": "y"}}]
+
+    monkeypatch.setattr(search_router, "get_async_es", lambda: object())
+    monkeypatch.setattr(search_router, "async_search_bm25", fake_bm25)
+    monkeypatch.setattr(search_router, "async_search_knn", fake_knn)
+    monkeypatch.setattr(search_cache, "SEARCH_CACHE_SIZE", 16)
+    search_cache.clear()
+    client = TestClient(app)
+    req = {"query": "cost report", "mode": "hybrid", "k": 5, "query_vector": [0.1, 0.2]}
+
+    first = client.post("/api/search", json=req).json()
+    assert first["degraded"] is True and "knn timeout" in first["warning"]
+    second = client.post("/api/search", json=req).json()
+    assert second["cache"] == "miss" and "degraded" not in second
+    assert client.post("/api/search", json=req).json()["cache"] == "hit"
+    assert len(knn_calls) == 2
@@ -0,0 +1,22 @@
+# backend/tests/test_vertex_models.py
+import services.vertex_models as vm
+
+
+def test_models_are_memoised_and_init_runs_once(monkeypatch):
+    inits, built = [], []
+    monkeypatch.setenv("GCP_PROJECT_ID", "proj")
+    monkeypatch.setattr(vm.vertexai, "init", lambda **kw: inits.append(kw))
+    monkeypatch.setattr(vm, "GenerativeModel", lambda model_id: built.append(model_id) or object())
+    vm.reset()
+    try:
+        a = vm.get_generative_model("gemini-2.0-flash-001", "us-central1")
+        b = vm.get_generative_model("gemini-2.0-flash-001", "us-central1")
+        assert a is b
+        assert built == ["gemini-2.0-flash-001"]
+        assert inits == [{"project": "proj", "location": "us-central1"}]
+
+        vm.reset()
+        vm.get_generative_model("gemini-2.0-flash-001", "us-central1")
+        assert len(built) == 2
+    finally:
+        vm.reset()
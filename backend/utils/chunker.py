@@ -1,11 +1,17 @@
 # split long docs → overlapping chunks
 # backend/utils/chunker.py
-from typing import List
-from pdfminer.high_level import extract_text
-import io, csv
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from pdfminer.high_level import extract_text, extract_pages
+from pdfminer.layout import LAParams, LTTextContainer
+from pdfminer.pdfpage import PDFPage
+import codecs, io, csv, mmap, os
+
+PdfInput = Union[str, bytes]  # file path or raw bytes
 
 DEFAULT_CHUNK_SIZE = 1000
 DEFAULT_OVERLAP = 150
+READ_BLOCK_BYTES = 1024 * 1024
 
 def chunk_text(text: str, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP) -> List[str]:
     text = (text or "").strip()
@@ -23,10 +29,92 @@ def chunk_text(text: str, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP
         if start < 0: start = 0
     return chunks
 
+def iter_chunks(pieces: Iterable[str], chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP) -> Iterator[str]:
+    """
+    Streaming chunk_text(): yields exactly chunk_text("".join(pieces)) (for
+    overlap < chunk_size), holding at most one piece plus one chunk of text at a
+    time (plus any whitespace run that has no text after it yet).
+    """
+    step = max(1, chunk_size - overlap)
+    buf = ""
+    started = False
+    for piece in pieces:
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        buf += piece
+        # chunk_text windows the stripped text: a window is only full once text
+        # (not just trailing whitespace) follows it
+        n = len(buf.rstrip())
+        pos = 0
+        while n - pos > chunk_size:
+            yield buf[pos:pos + chunk_size]
+            pos += step
+        buf = buf[pos:]
+    tail = buf.rstrip()
+    if tail:
+        yield tail
+
 def read_pdf_bytes(b: bytes) -> str:
     with io.BytesIO(b) as f:
         return extract_text(f)
 
+# Page-level PDF helpers. They are top-level and only depend on pdfminer so
+# they can run inside extraction worker processes (services/extraction.py).
+class _MappedFile(io.RawIOBase):
+    """Read-only file object over an mmap (pdfminer only accepts io.IOBase)."""
+
+    def __init__(self, m: mmap.mmap):
+        self._m = m
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._m.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        self._m.seek(pos, whence)
+        return self._m.tell()
+
+    def tell(self) -> int:
+        return self._m.tell()
+
+@contextmanager
+def _open_pdf(src: PdfInput):
+    """Paths are memory-mapped so page parsing reads from the page cache, not the heap."""
+    if not isinstance(src, str):
+        yield io.BytesIO(src)
+        return
+    with open(src, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield _MappedFile(m)
+
+def pdf_page_count(src: PdfInput) -> int:
+    with _open_pdf(src) as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+def read_pdf_pages(src: PdfInput, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Text of pages [start, end) as (1-based page number, text) pairs."""
+    pages = range(start, end) if end is not None else None
+    out: List[Tuple[int, str]] = []
+    with _open_pdf(src) as f:
+        for i, layout in enumerate(extract_pages(f, page_numbers=pages, laparams=LAParams())):
+            text = "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+            # layout.pageid is pdfminer's object id, so count from `start` instead
+            out.append((start + i + 1, text))
+    return out
+
 def read_text_bytes(b: bytes) -> str:
     return b.decode("utf-8", errors="ignore")
 
@@ -37,3 +125,46 @@ def read_csv_bytes(b: bytes) -> str:
     for row in rdr:
         lines.append(", ".join(row))
     return "\n".join(lines)
+
+# Incremental readers for spooled uploads: yield decoded text in ~block_size pieces
+def iter_text_file(path: str, block_size: Optional[int] = None) -> Iterator[str]:
+    block_size = block_size or READ_BLOCK_BYTES
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            text = decoder.decode(block)
+            if text:
+                yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+def iter_csv_file(path: str, block_size: Optional[int] = None) -> Iterator[str]:
+    block_size = block_size or READ_BLOCK_BYTES
+    with open(path, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        lines: List[str] = []
+        size = 0
+        for row in csv.reader(f):
+            line = ", ".join(row)
+            lines.append(line)
+            size += len(line) + 1
+            if size >= block_size:
+                yield "\n".join(lines) + "\n"
+                lines, size = [], 0
+        if lines:
+            yield "\n".join(lines)
+
+def chunk_file(path: str, chunk_size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_OVERLAP) -> List[Tuple[Optional[int], str]]:
+    """
+    Whole-file extract + chunk as (page_num, chunk) pairs; PDFs are chunked per
+    page, CSV/text as one stream. Top-level so corpus loaders can run it in a
+    process pool, one file per task.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        return [(p, part) for p, text in read_pdf_pages(path) for part in chunk_text(text, chunk_size, overlap)]
+    pieces = iter_csv_file(path) if ext == ".csv" else iter_text_file(path)
+    return [(None, part) for part in iter_chunks(pieces, chunk_size, overlap)]
@@ -11,12 +11,20 @@
 _counters: Dict[MetricName, int] = {"search": 0, "chat": 0}
 _latencies: Dict[MetricName, Deque[float]] = {"search": deque(maxlen=500), "chat": deque(maxlen=500)}
 _eval: dict = {"k": 10, "p_at_k": 0.0, "runs": 0}
+# cache name -> {"hit": n, "miss": n, "eviction": n}
+_caches: Dict[str, Dict[str, int]] = {}
 
 def record(metric: MetricName, latency_ms: float) -> None:
     with _lock:
         _counters[metric] += 1
         _latencies[metric].append(float(latency_ms))
 
+def record_cache(cache: str, event: str, n: int = 1) -> None:
+    """Count a cache event ("hit" | "miss" | "eviction") for the named cache."""
+    with _lock:
+        c = _caches.setdefault(cache, {"hit": 0, "miss": 0, "eviction": 0})
+        c[event] = c.get(event, 0) + n
+
 def _percentile(values, p: float) -> float:
     if not values:
         return 0.0
@@ -40,6 +48,7 @@ def snapshot() -> Dict[str, dict]:
                 "samples": len(arr)
             }
         out["eval"] = dict(_eval)  # include P@K
+        out["caches"] = {name: dict(c) for name, c in _caches.items()}
         return out
 
 
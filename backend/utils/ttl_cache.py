@@ -0,0 +1,120 @@
+# bounded LRU + TTL cache (entries and optionally bytes) with hit/miss/eviction counters
+# backend/utils/ttl_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from utils.metrics import record_cache
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    - maxsize: entry bound; least-recently-used entries are evicted first
+    - ttl: seconds an entry stays valid (<= 0 disables expiry)
+    - name: when set, hits/misses/evictions are reported via utils.metrics
+    - max_bytes: optional bound on the summed sizeof(value) of all entries
+      (LRU eviction as for maxsize); a value larger than max_bytes is not stored
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        name: Optional[str] = None,
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.name = name
+        self.max_bytes = max(0, int(max_bytes))
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, event: str) -> None:
+        if self.name:
+            record_cache(self.name, event)
+
+    def get(self, key: Hashable, default: Any = None, validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """`validate(value)` False drops the entry like an expired one (counted as a miss)."""
+        now = time.monotonic()
+        value: Any = _MISSING
+        expired = False
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if (self.ttl <= 0 or entry[0] > now) and (validate is None or validate(entry[1])):
+                    self._data.move_to_end(key)
+                    value = entry[1]
+                    self.hits += 1
+                else:
+                    self._drop(key)
+                    self.evictions += 1
+                    expired = True
+            if value is _MISSING:
+                self.misses += 1
+        if expired:
+            self._count("eviction")
+        if value is _MISSING:
+            self._count("miss")
+            return default
+        self._count("hit")
+        return value
+
+    def _drop(self, key: Hashable) -> None:
+        # caller holds the lock
+        self.bytes -= self._data.pop(key)[2]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl
+        size = int(self.sizeof(value)) if self.sizeof is not None else 0
+        evicted = 0
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._data[key] = (expires, value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+                self._drop(next(iter(self._data)))
+                evicted += 1
+            self.evictions += evicted
+        for _ in range(evicted):
+            self._count("eviction")
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
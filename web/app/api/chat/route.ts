@@ -4,11 +4,35 @@ import { getBackendBase } from "../_backend";
 
 export const dynamic = "force-dynamic";
 
+// SSE when the client asks for it (Accept: text/event-stream or ?stream=1)
+function wantsStream(req: NextRequest): boolean {
+  const accept = req.headers.get("accept") || "";
+  return accept.includes("text/event-stream") || req.nextUrl.searchParams.get("stream") === "1";
+}
+
 export async function POST(req: NextRequest) {
   const base = getBackendBase();
   try {
     const bodyText = await req.text();
 
+    if (wantsStream(req)) {
+      const r = await fetch(`${base}/api/chat/stream`, {
+        method: "POST",
+        headers: { "content-type": "application/json", accept: "text/event-stream" },
+        body: bodyText,
+        cache: "no-store",
+      });
+      // pass the event stream through unbuffered
+      return new Response(r.body, {
+        status: r.status,
+        headers: {
+          "content-type": r.headers.get("content-type") || "text/event-stream",
+          "cache-control": "no-cache",
+          connection: "keep-alive",
+        },
+      });
+    }
+
     const r = await fetch(`${base}/api/chat`, {
       method: "POST",
       headers: { "content-type": "application/json" },